@@ -16,6 +16,7 @@ from .views.video_view import VideoView
 from .controller import AppController
 from .ui_manager import UIManager
 from services.process_utils import Status, StatusMessage
+from services.frame_ring import SharedFrameRing
 
 # 【追加】UIコンポーネントのインポート
 from .views.components.focus_panel import FocusPanel
@@ -29,7 +30,8 @@ class AppMainWindow(tk.Tk):
         self.title("リアルタイム解析ダッシュボード")
         self.geometry("1400x900")
         self.data_queue = multiprocessing.Queue()
-        self.frame_queue = multiprocessing.Queue(maxsize=2)
+        # キャプチャプロセスから描画済みフレームを受け取る共有メモリのリング (1080p BGR × 3スロット)
+        self.frame_ring = SharedFrameRing.create(num_slots=3, max_shape=(1080, 1920, 3))
         self.status_queue = multiprocessing.Queue()
 
         # 1. Controllerインスタンスを作成
@@ -38,6 +40,7 @@ class AppMainWindow(tk.Tk):
         # 2. UIで直接使う変数を定義
         self.mode = tk.StringVar(value="csv")
         self.elapsed_time_var = tk.StringVar(value="経過時間: 0.0s")
+        self.ingest_lag_var = tk.StringVar()
         self.progress_var = tk.DoubleVar()
         self.time_range_var = tk.StringVar(value="30秒窓")
         self.time_input_var = tk.StringVar()
@@ -51,6 +54,16 @@ class AppMainWindow(tk.Tk):
 
         # 5. 最後に、UIの初期状態を設定
         self.controller._on_mode_change()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        """ウィンドウを閉じる際に、キャプチャプロセスと解析ワーカーを止めて共有メモリを解放する"""
+        if self.controller.current_mode_handler.is_running:
+            self.controller.stop_analysis()
+        self.controller.mode_handlers["realtime"].shutdown()
+        self.controller.shutdown()
+        self.frame_ring.close()
+        self.destroy()
 
     def _setup_ui(self):
         """UI要素の作成と配置に専念するメソッド"""
@@ -85,6 +98,7 @@ class AppMainWindow(tk.Tk):
         self.notebook.add(self.views["radar"], text="レーダーチャート")
         self.notebook.add(self.views["kmeans"], text="k-means法")
         self.notebook.add(self.views["heatmap"], text="ヒートマップ")
+        self.notebook.bind("<<NotebookTabChanged>>", self.controller.on_tab_changed)
 
     def toggle_focus_panel(self):
         """フォーカスパネルの表示/非表示を切り替える"""
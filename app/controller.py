@@ -2,9 +2,11 @@
 
 import queue
 import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+import numpy as np
 import pandas as pd
 
 # 外部ファイルをインポート
@@ -14,12 +16,19 @@ from core.data_processor import DataProcessor
 # Modelをインポート
 from core.model import AnalysisModel
 from core.analysis_service import AnalysisService 
+from core.analysis_worker import AnalysisWorker
+from core.cluster_cache import ClusterResultCache
 from core.save_manager import SaveManager
 from app.views.config_dialog import ConfigDialog
 from .mode_handler.csv_replay_handler import CsvReplayHandler
 from .mode_handler.realtime_handler import RealtimeHandler
 from services.process_utils import Status
 
+# 解析ワーカーの計算結果を確認する間隔 (ミリ秒)
+SNAPSHOT_POLL_INTERVAL_MS = 50
+# 解析ワーカーの処理状況 (計算・読み飛ばしたティック数、結果の古さ) をログに出す間隔 (秒)
+WORKER_STATS_LOG_INTERVAL_SEC = 10.0
+
 
 class AppController:
     def __init__(self, app, status_queue):
@@ -27,16 +36,27 @@ class AppController:
         self.status_queue = status_queue # 【追加】
         self.model = AnalysisModel()
         self.data_processor = DataProcessor()
-        self.analysis_service = AnalysisService(self.model, self.data_processor)
         self.config_manager = ConfigManager()
-        self.save_manager = SaveManager(self)
 
         # analysis_parametersを一括で読み込んでおく
-
         self.analysis_params = self.config_manager.config.analysis_parameters
+        self.analysis_service = AnalysisService(self.model, self.data_processor, self.analysis_params)
+        self.save_manager = SaveManager(self)
+
         self.update_interval = self.analysis_params.UPDATE_INTERVAL_MS
         self.sliding_window = self.analysis_params.SLIDING_WINDOW_SECONDS
 
+        # 特徴量計算を別スレッドで行う解析ワーカー (無効ならUIスレッドで同期的に計算する)
+        self.analysis_worker = None
+        if self.analysis_params.ANALYSIS_WORKER_ENABLED:
+            self.analysis_worker = AnalysisWorker(self.analysis_service)
+            self.analysis_worker.start()
+        self.snapshot_poll_after_id = None
+        self.worker_stats_logged_at = time.monotonic()
+        # クラスタリング系のビューが共有する、標準化・連結行列・k-meansの結果のキャッシュ
+        self.cluster_cache = ClusterResultCache(max_entries=self.analysis_params.CLUSTER_CACHE_ENTRIES)
+        self.applied_snapshot_sequence = None
+
         # --- ModeHandlerの初期化 ---
         self.mode_handlers = {
             "csv": CsvReplayHandler(self),
@@ -47,6 +67,9 @@ class AppController:
         # --- 状態変数の整理 ---
         self.after_id = None
         self.status_check_after_id = None # 【追加】ステータス監視用のID
+        # 再描画の要求はアイドル時の1回にまとめる (予約中のIDと、その間にデータの再計算が要求されたか)
+        self.redraw_after_id = None
+        self.redraw_needs_recompute = False
         self.is_realtime_mode = False
         self.is_display_paused = False
         self.focused_ids = []
@@ -142,7 +165,7 @@ class AppController:
             self.app.ui_manager.show_error("保存エラー", "保存できる有効なデータがありません。")
             return
         
-        timestamp_to_save = self.model.full_history[save_index]['timestamp']
+        timestamp_to_save = float(self.model.full_history.timestamps[save_index])
         self.save_manager.save_all_plots(timestamp_to_save)
 
     def _on_slider_change(self, event):
@@ -153,8 +176,8 @@ class AppController:
 
         self.app.ui_manager.set_rt_button_state('normal')
         
-        timestamp_index = int(self.app.slider.get())
-        self.process_data_and_update_views(history_index=timestamp_index)
+        # ドラッグ中に連続で届くので、再計算はアイドル時の1回にまとめる
+        self.request_redraw(data_changed=True)
 
     def _return_to_realtime(self):
         """リアルタイム表示に復帰する"""
@@ -180,12 +203,13 @@ class AppController:
         print("INFO: 全てのデータをリセットします。")
 
         # Modelのデータをリセット
-        self.model.full_history = []
+        self.model.full_history.clear()
         self.model.active_ids = []
         self.model.time_series_df = None
         self.model.csv_replay_data = None
         self.model.last_power_spectrums = {}
         self.model.last_slope_dfs = {}
+        self.cluster_cache.clear()
 
         # Controllerの状態変数をリセット
         self.focused_ids = []
@@ -206,7 +230,7 @@ class AppController:
             self._update_time_inputs_to_current()
             return
 
-        timestamps = [dp['timestamp'] for dp in self.model.full_history]
+        timestamps = self.model.full_history.timestamps
         
         # 入力値が有効範囲内かチェック
         if not (timestamps[0] <= target_time <= timestamps[-1]):
@@ -215,8 +239,7 @@ class AppController:
             return
 
         # 入力された時間に最も近いデータ点のインデックスを探す
-        time_diffs = [abs(ts - target_time) for ts in timestamps]
-        closest_index = time_diffs.index(min(time_diffs))
+        closest_index = int(np.argmin(np.abs(timestamps - target_time)))
 
         # スライダーを更新し、全体の再描画をトリガーする
         self.app.slider.set(closest_index)
@@ -227,8 +250,8 @@ class AppController:
         if not self.model.full_history: return
         try:
             current_index = int(self.app.slider.get())
-            current_time = self.model.full_history[current_index]['timestamp']
-            total_time = self.model.full_history[-1]['timestamp']
+            current_time = self.model.full_history.timestamps[current_index]
+            total_time = self.model.full_history.timestamps[-1]
             self.app.time_input_var.set(f"{current_time:.1f}")
             self.app.total_time_var.set(f"s / {total_time:.1f}s")
         except (IndexError, KeyError):
@@ -270,21 +293,8 @@ class AppController:
         """【バックグラウンドで実行】一括解析の重い計算処理。"""
         try:
             print("INFO: (別スレッド) 一括解析の計算処理を開始します。")
-            all_data_history = []
-            
-            for timestamp, row in self.model.csv_replay_data.iterrows():
-                packet = {'timestamp': timestamp}
-                for id_name in self.model.active_ids:
-                    id_data = {}
-                    for var in ALL_VARIABLES:
-                        col_name = f"{id_name}_{var}"
-                        if col_name in row and not pd.isna(row[col_name]):
-                            id_data[var] = row[col_name]
-                    if id_data:
-                        packet[id_name] = id_data
-                all_data_history.append(packet)
-
-            df_full_features = self.analysis_service.perform_batch_analysis(all_data_history)
+            # CSVの列をそのまま列指向の履歴に取り込む (行ごとのパケット辞書は作らない)
+            df_full_features = self.analysis_service.perform_batch_analysis(self.model.csv_replay_data)
             self.batch_result_df = df_full_features
 
         except Exception as e:
@@ -294,26 +304,6 @@ class AppController:
             self.batch_analysis_complete = True
             print("INFO: (別スレッド) 計算処理が完了しました。")
 
-    def _get_next_data_packet(self):
-        """CSVリプレイデータから次のデータパケットを取得し、インデックスを進める"""
-        if self.model.csv_replay_data is None or self.csv_replay_index >= len(self.model.csv_replay_data):
-            return None # データがないか、終端に達した
-
-        current_row = self.model.csv_replay_data.iloc[self.csv_replay_index]
-        new_data = {'timestamp': current_row.name}
-        for id_name in self.model.active_ids:
-            id_data = {}
-            for var in ALL_VARIABLES:
-                col_name = f"{id_name}_{var}"
-                if col_name in current_row and not pd.isna(current_row[col_name]):
-                    id_data[var] = current_row[col_name]
-                else:
-                    id_data[var] = 0
-            new_data[id_name] = id_data
-        
-        self.csv_replay_index += 1
-        return new_data
-
     def process_data_and_update_views(self, history_index=None):
         """【メインループ】データ処理とUI更新を統括する"""
         try:
@@ -321,25 +311,30 @@ class AppController:
             is_running_in_realtime = (history_index is None and self.current_mode_handler.is_running)
 
             if is_running_in_realtime:
-                new_data = self.current_mode_handler.get_next_data_packet()
-                if new_data:
-                    self.model.full_history.append(new_data)
-                else:
+                if not self.current_mode_handler.ingest_next_data(self.model.full_history):
                     self.stop_analysis()
                     self.app.ui_manager.show_info("完了", "再生が完了しました。")
                     return
+                self.app.ui_manager.update_ingest_lag(getattr(self.current_mode_handler, 'ingest_lag', None))
 
             if not self.model.full_history:
+                # リアルタイムの起動直後など、まだデータが届いていなければ次のティックを待つ
+                if self.current_mode_handler.is_running and history_index is None:
+                    self.after_id = self.app.after(self.update_interval, self.process_data_and_update_views)
                 return
 
             target_index = history_index if history_index is not None else len(self.model.full_history) - 1
-            full_slice_data = self.model.full_history[:target_index + 1]
-            sliding_slice_data = self.model.full_history[max(0, target_index - self.sliding_window + 1) : target_index + 1]
 
-            self._process_and_store_features(full_slice=full_slice_data, sliding_slice=sliding_slice_data)
-            if not self.is_display_paused:
-                self.app.ui_manager.update_active_view(self.model)
-                self.app.ui_manager.update_slider_and_time(self.model, target_index)
+            if self.analysis_worker is not None:
+                # 計算はワーカーに任せ、完成したスナップショットをポーリングで受け取る
+                self.analysis_worker.submit(target_index, self.sliding_window)
+                self._schedule_snapshot_poll()
+            else:
+                full_slice_data = self.model.full_history[:target_index + 1]
+                sliding_slice_data = self.model.full_history[max(0, target_index - self.sliding_window + 1) : target_index + 1]
+
+                self._process_and_store_features(full_slice=full_slice_data, sliding_slice=sliding_slice_data)
+                self._update_views(target_index)
 
         except (queue.Empty, IndexError):
             pass
@@ -347,6 +342,53 @@ class AppController:
         if self.current_mode_handler.is_running and history_index is None:
             self.after_id = self.app.after(self.update_interval, self.process_data_and_update_views)
 
+    def _update_views(self, target_index):
+        """計算済みの特徴量でアクティブなビューとスライダーを更新する"""
+        if not self.is_display_paused:
+            self.app.ui_manager.update_active_view(self.model)
+            self.app.ui_manager.update_slider_and_time(self.model, target_index)
+
+    def _schedule_snapshot_poll(self):
+        """解析ワーカーの結果のポーリングを予約する (予約済みなら何もしない)"""
+        if self.snapshot_poll_after_id is None:
+            self.snapshot_poll_after_id = self.app.after(SNAPSHOT_POLL_INTERVAL_MS, self._poll_analysis_snapshot)
+
+    def _poll_analysis_snapshot(self):
+        """【UIスレッドで実行】完成した最新のスナップショットがあればModelに反映して描画する"""
+        self.snapshot_poll_after_id = None
+        snapshot = self.analysis_worker.latest_snapshot()
+        if (snapshot is not None and snapshot.sequence != self.applied_snapshot_sequence
+                and snapshot.generation == self.model.full_history.generation):
+            self.applied_snapshot_sequence = snapshot.sequence
+            self.model.last_slope_dfs = snapshot.slope_dfs
+            self.model.last_power_spectrums = snapshot.power_spectrums
+            self._update_views(snapshot.history_index)
+        self._log_worker_stats()
+
+        # 計算中・待機中の要求が残っている間はポーリングを続ける
+        if not self.analysis_worker.is_idle():
+            self._schedule_snapshot_poll()
+        elif self.analysis_worker.latest_snapshot() is not snapshot:
+            self._schedule_snapshot_poll()
+
+    def _log_worker_stats(self):
+        """解析ワーカーの計算・読み飛ばしたティック数と、表示中の結果の古さを一定間隔でログに出す"""
+        if time.monotonic() - self.worker_stats_logged_at < WORKER_STATS_LOG_INTERVAL_SEC:
+            return
+        self.worker_stats_logged_at = time.monotonic()
+        stats = self.analysis_worker.get_stats()
+        age = f"{stats['snapshot_age']:.2f}s" if stats['snapshot_age'] is not None else "-"
+        latency = f"{stats['snapshot_latency']:.2f}s" if stats['snapshot_latency'] is not None else "-"
+        print(f"INFO: 解析ワーカー: 要求 {stats['ticks_requested']} / 計算 {stats['ticks_computed']} / "
+              f"読み飛ばし {stats['ticks_skipped']} ティック, 結果の経過 {age}, 計算の遅延 {latency}")
+
+    def shutdown(self):
+        """アプリの終了時に、解析ワーカーなどのバックグラウンド処理を止める"""
+        if self.analysis_worker is not None:
+            self.analysis_worker.stop()
+        # グラフ書き出し用のプロセスプールを終了し、描画プロセスを残さない
+        self.save_manager.plot_exporter.shutdown(wait=True)
+
     def save_features_to_csv(self):
         """
         全区間の分析で得られた特徴量（傾き）をCSVファイルに保存する。
@@ -398,7 +440,8 @@ class AppController:
         
         print(f"INFO: フォーカス対象を {self.focused_ids} に変更しました。")
         
-        self._refresh_views()
+        # フォーカスは計算済みの特徴量の絞り込みなので、再計算は不要
+        self.request_redraw()
 
     def focus_on_all_ids(self):
         """「全員を選択」ボタンが押されたときの処理"""
@@ -408,7 +451,7 @@ class AppController:
         
         self._set_all_spectrum_vars(True)
         
-        self._refresh_views()
+        self.request_redraw()
             
     def _set_all_spectrum_vars(self, state=True):
         """スペクトルビューの変数チェックボックスをすべてON/OFFする"""
@@ -417,7 +460,29 @@ class AppController:
 
     def _trigger_view_update(self):
         """UIの表示オプション（時間範囲など）の変更時に再描画をトリガーする"""
-        self._refresh_views()
+        self.request_redraw()
+
+    def request_redraw(self, data_changed=False):
+        """
+        再描画を予約する。短い間に届いた要求はアイドル時の1回の描画にまとめる。
+
+        Args:
+            data_changed (bool): Trueなら特徴量を計算し直してから描く (スライダー位置の変更など)。
+                Falseなら計算済みの特徴量のまま、表示オプションだけを反映して描き直す。
+        """
+        self.redraw_needs_recompute = self.redraw_needs_recompute or data_changed
+        if self.redraw_after_id is None:
+            self.redraw_after_id = self.app.after_idle(self._flush_redraw)
+
+    def _flush_redraw(self):
+        """【UIスレッドで実行】予約された再描画を実行する"""
+        self.redraw_after_id = None
+        needs_recompute = self.redraw_needs_recompute
+        self.redraw_needs_recompute = False
+        if needs_recompute:
+            self._refresh_views()
+        elif self.model.full_history:
+            self.app.ui_manager.update_active_view(self.model)
 
     def _refresh_views(self):
         """現在のスライダー位置に基づいて全ビューを再描画する"""
@@ -434,6 +499,10 @@ class AppController:
         self.config_manager.load_config() # ファイルから最新の設定を読み込む
         self.update_interval = self.config_manager.config.analysis_parameters.UPDATE_INTERVAL_MS
         self.sliding_window = self.config_manager.config.analysis_parameters.SLIDING_WINDOW_SECONDS
+        # 常駐しているキャプチャワーカーに、新しい設定のモデルを先に読み込ませる
+        # (計測中は送らない。新しい設定は次に開始するときに渡される)
+        if not self.mode_handlers["realtime"].is_running:
+            self.mode_handlers["realtime"].reconfigure()
         
         print("INFO: 設定ダイアログが閉じられ、設定がリロードされました。")
 
@@ -467,7 +536,7 @@ class AppController:
                 last_index = len(self.model.full_history) - 1
                 self.app.slider.config(to=last_index)
                 self.app.slider.set(last_index)
-                last_timestamp = self.model.full_history[-1]['timestamp']
+                last_timestamp = self.model.full_history.timestamps[-1]
                 self.app.elapsed_time_var.set(f"経過時間: {last_timestamp:.1f}s")
             self.app.update_idletasks()
 
@@ -476,6 +545,18 @@ class AppController:
         else:
             self.after_id = self.app.after(100, self._check_batch_analysis_status)
 
+    def on_tab_changed(self, event=None):
+        """
+        タブの切り替え時に、映像タブが見えているかどうかをキャプチャ側に伝え、
+        表示されたビューが前回の描画より古ければ描き直す。
+        """
+        try:
+            video_visible = self.app.notebook.select() == str(self.app.views["video"])
+        except tk.TclError:
+            return
+        self.mode_handlers["realtime"].set_video_visible(video_visible)
+        self.app.ui_manager.redraw_if_dirty(self.model)
+
     def _check_status_queue(self):
         """【追加】リアルタイム処理のステータスキューを定期的にチェックする"""
         try:
@@ -492,6 +573,8 @@ class AppController:
                 elif msg.status == Status.COMPLETED:
                     self.app.ui_manager.show_info("完了", msg.message)
                     self.stop_analysis() # 正常完了時も解析を停止
+                elif msg.status == Status.METRICS:
+                    print(f"INFO: (キャプチャ) {msg.message}")
 
         except queue.Empty:
             pass
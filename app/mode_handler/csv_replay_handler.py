@@ -1,14 +1,15 @@
 # app/mode_handler/csv_replay_handler.py
 
-import pandas as pd
 from .mode_handler_base import ModeHandlerBase
-from constants import ALL_VARIABLES
+from core.replay_cursor import ReplayCursor
 
 class CsvReplayHandler(ModeHandlerBase):
     """CSV再生モードのロジックを担当するクラス。"""
     def __init__(self, controller):
         super().__init__(controller)
-        self.csv_replay_index = 0
+        self.replay_cursor = None
+        # 1ティックあたりに進める行数 (REPLAY_SPEED) の端数を持ち越す
+        self._pending_rows = 0.0
 
     def _before_start(self):
         """開始前のチェック処理"""
@@ -19,9 +20,11 @@ class CsvReplayHandler(ModeHandlerBase):
 
     def _start_specifics(self):
         """CSVモード固有の開始処理"""
-        self.model.full_history = []
-        self.csv_replay_index = 0
-        print(f"CSV再生を開始します。対象ID: {self.model.active_ids}")
+        self.model.full_history.clear()
+        # 再生データは開始時に一度だけ配列へ変換する
+        self.replay_cursor = ReplayCursor(self.model.csv_replay_data, self.model.active_ids)
+        self._pending_rows = 0.0
+        print(f"CSV再生を開始します。対象ID: {self.model.active_ids} (再生速度: {self.replay_speed}倍)")
 
     def _stop_specifics(self):
         """CSVモード固有の停止処理"""
@@ -33,23 +36,32 @@ class CsvReplayHandler(ModeHandlerBase):
             print("CSV再生を一時停止しました。")
         else:
             print("CSV再生を再開しました。")
+
+    @property
+    def replay_speed(self):
+        """1ティックあたりに再生する行数 (1.0 で従来どおり1行ずつ)"""
+        return max(0.0, float(self.controller.analysis_params.REPLAY_SPEED))
+
     def get_next_data_packet(self):
-        if self.model.csv_replay_data is None or self.csv_replay_index >= len(self.model.csv_replay_data):
+        if self.replay_cursor is None:
             return None
+        return self.replay_cursor.next_packet()
 
-        current_row = self.model.csv_replay_data.iloc[self.csv_replay_index]
-        new_data = {'timestamp': current_row.name}
-        for id_name in self.model.active_ids:
-            id_data = {}
-            for var in ALL_VARIABLES:
-                col_name = f"{id_name}_{var}"
-                if col_name in current_row and not pd.isna(current_row[col_name]):
-                    id_data[var] = current_row[col_name]
-            if id_data:
-                new_data[id_name] = id_data
+    def ingest_next_data(self, history):
+        """再生速度に応じた行数をまとめて履歴に追加する"""
+        if self.replay_cursor is None or self.replay_cursor.remaining() == 0:
+            return False
 
-        self.csv_replay_index += 1
-        return new_data
+        self._pending_rows += self.replay_speed
+        count = int(self._pending_rows)
+        self._pending_rows -= count
+        if count == 0:
+            # 等倍未満の再生速度では、行を進めないティックがある
+            return True
+
+        timestamps, values = self.replay_cursor.next_rows(count)
+        history.extend_rows(timestamps, self.replay_cursor.ids, values)
+        return True
 
     def on_mode_selected(self):
         self.app.load_csv_button.config(state="normal")
@@ -61,5 +73,3 @@ class CsvReplayHandler(ModeHandlerBase):
     def on_mode_deselected(self):
         self.app.load_csv_button.config(state="disabled")
         self.app.batch_button.config(state="disabled")
-
-
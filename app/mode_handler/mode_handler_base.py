@@ -49,6 +49,20 @@ class ModeHandlerBase(ABC):
         """次のデータパケットを取得する"""
         pass
 
+    def ingest_next_data(self, history):
+        """
+        次のデータを取得して履歴 (HistoryStore) に追加する。
+        1ティックに複数行を取り込めるモードは子クラスで上書きする。
+
+        Returns:
+            bool: データを追加できた場合はTrue。データがなければFalse。
+        """
+        packet = self.get_next_data_packet()
+        if not packet:
+            return False
+        history.append(packet)
+        return True
+
     def _before_start(self):
         """startが呼ばれた直後、ループ開始前に行うチェック処理"""
         return True # デフォルトでは常に成功
@@ -1,29 +1,58 @@
 # app/mode_handler/realtime_handler.py
 
 import queue
+import time
 from .mode_handler_base import ModeHandlerBase
 from services.capture_service import CaptureService
+from services.packet_codec import concat_batches, reduce_batch
+from core.resampler import UniformGridResampler
 from core.config_manager import RealtimeSettingsConfig
 import dataclasses
 
 class RealtimeHandler(ModeHandlerBase):
     """リアルタイム解析モードのロジックを担当するクラス。"""
+    # 1ティックで取り出すバッチ数の上限 (キャプチャ側が速すぎてもティックが終わるように)
+    MAX_BATCHES_PER_TICK = 1000
+
     def __init__(self, controller):
         super().__init__(controller)
         self.data_queue = self.controller.app.data_queue
-        self.frame_queue = self.controller.app.frame_queue
+        self.frame_ring = self.controller.app.frame_ring
         self.status_queue = self.controller.status_queue
         self.capture_service = None
+        self.video_visible = True
+        # 最後に取り込んだデータが、キャプチャされてから何秒後に履歴に入ったか
+        self.ingest_lag = None
+        self.resampler = None
 
     def _start_specifics(self):
         """リアルタイムモード固有の開始処理"""
         rt_config_obj = self.controller.config_manager.config.realtime_settings
         rt_config_dict = dataclasses.asdict(rt_config_obj)
-        
-        self.capture_service = CaptureService(self.data_queue, self.frame_queue, self.status_queue, rt_config_dict)
-        self.capture_service.start()
-        self.model.full_history = []
+
+        # 前回の計測の停止間際に届いた古いデータを捨てる
+        while True:
+            try:
+                self.data_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        # キャプチャワーカーは一度起動したら常駐させ、モデルを読み込んだまま開始・停止を繰り返す
+        if self.capture_service is None:
+            self.capture_service = CaptureService(self.data_queue, self.frame_ring, self.status_queue)
+        self.capture_service.set_annotation_enabled(self.video_visible)
+        self.capture_service.start(rt_config_dict)
+        self.model.full_history.clear()
         self.model.active_ids = []
+        self.ingest_lag = None
+        # 'resample' では、不規則な時刻のサンプルを一定間隔のグリッドに載せてから履歴に入れる
+        params = self.controller.config_manager.config.analysis_parameters
+        self.resampler = UniformGridResampler(
+            num_variables=len(self.model.full_history.variables),
+            interval=params.REALTIME_GRID_INTERVAL_SEC,
+            gap_fill=params.REALTIME_GAP_FILL,
+            max_gap=params.REALTIME_MAX_GAP_SEC
+        )
         print("リアルタイム解析を開始します。")
 
     def _stop_specifics(self):
@@ -40,29 +69,70 @@ class RealtimeHandler(ModeHandlerBase):
             print("リアルタイム解析を再開しました。")
 
     def get_next_data_packet(self):
+        """キャプチャプロセスから届いた PacketBatch を1つ取り出す (なければNone)"""
         try:
             # キューからデータをノンブロッキングで取得
-            packet = self.data_queue.get_nowait()
-            
-            # 新しいIDが登場したら、active_idsに追加する
-            new_ids = [k for k in packet.keys() if k.startswith('ID_') and k not in self.model.active_ids]
-            if new_ids:
-                self.model.active_ids.extend(new_ids)
-                self.model.active_ids.sort() # 順番を安定させる
-            
-            return packet
+            batch = self.data_queue.get_nowait()
         except queue.Empty:
             return None # キューが空なら何もしない
 
-    def get_latest_frame(self):
-        """映像フレームキューから最新のフレームを1つだけ取得する"""
-        frame = None
-        while not self.frame_queue.empty():
-            try:
-                frame = self.frame_queue.get_nowait()
-            except queue.Empty:
+        # 新しいIDが登場したら、active_idsに追加する
+        new_ids = [k for k in batch.ids if k.startswith('ID_') and k not in self.model.active_ids]
+        if new_ids:
+            self.model.active_ids.extend(new_ids)
+            self.model.active_ids.sort() # 順番を安定させる
+        return batch
+
+    def ingest_next_data(self, history):
+        """
+        キューに溜まっている PacketBatch をすべて取り出し、配列のまま履歴へまとめて追加する。
+        REALTIME_INGEST_MODE が 'resample' なら一定間隔のグリッドに載せ直し、
+        'mean' / 'latest' なら1ティック分を1行に集約してから追加する。
+
+        リアルタイムでは終了は status_queue で通知されるので、データがないティックでもTrueを返す。
+        """
+        batches = []
+        for _ in range(self.MAX_BATCHES_PER_TICK):
+            batch = self.get_next_data_packet()
+            if batch is None:
                 break
-        return frame
+            batches.append(batch)
+        if not batches:
+            return True
+
+        batch = concat_batches(batches)
+        ingest_mode = self.controller.config_manager.config.analysis_parameters.REALTIME_INGEST_MODE
+        if ingest_mode == 'resample' and self.resampler is not None:
+            # 確定したグリッドのセルだけが返る (最新のセルは次のサンプルが届くまで保留)
+            history.extend_rows(*self.resampler.push(batch.timestamps, batch.ids, batch.values))
+        else:
+            if ingest_mode in ('mean', 'latest'):
+                batch = reduce_batch(batch, ingest_mode)
+            history.extend_rows(batch.timestamps, batch.ids, batch.values)
+        self.ingest_lag = max(0.0, time.time() - float(batch.timestamps[-1]))
+        return True
+
+    def reconfigure(self):
+        """設定の変更をキャプチャワーカーに伝え、必要ならモデルを先に読み直させる"""
+        if self.capture_service is not None:
+            rt_config_dict = dataclasses.asdict(self.controller.config_manager.config.realtime_settings)
+            self.capture_service.reconfigure(rt_config_dict)
+
+    def set_video_visible(self, visible):
+        """映像タブが見えているときだけ、キャプチャ側でフレームを描画させる"""
+        self.video_visible = visible
+        if self.capture_service is not None:
+            self.capture_service.set_annotation_enabled(visible)
+
+    def shutdown(self):
+        """キャプチャワーカーを終了する (アプリの終了時)"""
+        if self.capture_service is not None:
+            self.capture_service.shutdown()
+            self.capture_service = None
+
+    def get_frame_ring(self):
+        """描画済みフレームを受け取る共有メモリのリングを返す"""
+        return self.frame_ring
 
 
 
@@ -3,6 +3,9 @@ import tkinter as tk
 import pandas as pd
 from tkinter import messagebox
 
+# 特徴量から描くグラフのビュー (映像タブ以外)
+CHART_VIEW_KEYS = ("clustering", "spectrum", "radar", "kmeans", "heatmap")
+
 class UIManager:
     def __init__(self, app_instance):
         """
@@ -16,7 +19,8 @@ class UIManager:
         self.views = app_instance.views # 各グラフViewへの参照を保持
         self.analysis_params = self.controller.config_manager.config.analysis_parameters
         self.sliding_window = self.analysis_params.SLIDING_WINDOW_SECONDS
-
+        # 最後の描画より後にデータが変わり、次にタブが表示されたときに描き直すビュー
+        self.dirty_views = set()
 
     def show_info(self, title, message):
         """情報メッセージボックスを表示する"""
@@ -49,36 +53,23 @@ class UIManager:
         """
         # リアルタイムモードの場合、常に映像を更新する
         if self.controller.current_mode_handler.__class__.__name__ == 'RealtimeHandler':
-            latest_frame = self.controller.current_mode_handler.get_latest_frame()
-            if latest_frame is not None:
-                self.views["video"].update_frame(latest_frame)
+            # 共有メモリ上の最新フレームを直接表示する (新しいフレームがなければ何もしない)
+            self.views["video"].update_from_ring(self.controller.current_mode_handler.get_frame_ring())
                 
         if not model_data.full_history:
             return
 
-        # アクティブなタブのウィジェットを取得する
-        active_view_key = None
-        try:
-            selected_tab_id = self.app.notebook.select()
-            if selected_tab_id:
-                active_widget = self.app.notebook.nametowidget(selected_tab_id)
-                # ウィジェットオブジェクトを直接比較して、どのビューがアクティブかを探す
-                for key, view_widget in self.views.items():
-                    if view_widget == active_widget:
-                        active_view_key = key
-                        break
-        except tk.TclError:
-            return # ウィンドウ終了時などのエラーは無視
-
-        # アクティブなビューが見つからなければ、何もせず終了
-        if not active_view_key:
+        # アクティブなビューがグラフでなければ (映像タブなど)、グラフはすべて後で描き直す
+        active_view_key = self.get_active_view_key()
+        if active_view_key not in CHART_VIEW_KEYS:
+            self.dirty_views = set(CHART_VIEW_KEYS)
             return
             
         # 2. フィルタリングされたデータを準備
         df_full_filtered, df_sliding_filtered, ps_filtered = self._get_filtered_data(model_data)
 
         # 3. 期間（秒数）を計算
-        current_timestamp = model_data.full_history[-1].get('timestamp', 0)
+        current_timestamp = float(model_data.full_history.timestamps[-1])
         full_duration = current_timestamp
         sliding_duration = self.sliding_window
 
@@ -99,6 +90,28 @@ class UIManager:
         elif 'heatmap' in active_view_key.lower():
             self.views["heatmap"].update_plot(df_full_filtered, df_sliding_filtered, full_duration, sliding_duration)
 
+        # 見えていないタブは描かずに、表示されたときに描き直す
+        self.dirty_views = set(CHART_VIEW_KEYS) - {active_view_key}
+
+    def get_active_view_key(self):
+        """現在アクティブなタブのビューのキーを返す (見つからなければNone)"""
+        try:
+            selected_tab_id = self.app.notebook.select()
+            if selected_tab_id:
+                active_widget = self.app.notebook.nametowidget(selected_tab_id)
+                # ウィジェットオブジェクトを直接比較して、どのビューがアクティブかを探す
+                for key, view_widget in self.views.items():
+                    if view_widget == active_widget:
+                        return key
+        except tk.TclError:
+            pass # ウィンドウ終了時などのエラーは無視
+        return None
+
+    def redraw_if_dirty(self, model_data):
+        """タブの切り替え時に、表示されたビューが古ければ描き直す"""
+        if self.get_active_view_key() in self.dirty_views:
+            self.update_active_view(model_data)
+
     def _get_filtered_data(self, model_data):
         """
         Modelのデータから、現在フォーカスされているIDでフィルタリングしたデータを取得する。
@@ -130,17 +143,24 @@ class UIManager:
                 self.app.slider.set(current_max_index)
         
         try:
-            playback_time = model_data.full_history[history_index]['timestamp']
+            playback_time = model_data.full_history.timestamps[history_index]
             self.app.elapsed_time_var.set(f"経過時間: {playback_time:.1f}s")
 
             # 再生時間の手入力ボックスも更新
             if not self.controller.is_realtime_mode:
-                total_time = model_data.full_history[-1]['timestamp']
+                total_time = model_data.full_history.timestamps[-1]
                 self.app.time_input_var.set(f"{playback_time:.1f}")
                 self.app.total_time_var.set(f"s / {total_time:.1f}s")
         except (IndexError, KeyError):
             pass
 
+    def update_ingest_lag(self, lag_seconds):
+        """リアルタイムの取り込み遅延 (キャプチャから何秒遅れて履歴に入ったか) を表示する"""
+        if lag_seconds is None:
+            self.app.ingest_lag_var.set("")
+        else:
+            self.app.ingest_lag_var.set(f"取り込み遅延: {lag_seconds:.2f}s")
+
     def update_control_buttons_state(self):
         """
         Controllerの状態に基づいて、再生コントロールボタンの有効/無効を切り替える。
@@ -174,6 +194,7 @@ class UIManager:
         self.views["heatmap"].update_plot(empty_df, empty_df, 0, 0)
         self.views["radar"].update_plot({'sliding': empty_df, 'full': empty_df})
         self.views["spectrum"].update_plot(empty_ps)
+        self.dirty_views.clear()
 
     def update_focus_listbox(self, ids):
         """フォーカスIDリストボックスを更新する"""
@@ -207,6 +228,7 @@ class UIManager:
         self.app.slider.config(to=100)
         self.app.progress_var.set(0)
         self.app.elapsed_time_var.set("経過時間: 0.0s")
+        self.app.ingest_lag_var.set("")
         self.app.time_input_var.set("")
         self.app.total_time_var.set("")
         self.app.focus_id_listbox.delete(0, tk.END)
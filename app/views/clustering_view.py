@@ -4,8 +4,9 @@ import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from scipy.cluster.hierarchy import linkage, dendrogram
-from sklearn.preprocessing import StandardScaler
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy.cluster.hierarchy import dendrogram
 import os
 
 class ClusteringView(ttk.Frame):
@@ -95,15 +96,10 @@ class ClusteringView(ttk.Frame):
             return
 
         try:
-            df_processed = df_features.copy()
-            df_processed.fillna(0, inplace=True)
-            id_labels = df_processed.index.tolist()
+            id_labels = df_features.index.tolist()
             
-            scaler = StandardScaler()
-            scaled_features = scaler.fit_transform(df_processed)
-            
-            # ★★★ 引数で受け取った手法を使用する ★★★
-            linkage_result = linkage(scaled_features, method=method)
+            # 特徴量が前回と同じなら、標準化と連結行列はキャッシュから取り出す
+            linkage_result = self.controller.cluster_cache.linkage(df_features, method=method)
 
             dendrogram(
                 linkage_result,
@@ -140,7 +136,10 @@ class ClusteringView(ttk.Frame):
             # UIで選択されている手法を取得
             selected_method = self.clustering_method_var.get()
             
-            temp_fig, temp_ax = plt.subplots(figsize=(10, 7))
+            # 保存スレッドから描画するので、pyplot (Tkのバックエンド) を介さずAggで描く
+            temp_fig = Figure(figsize=(10, 7))
+            FigureCanvasAgg(temp_fig)
+            temp_ax = temp_fig.subplots()
             
             duration = timestamp
             title = f"全区間 階層型クラスタリング (N={duration:.0f}s, method='{selected_method}')"
@@ -153,15 +152,11 @@ class ClusteringView(ttk.Frame):
             temp_fig.tight_layout(rect=[0, 0.05, 1, 1])
             file_path = os.path.join(output_folder, f"クラスター_全ID_{selected_method}.png") # ファイル名に手法名を追加
             temp_fig.savefig(file_path, dpi=150)
-            
-            plt.close(temp_fig)
 
             print(f"INFO: 全IDクラスターグラフを保存しました: {file_path}")
 
         except Exception as e:
             print(f"ERROR: クラスタリンググラフの保存中にエラーが発生しました: {e}")
-            if 'temp_fig' in locals():
-                plt.close(temp_fig)
 
     def _save_single_ax(self, ax, filepath):
         """指定されたAxesオブジェクトのみをファイルに保存します。"""
@@ -20,6 +20,8 @@ class PlaybackPanel(ttk.Frame):
         playback_info_frame.pack(fill=tk.X, expand=True)
         
         ttk.Label(playback_info_frame, textvariable=self.app.elapsed_time_var).pack(side=tk.LEFT)
+        # リアルタイムで、キャプチャから履歴への取り込みが何秒遅れているか
+        ttk.Label(playback_info_frame, textvariable=self.app.ingest_lag_var).pack(side=tk.LEFT, padx=(10, 0))
         
         playback_input_frame = ttk.Frame(playback_info_frame)
         playback_input_frame.pack(side=tk.RIGHT)
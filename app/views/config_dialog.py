@@ -5,6 +5,7 @@ from tkinter import ttk
 from tkinter import messagebox
 from core.config_manager import AppConfig, FFTInitialViewConfig, RealtimeSettingsConfig, AnalysisParametersConfig
 import json # for converting back to dict
+import dataclasses
 
 class ConfigDialog(tk.Toplevel):
     def __init__(self, parent, config_manager):
@@ -118,20 +119,22 @@ class ConfigDialog(tk.Toplevel):
                     variable_group=self.fft_variable_group.get(),
                     show_fit_line=self.fft_show_fit_line.get()
                 ),
-                realtime_settings=RealtimeSettingsConfig(
+                realtime_settings=dataclasses.replace(
+                    self.config_data.realtime_settings,
                     video_source=self.rt_video_source.get(),
                     yolo_model_path=self.rt_yolo_path.get(),
                     mediapipe_model_path=self.rt_mediapipe_path.get(),
                     device=self.rt_device.get()
                 ),
-                analysis_parameters=AnalysisParametersConfig(
+                # ダイアログに項目のない詳細パラメータは現在の値を引き継ぐ
+                analysis_parameters=dataclasses.replace(
+                    self.config_data.analysis_parameters,
                     UPDATE_INTERVAL_MS=self.an_update_interval.get(),
                     SLIDING_WINDOW_SECONDS=self.an_sliding_window.get()
                 )
             )
             
             # dataclassesを辞書に変換して保存
-            import dataclasses
             config_dict = dataclasses.asdict(updated_config)
 
             self.config_manager.save_config(config_dict)
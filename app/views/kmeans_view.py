@@ -4,10 +4,10 @@ import tkinter as tk
 from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import pandas as pd
 import numpy as np
+from core.incremental_kmeans import IncrementalKMeans
+from core.cluster_cache import frame_fingerprint
 
 class KmeansView(ttk.Frame):
     def __init__(self, parent, controller):
@@ -42,6 +42,15 @@ class KmeansView(ttk.Frame):
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+        # KMEANS_MODE が 'incremental' のとき、前回の重心から計算を始めるための状態 (グラフごと)
+        refit_ratio = self.controller.config_manager.config.analysis_parameters.KMEANS_REFIT_INERTIA_RATIO
+        self.incremental_kmeans = {
+            'sliding': IncrementalKMeans(refit_ratio=refit_ratio),
+            'full': IncrementalKMeans(refit_ratio=refit_ratio),
+        }
+        # 前回描画した特徴量の指紋 (データが止まっているかの判定に使う)
+        self._last_fingerprints = None
+
     def _on_k_slider_change(self, value):
         """スライダーが動かされたときに呼ばれる"""
         k = int(float(value))
@@ -59,37 +68,63 @@ class KmeansView(ttk.Frame):
 
         # 全区間データ
         title_full = f"全区間 k-means法 (N={full_duration_seconds:.0f}s, k={k})"
-        self._perform_kmeans(self.ax_full, df_full, k, title_full)
+        self._perform_kmeans(self.ax_full, df_full, k, title_full, 'full')
 
         # スライディング窓データ
         title_sliding = f"直近{sliding_duration_seconds:.0f}秒 (N={sliding_duration_seconds:.0f}s, k={k})"
-        self._perform_kmeans(self.ax_sliding, df_sliding, k, title_sliding)
+        self._perform_kmeans(self.ax_sliding, df_sliding, k, title_sliding, 'sliding')
 
         self.fig.tight_layout()
         self.canvas.draw()
 
-    def _perform_kmeans(self, ax, df_features, k, title):
+        self._precompute_if_static(df_sliding, df_full)
+
+    def _precompute_if_static(self, df_sliding, df_full):
+        """
+        特徴量が前回の描画から変わっていなければ (一時停止中・スライダー操作後・一括解析の表示など)、
+        スライダーの範囲のkを先に計算しておき、kを動かしたときはキャッシュから描けるようにする。
+        再生中は毎ティック特徴量が変わり、先に計算しても次のティックで捨てることになるので行わない。
+        """
+        frames = [df for df in (df_sliding, df_full) if df is not None and not df.empty]
+        fingerprints = tuple(frame_fingerprint(df) for df in frames)
+        is_static = bool(fingerprints) and fingerprints == self._last_fingerprints
+        self._last_fingerprints = fingerprints
+        params = self.controller.config_manager.config.analysis_parameters
+        # 'incremental' では前回の重心から1回だけ計算するので、10回初期化の計算をまとめて先に行うことはしない
+        if is_static and params.KMEANS_PRECOMPUTE and params.KMEANS_MODE != 'incremental':
+            k_range = range(int(self.k_slider.cget('from')), int(self.k_slider.cget('to')) + 1)
+            self.controller.cluster_cache.precompute_kmeans(frames, k_range)
+
+    def _perform_kmeans(self, ax, df_features, k, title, panel):
         """指定されたAxesにk-meansの結果を描画する"""
         if df_features is None or df_features.empty or len(df_features) < k:
+            # データがなくなったら (リセットなど)、次は前回の重心を使わずに計算する
+            self.incremental_kmeans[panel].reset()
             msg = f"クラスタリングには\nk={k}個以上のIDが必要です"
             ax.text(0.5, 0.5, msg, ha='center', va='center', fontsize=12, color='gray')
             ax.set_title(title)
             return
 
         try:
-            df_processed = df_features.copy().fillna(0)
-            scaler = StandardScaler()
-            scaled_features = scaler.fit_transform(df_processed)
-
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            clusters = kmeans.fit_predict(scaled_features)
+            # 特徴量とkが前回と同じなら、標準化とk-meansの結果はキャッシュから取り出す
+            cluster_cache = self.controller.cluster_cache
+            if self.controller.config_manager.config.analysis_parameters.KMEANS_MODE == 'incremental':
+                # 前回の重心から1回だけ計算し、クラスタ番号を前回に揃える (悪化したときだけ全体から計算し直す)
+                fingerprint, scaled_features = cluster_cache.scaled(df_features)
+                clusters = self.incremental_kmeans[panel].update(
+                    scaled_features, k,
+                    full_fit=lambda: cluster_cache.kmeans_labels(df_features, k)[1],
+                    fingerprint=fingerprint
+                )
+            else:
+                scaled_features, clusters = cluster_cache.kmeans_labels(df_features, k)
 
             # 主成分分析などで2次元に削減して可視化することも多いが、
             # ここではシンプルに特徴量の最初の2つで散布図を作成する
-            ax.scatter(scaled_features[:, 0], scaled_features[:, 1], c=clusters, cmap='viridis', s=50, alpha=0.8)
+            ax.scatter(scaled_features[:, 0], scaled_features[:, 1], c=clusters, cmap='viridis', vmin=0, vmax=max(k - 1, 1), s=50, alpha=0.8)
 
             # 各点にIDラベルを付ける
-            for i, label in enumerate(df_processed.index):
+            for i, label in enumerate(df_features.index):
                 ax.text(scaled_features[i, 0], scaled_features[i, 1], label, fontsize=8)
 
             ax.set_title(title)
@@ -4,8 +4,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
 from constants import EMOTION_VARS, BEHAVIOR_VARS
+from core.plot_export import draw_radar
 import os
 
 
@@ -71,34 +71,8 @@ class RadarView(ttk.Frame):
 
     def _plot_radar(self, df, ax, title, show_values=True):
         """レーダーチャートを1つ描画するヘルパー関数"""
-        labels = df.columns
-        num_vars = len(labels)
-        
-        angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-        angles_closed = angles + angles[:1]
-        
-        ax.set_theta_offset(np.pi / 2)
-        ax.set_theta_direction(-1)
-        
-        ax.set_xticks(angles)
-        ax.set_xticklabels(labels, fontsize=8)
-
-        ax.set_ylim(0, self.max_val)
-        ax.set_title(title, pad=25)
-        
-        for i, row_name in enumerate(df.index):
-            stats = df.iloc[i].values.tolist()
-            stats_closed = stats + stats[:1]
-            ax.plot(angles_closed, stats_closed, label=row_name)
-            ax.fill(angles_closed, stats_closed, alpha=0.1)
-            
-            if show_values:
-                for angle, value in zip(angles, stats):
-                    ax.text(angle, value + 0.05, f"{value:.2f}",
-                            ha='center', va='center', fontsize=7, color='black')
-                
-        if not df.empty:
-            ax.legend(loc='upper right', bbox_to_anchor=(1.25, 1.15), fontsize='small')
+        rows = [(row_name, df.loc[row_name].tolist()) for row_name in df.index]
+        draw_radar(ax, list(df.columns), rows, title, self.max_val, show_values=show_values)
 
     def _apply_max_val(self):
         """入力ボックスの値をグラフの最大値に適用する"""
@@ -129,49 +103,32 @@ class RadarView(ttk.Frame):
 
 # views/radar_view.py
 
-    def save_plot(self, output_folder, all_data, progress_callback, timestamp, cancel_check):
+    def build_export_tasks(self, output_folder, all_data, progress_callback, timestamp):
         """
-        データを受け取り、IDごとに単一のレーダーチャート画像をファイルに保存する。
+        IDごとのレーダーチャートの描画タスクを作る (描画は PlotExporter が並列に行う)。
         """
         print("INFO: レーダーチャートの一括保存を開始します。")
         slope_df = all_data.get('slope_dfs', {}).get('full')
 
         if slope_df is None or slope_df.empty:
             if progress_callback:
-                num_ids = len(self.controller.model.active_ids)
-                for _ in range(num_ids):
+                for _ in range(len(self.controller.model.active_ids)):
                     progress_callback()
-            return
+            return []
 
+        tasks = []
         for id_name in slope_df.index:
-            # ★追加: ループの先頭でキャンセルされたかチェックします
-            if cancel_check():
-                print("INFO: レーダーチャートの保存がキャンセルされました。")
-                return
-
-            temp_fig, (temp_ax1, temp_ax2) = plt.subplots(1, 2, figsize=(14, 6), subplot_kw=dict(polar=True))
-            
-            df_single_id = slope_df.loc[[id_name]]
-            
-            df_emotion = df_single_id[EMOTION_VARS].abs()
-            self._plot_radar(df_emotion, temp_ax1, f"感情 (EMOTION) - {id_name}", show_values=True)
-            
-            df_behavior = df_single_id[BEHAVIOR_VARS].abs()
-            self._plot_radar(df_behavior, temp_ax2, f"行動 (BEHAVIOR) - {id_name}", show_values=True)
-            
             id_folder = os.path.join(output_folder, id_name)
             os.makedirs(id_folder, exist_ok=True)
-            
-            file_path = os.path.join(id_folder, f"レーダーチャート_{id_name}.png")
-
-            temp_fig.suptitle(f"Saved at: {timestamp:.1f} sec", fontsize=10, y=0.02, ha='right')
-            
-            temp_fig.savefig(file_path, dpi=150)
-            
-            plt.close(temp_fig)
-            if progress_callback:
-                progress_callback()
-
-
-
-
+            tasks.append({
+                'kind': 'radar',
+                'id_name': id_name,
+                'emotion_labels': list(EMOTION_VARS),
+                'emotion_values': slope_df.loc[id_name, EMOTION_VARS].abs().tolist(),
+                'behavior_labels': list(BEHAVIOR_VARS),
+                'behavior_values': slope_df.loc[id_name, BEHAVIOR_VARS].abs().tolist(),
+                'max_val': self.max_val,
+                'timestamp': timestamp,
+                'file_path': os.path.join(id_folder, f"レーダーチャート_{id_name}.png"),
+            })
+        return tasks
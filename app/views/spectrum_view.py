@@ -5,9 +5,176 @@ from tkinter import ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
+import itertools
 from constants import ALL_VARIABLES, EMOTION_VARS, BEHAVIOR_VARS
 import os
 
+
+class _SpectrumPlot:
+    """
+    1つのAxesにスペクトルを描く保持型 (retained-mode) の描画クラス。
+    (ID, 変数) ごとにスペクトルと近似直線の Line2D を1本ずつ作って使い回し、毎回は set_data で値だけ差し替える。
+    線と近似式のテキストは animated にして、背景 (軸・目盛り・凡例) を保存しておき、
+    普段はその背景に線だけを描き直して blit する。表示する系列の組・タイトル・軸の範囲が変わったときだけ
+    レイアウトを計算し直して全体を描画する。
+    """
+    # 軸の範囲は、データがはみ出すか、データより1桁以上広くなったときだけ変える (変えるたびに全体を描画するため)
+    LIMIT_SLACK_DECADES = 1.0
+    LIMIT_PADDING_DECADES = 0.25
+
+    def __init__(self, fig, ax, canvas):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self._lines = {}            # (ID, 変数) -> (スペクトルの線, 近似直線)
+        self._series = None         # 前回表示した系列の並び (凡例・レイアウトの再計算の判定用)
+        self._title = None
+        self._background = None
+        # 系列ごとの色は最初に現れたときに決め、以降は変えない
+        self._colors = itertools.cycle(plt.rcParams['axes.prop_cycle'].by_key()['color'])
+
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_xlabel("Frequency (log)")
+        ax.set_ylabel("Amplitude (log)")
+        ax.grid(True, which="both", ls="--")
+        self._equation_text = ax.text(0.98, 0.02, "", transform=ax.transAxes, fontsize=8,
+                                      verticalalignment='bottom', horizontalalignment='right',
+                                      bbox={'boxstyle': 'round', 'facecolor': 'wheat', 'alpha': 0.5},
+                                      animated=True, visible=False)
+        self._empty_text = ax.text(0.5, 0.5, "データがありません", ha='center', va='center',
+                                   transform=ax.transAxes, visible=False)
+        # ウィンドウのサイズ変更などで全体が描画されたら、背景を取り直して線を描き足す
+        self._draw_cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _get_lines(self, key):
+        """系列の線を返す (初めての系列なら作る)"""
+        lines = self._lines.get(key)
+        if lines is None:
+            color = next(self._colors)
+            data_line, = self.ax.plot([], [], color=color, label=f"{key[0]}_{key[1]}", animated=True)
+            fit_line, = self.ax.plot([], [], '--', color=color, animated=True)
+            lines = (data_line, fit_line)
+            self._lines[key] = lines
+        return lines
+
+    def reset(self):
+        """保持している線をすべて破棄する (データがクリアされたとき)"""
+        for data_line, fit_line in self._lines.values():
+            data_line.remove()
+            fit_line.remove()
+        self._lines = {}
+        self._colors = itertools.cycle(plt.rcParams['axes.prop_cycle'].by_key()['color'])
+
+    def update(self, spectrum_data, selected_params, show_fit, title):
+        """
+        spectrum_data ({ID: {変数: (freq, amp, slope, intercept)}}) の値で描画を更新する。
+        """
+        series = []
+        equations = []
+        bounds = []
+        for id_name, id_spectra in spectrum_data.items():
+            for param_name in selected_params:
+                data = id_spectra.get(param_name)
+                if data is None:
+                    continue
+                freq, amp, slope, intercept = data
+                if freq is None or len(freq) == 0:
+                    continue
+
+                key = (id_name, param_name)
+                data_line, fit_line = self._get_lines(key)
+                data_line.set_data(freq, amp)
+                bounds.append((freq, amp))
+                series.append(key)
+
+                if show_fit and slope is not None and intercept is not None:
+                    # 両対数軸では近似直線は直線なので、両端の2点だけで描ける
+                    ends = np.asarray(freq)[[0, -1]]
+                    fit = 10**(slope * np.log10(ends) + intercept)
+                    fit_line.set_data(ends, fit)
+                    fit_line.set_visible(True)
+                    bounds.append((ends, fit))
+                    equations.append(f"{id_name}_{param_name}: y={slope:.2f}x+{intercept:.2f}")
+                else:
+                    fit_line.set_visible(False)
+
+        visible = set(series)
+        for key, (data_line, fit_line) in self._lines.items():
+            data_line.set_visible(key in visible)
+            if key not in visible:
+                fit_line.set_visible(False)
+        self._equation_text.set_text("\n".join(equations))
+        self._equation_text.set_visible(bool(equations))
+
+        layout_changed = (series != self._series or title != self._title)
+        if layout_changed:
+            self._series = series
+            self._title = title
+            self.ax.set_title(title)
+            self._empty_text.set_visible(not series)
+            legend = self.ax.get_legend()
+            if legend is not None:
+                legend.remove()
+            if series:
+                self.ax.legend(handles=[self._lines[key][0] for key in series], fontsize='small')
+
+        limits_changed = self._update_limits(bounds)
+        if layout_changed or limits_changed or self._background is None:
+            if layout_changed:
+                self.fig.tight_layout()
+            # 全体を描画すると draw_event で背景が取り直され、線もその上に描かれる
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self.fig.bbox)
+
+    def _update_limits(self, bounds):
+        """データが今の軸の範囲に収まらないか、範囲が広すぎるときだけ軸の範囲を変える"""
+        if not bounds:
+            return False
+        changed = False
+        for axis, values in (('x', [b[0] for b in bounds]), ('y', [b[1] for b in bounds])):
+            values = np.concatenate([np.asarray(v, dtype=float).ravel() for v in values])
+            values = values[np.isfinite(values) & (values > 0)]
+            if len(values) == 0:
+                continue
+            low, high = np.log10(values.min()), np.log10(values.max())
+            get_lim = self.ax.get_xlim if axis == 'x' else self.ax.get_ylim
+            current_low, current_high = np.log10(np.maximum(get_lim(), 1e-300))
+            fits = (current_low <= low and high <= current_high and
+                    low - current_low <= self.LIMIT_SLACK_DECADES and current_high - high <= self.LIMIT_SLACK_DECADES)
+            if fits:
+                continue
+            padding = self.LIMIT_PADDING_DECADES if high > low else 0.5
+            new_limits = (10**(low - padding), 10**(high + padding))
+            if axis == 'x':
+                self.ax.set_xlim(new_limits)
+            else:
+                self.ax.set_ylim(new_limits)
+            changed = True
+        return changed
+
+    def _draw_animated(self):
+        for data_line, fit_line in self._lines.values():
+            if data_line.get_visible():
+                self.ax.draw_artist(data_line)
+            if fit_line.get_visible():
+                self.ax.draw_artist(fit_line)
+        if self._equation_text.get_visible():
+            self.ax.draw_artist(self._equation_text)
+
+    def _on_draw(self, event):
+        """全体の描画の直後に呼ばれる。背景を保存し、animated な線をその上に描く"""
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+    def disconnect(self):
+        self.canvas.mpl_disconnect(self._draw_cid)
+
+
 class SpectrumView(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -64,6 +231,8 @@ class SpectrumView(ttk.Frame):
         self.ax = self.fig.add_subplot(1, 1, 1)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plot = _SpectrumPlot(self.fig, self.ax, self.canvas)
+        self.plot_new = None
 
     def _open_spectrum_window(self):
         """スペクトルグラフを別ウィンドウで開く"""
@@ -80,6 +249,7 @@ class SpectrumView(ttk.Frame):
         self.ax_new = self.fig_new.add_subplot(1, 1, 1)
         self.canvas_new = FigureCanvasTkAgg(self.fig_new, master=self.spectrum_window)
         self.canvas_new.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plot_new = _SpectrumPlot(self.fig_new, self.ax_new, self.canvas_new)
 
         # ウィンドウが閉じられたときの処理
         self.spectrum_window.protocol("WM_DELETE_WINDOW", self._on_spectrum_window_close)
@@ -93,62 +263,31 @@ class SpectrumView(ttk.Frame):
             self.spectrum_window.destroy()
             self.spectrum_window = None
             # MatplotlibのFigureリソースも解放
+            self.plot_new.disconnect()
+            self.plot_new = None
             plt.close(self.fig_new)
 
-    def _draw_spectrum_on_ax(self, ax, power_spectrums):
-        """指定されたAxesオブジェクトにグラフを描画する共通ヘルパー"""
-        ax.clear()
-
+    def _draw_spectrum(self, plot, power_spectrums):
+        """指定された描画先 (_SpectrumPlot) を現在の選択状態で更新する共通ヘルパー"""
         selected_params = [name for name, var in self.param_vars.items() if var.get()]
         time_range_key = 'sliding' if self.controller.app.time_range_var.get() == "30秒窓" else 'full'
-
-        if power_spectrums:
-            spectrum_data = power_spectrums.get(time_range_key, {})
-            equations = []
-            ids_to_plot = spectrum_data.keys()
-
-            for id_name in ids_to_plot:
-                for param_name in selected_params:
-                    if id_name in spectrum_data and param_name in spectrum_data.get(id_name, {}):
-                        freq, amp, slope, intercept = spectrum_data[id_name][param_name]
-                        if freq is None or len(freq) == 0: continue
-
-                        line, = ax.loglog(freq, amp, label=f"{id_name}_{param_name}")
-
-                        if self.show_fit_var.get() and slope is not None and intercept is not None:
-                            line_color = line.get_color()
-                            log_freq = np.log10(freq)
-                            fit_line = 10**(slope * log_freq + intercept)
-                            ax.loglog(freq, fit_line, '--', color=line_color)
-                            equations.append(f"{id_name}_{param_name}: y={slope:.2f}x+{intercept:.2f}")
-
-            if ax.has_data():
-                ax.legend(fontsize='small')
-                if self.show_fit_var.get() and equations:
-                    ax.text(0.98, 0.02, "\n".join(equations), transform=ax.transAxes, fontsize=8, verticalalignment='bottom', horizontalalignment='right', bbox={'boxstyle': 'round', 'facecolor': 'wheat', 'alpha': 0.5})
-            ax.grid(True, which="both", ls="--")
-        else:
-            ax.text(0.5, 0.5, "データがありません", ha='center', va='center')
-
         title = f"パワースペクトル ({self.controller.app.time_range_var.get()})"
-        ax.set_title(title)
-        ax.set_xlabel("Frequency (log)")
-        ax.set_ylabel("Amplitude (log)")
+
+        if not power_spectrums:
+            plot.reset()
+        spectrum_data = power_spectrums.get(time_range_key, {}) if power_spectrums else {}
+        plot.update(spectrum_data, selected_params, self.show_fit_var.get(), title)
 
     def update_plot(self, power_spectrums=None):
         if power_spectrums is None:
             power_spectrums = self.controller.model.last_power_spectrums
 
         # メインウィンドウのタブ内グラフを描画
-        self._draw_spectrum_on_ax(self.ax, power_spectrums)
-        self.fig.tight_layout()
-        self.canvas.draw()
+        self._draw_spectrum(self.plot, power_spectrums)
 
         # 別ウィンドウが開いていれば、そちらも更新
         if self.spectrum_window and self.spectrum_window.winfo_exists():
-            self._draw_spectrum_on_ax(self.ax_new, power_spectrums)
-            self.fig_new.tight_layout()
-            self.canvas_new.draw()
+            self._draw_spectrum(self.plot_new, power_spectrums)
 
     def _trigger_update(self):
         """UI操作をコントローラーに通知する"""
@@ -186,68 +325,43 @@ class SpectrumView(ttk.Frame):
             self.ctrl_frame.pack(fill=tk.X, pady=5, padx=5, before=self.canvas.get_tk_widget())
             self.toggle_button.config(text="◀ コントロールを隠す")
 
-    def save_plot(self, output_folder, all_data, progress_callback, timestamp, cancel_check):
+    def build_export_tasks(self, output_folder, all_data, progress_callback, timestamp):
         """
-        データを受け取り、IDと変数ごとに個別のスペクトルグラフをファイルに保存する。
+        IDと変数ごとのスペクトルグラフの描画タスクを作る (描画は PlotExporter が並列に行う)。
+        描画するデータがない変数の分は、その場で progress_callback を呼んで進める。
         """
         print("INFO: スペクトルグラフの一括保存を開始します。")
         power_spectrums_data = all_data.get('power_spectrums')
+        all_ids = self.controller.model.active_ids
 
         if not power_spectrums_data:
-            num_ids = len(self.controller.model.active_ids)
-            if progress_callback and num_ids > 0:
-                num_spectrum_vars = len(ALL_VARIABLES)
-                for _ in range(num_ids * num_spectrum_vars):
+            if progress_callback:
+                for _ in range(len(all_ids) * len(ALL_VARIABLES)):
                     progress_callback()
-            return
+            return []
 
         spectrum_data = power_spectrums_data.get('full', {})
-        all_ids = self.controller.model.active_ids
-        all_vars = ALL_VARIABLES
-
+        tasks = []
         for id_name in all_ids:
-            if cancel_check():
-                print("INFO: スペクトルグラフの保存がキャンセルされました。")
-                return
-
             id_folder = os.path.join(output_folder, id_name, "FFT")
             os.makedirs(id_folder, exist_ok=True)
 
-            for param_name in all_vars:
-                if cancel_check():
-                    print("INFO: スペクトルグラフの保存がキャンセルされました。")
-                    return
-
-                if id_name in spectrum_data and param_name in spectrum_data[id_name]:
-                    data = spectrum_data[id_name][param_name]
-                    freq, amp, slope, intercept = data
-                    if freq is None or len(freq) == 0:
-                        if progress_callback: progress_callback()
-                        continue
-
-                    temp_fig, temp_ax = plt.subplots(figsize=(8, 6))
-                    temp_ax.loglog(freq, amp, label=f"{id_name}_{param_name}")
-
-                    if slope is not None and intercept is not None:
-                        log_freq = np.log10(freq)
-                        fit_line = 10**(slope * log_freq + intercept)
-                        temp_ax.loglog(freq, fit_line, '--')
-                        equation = f"y={slope:.2f}x+{intercept:.2f}"
-                        temp_ax.set_title(f"パワースペクトル - {id_name}_{param_name}\n({equation})")
-                    else:
-                        temp_ax.set_title(f"パワースペクトル - {id_name}_{param_name}")
-
-                    temp_ax.set_xlabel("Frequency (log)")
-                    temp_ax.set_ylabel("Amplitude (log)")
-                    temp_ax.grid(True, which="both", ls="--")
-                    temp_ax.legend()
-
-                    file_path = os.path.join(id_folder, f"スペクトル_{id_name}_{param_name}.png")
-
-                    temp_fig.suptitle(f"Saved at: {timestamp:.1f} sec", fontsize=10, y=0.02, ha='right')
-
-                    temp_fig.savefig(file_path, dpi=150)
-                    plt.close(temp_fig)
-
-                if progress_callback:
-                    progress_callback()
\ No newline at end of file
+            for param_name in ALL_VARIABLES:
+                data = spectrum_data.get(id_name, {}).get(param_name)
+                if data is None or data[0] is None or len(data[0]) == 0:
+                    if progress_callback: progress_callback()
+                    continue
+
+                freq, amp, slope, intercept = data
+                tasks.append({
+                    'kind': 'spectrum',
+                    'id_name': id_name,
+                    'param_name': param_name,
+                    'freq': np.asarray(freq),
+                    'amp': np.asarray(amp),
+                    'slope': slope,
+                    'intercept': intercept,
+                    'timestamp': timestamp,
+                    'file_path': os.path.join(id_folder, f"スペクトル_{id_name}_{param_name}.png"),
+                })
+        return tasks
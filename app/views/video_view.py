@@ -31,4 +31,13 @@ class VideoView(ttk.Frame):
         
         # ラベルに画像を設定
         self.video_label.imgtk = imgtk
-        self.video_label.configure(image=imgtk)
\ No newline at end of file
+        self.video_label.configure(image=imgtk)
+
+    def update_from_ring(self, frame_ring):
+        """
+        SharedFrameRing の最新スロットを、共有メモリ上のビューのまま読み出して表示する。
+        前回表示したフレームから更新がなければ何もしない。
+        """
+        if frame_ring is None:
+            return
+        frame_ring.read_latest(self.update_frame)
\ No newline at end of file
@@ -0,0 +1,157 @@
+# ファイル名: batch_cli.py (GUIを使わない一括解析の起動ファイル)
+#
+# 使い方:
+#   python batch_cli.py data/session_*/ -o results -j 8
+#   python batch_cli.py "data/**/ID_*.csv"
+#
+# 同じフォルダにある ID_n のCSVを1セッションとしてまとめ、セッションごとに
+# features.csv と slopes_and_intercepts.csv を書き出す。
+
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.config_manager import ConfigManager
+from core.model import AnalysisModel
+from core.data_processor import DataProcessor
+from core.analysis_service import AnalysisService
+from core.feature_export import save_features_csv, save_slopes_csv
+
+ID_FILE_PATTERN = re.compile(r'ID_(\d+)', re.IGNORECASE)
+
+
+def collect_sessions(inputs):
+    """
+    フォルダまたはglobパターンから ID_n のCSVを集め、親フォルダごとのセッションにまとめる。
+
+    Returns:
+        dict[str, list[str]]: セッションのフォルダ → CSVファイルのリスト
+    """
+    sessions = {}
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths = glob.glob(os.path.join(pattern, '**', '*.csv'), recursive=True)
+        else:
+            paths = glob.glob(pattern, recursive=True)
+            # globがフォルダに一致した場合はその中のCSVを対象にする
+            paths = [p for path in paths
+                     for p in (glob.glob(os.path.join(path, '**', '*.csv'), recursive=True) if os.path.isdir(path) else [path])]
+        for path in paths:
+            if not path.lower().endswith('.csv') or not ID_FILE_PATTERN.search(os.path.basename(path)):
+                continue
+            path = os.path.abspath(path)
+            session_dir = os.path.dirname(path)
+            files = sessions.setdefault(session_dir, [])
+            if path not in files:
+                files.append(path)
+    return {session_dir: sorted(files) for session_dir, files in sorted(sessions.items())}
+
+
+def assign_output_folders(session_dirs, output_root):
+    """セッションごとの出力先を決める。出力先の指定がなければセッションのフォルダに書き出す"""
+    if output_root is None:
+        return {session_dir: session_dir for session_dir in session_dirs}
+
+    folders, used = {}, set()
+    for session_dir in session_dirs:
+        name = os.path.basename(session_dir.rstrip(os.sep)) or "session"
+        candidate, suffix = name, 2
+        while candidate in used:
+            candidate = f"{name}_{suffix}"
+            suffix += 1
+        used.add(candidate)
+        folders[session_dir] = os.path.join(output_root, candidate)
+    return folders
+
+
+def analyze_session(session_dir, filepaths, output_folder, analysis_params):
+    """
+    【ワーカープロセスで実行】1セッション分のCSVを読み込んで一括解析し、結果を書き出す。
+    例外は呼び出し元に投げず、結果の辞書に格納して返す。
+    """
+    started = time.perf_counter()
+    result = {'session': session_dir, 'output': output_folder, 'ids': 0, 'samples': 0,
+              'load_sec': 0.0, 'analysis_sec': 0.0, 'total_sec': 0.0, 'error': None}
+    try:
+        model = AnalysisModel()
+        loaded, ids = model.load_csv_data(filepaths)
+        if not loaded:
+            raise ValueError("読み込めるCSVがありませんでした。")
+        result['ids'] = len(ids)
+        result['samples'] = len(model.csv_replay_data)
+        loaded_at = time.perf_counter()
+        result['load_sec'] = loaded_at - started
+
+        service = AnalysisService(model, DataProcessor(), analysis_params)
+        service.perform_batch_analysis(model.csv_replay_data)
+        result['analysis_sec'] = time.perf_counter() - loaded_at
+
+        os.makedirs(output_folder, exist_ok=True)
+        save_features_csv(model.last_slope_dfs.get('full'), output_folder)
+        save_slopes_csv(model.last_power_spectrums.get('full', {}), output_folder)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['total_sec'] = time.perf_counter() - started
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ID_n のCSVセッションをGUIなしで一括解析します。")
+    parser.add_argument('inputs', nargs='+', help="CSVを含むフォルダ、またはglobパターン (例: 'data/**/ID_*.csv')")
+    parser.add_argument('-o', '--output', default=None,
+                        help="出力先の親フォルダ。省略時は各セッションのフォルダに書き出す")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="並列に処理するプロセス数 (既定: CPUコア数)")
+    parser.add_argument('-c', '--config', default='config.json', help="解析パラメータを読み込む設定ファイル")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sessions = collect_sessions(args.inputs)
+    if not sessions:
+        print("ERROR: 対象となる ID_n のCSVが見つかりませんでした。")
+        return 1
+
+    analysis_params = ConfigManager(args.config).config.analysis_parameters
+    output_folders = assign_output_folders(list(sessions), args.output)
+    jobs = max(1, min(args.jobs, len(sessions)))
+    print(f"INFO: {len(sessions)} セッションを {jobs} プロセスで解析します。")
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(analyze_session, session_dir, files, output_folders[session_dir], analysis_params)
+                   for session_dir, files in sessions.items()]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            status = "失敗" if result['error'] else "完了"
+            print(f"[{done}/{len(futures)}] {status} {result['session']} "
+                  f"(ID: {result['ids']}, サンプル: {result['samples']}, "
+                  f"読込 {result['load_sec']:.2f}s / 解析 {result['analysis_sec']:.2f}s / 合計 {result['total_sec']:.2f}s)")
+            if result['error']:
+                print(f"    ERROR: {result['error']}")
+    elapsed = time.perf_counter() - started
+
+    # --- 集計 ---
+    failed = [r for r in results if r['error']]
+    busy = sum(r['total_sec'] for r in results)
+    slowest = max(results, key=lambda r: r['total_sec'])
+    print("----- 一括解析の結果 -----")
+    print(f"成功: {len(results) - len(failed)} / 失敗: {len(failed)} / 合計: {len(results)} セッション")
+    print(f"経過時間: {elapsed:.2f}s (セッション処理時間の合計: {busy:.2f}s, 並列効率: {busy / max(elapsed, 1e-9):.1f}倍)")
+    print(f"最も時間のかかったセッション: {slowest['session']} ({slowest['total_sec']:.2f}s)")
+    for r in failed:
+        print(f"  失敗: {r['session']}: {r['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,49 +1,142 @@
 # ファイル名: core/analysis_service.py (新規作成)
 
+import threading
 import pandas as pd
+from core.incremental_feature_engine import IncrementalFeatureEngine
+from core.sliding_dft_engine import SlidingDFTEngine
+from core.feature_cache import FeatureSnapshotCache
 
 class AnalysisService:
     """
     データ処理と解析の実行を専門に担当するサービスクラス。
     Controllerからビジネスロジックを分離する。
     """
-    def __init__(self, model, data_processor):
+    def __init__(self, model, data_processor, analysis_params=None):
         self.model = model
         self.data_processor = data_processor
+        # 解析ワーカーと一括解析スレッドから同時に呼ばれてもエンジンの状態が壊れないようにする
+        self._lock = threading.RLock()
+
+        # 全区間の計算方式: 'incremental' (差分更新) または 'recompute' (毎回再計算)
+        self.full_mode = getattr(analysis_params, 'FULL_FEATURE_MODE', 'incremental')
+        self.full_engine = IncrementalFeatureEngine(
+            data_processor,
+            refresh_ratio=getattr(analysis_params, 'FULL_REFRESH_RATIO', 0.0),
+            parity_check=getattr(analysis_params, 'FEATURE_PARITY_CHECK', False)
+        )
+
+        # スライディング窓の計算方式: 'sliding_dft' (スライディングDFT) または 'recompute' (毎回再計算)
+        self.sliding_mode = getattr(analysis_params, 'SLIDING_FEATURE_MODE', 'sliding_dft')
+        self.sliding_engine = SlidingDFTEngine(
+            data_processor,
+            resync_interval=getattr(analysis_params, 'SLIDING_DFT_RESYNC_INTERVAL', 300),
+            parity_check=getattr(analysis_params, 'FEATURE_PARITY_CHECK', False)
+        )
+
+        # (計算方式, 履歴の世代, 履歴インデックス, 窓の長さ, 対象ID) ごとの計算結果のキャッシュ
+        self.feature_cache = FeatureSnapshotCache(
+            max_entries=getattr(analysis_params, 'FEATURE_CACHE_ENTRIES', 64),
+            max_bytes=getattr(analysis_params, 'FEATURE_CACHE_MAX_MB', 256) * 1024 * 1024
+        )
+
+    def _full_kind(self):
+        """全区間の計算方式に対応するキャッシュの種類"""
+        return 'full-incremental' if self.full_mode == 'incremental' else 'exact'
+
+    def _sliding_kind(self):
+        """スライディング窓の計算方式に対応するキャッシュの種類"""
+        return 'sliding-dft' if self.sliding_mode == 'sliding_dft' else 'exact'
+
+    def _calculate_full_features(self, full_slice, active_ids):
+        """
+        全区間の特徴量を計算する。
+        full_slice は常に model.full_history の先頭からのスライス (HistoryWindow) である前提。
+        """
+        if self.full_mode == 'incremental':
+            self.full_engine.sync(full_slice.store)
+            return self.full_engine.compute(len(full_slice) - 1, active_ids)
+
+        return self.data_processor.get_features_from_window(full_slice, active_ids)
+
+    def _calculate_sliding_features(self, sliding_slice, active_ids):
+        """スライディング窓の特徴量を計算する"""
+        if self.sliding_mode == 'sliding_dft':
+            return self.sliding_engine.compute(sliding_slice, active_ids)
+
+        return self.data_processor.get_features_from_window(sliding_slice, active_ids)
+
+    def compute_features(self, full_slice, sliding_slice=None, active_ids=None):
+        """
+        特徴量を計算して返す。Modelには書き込まないので、別スレッドから呼び出してよい。
+        エンジンの内部状態を守るため、計算はロックで直列化する。
+
+        Returns:
+            tuple[dict, dict]: {'sliding': df, 'full': df} と {'sliding': ps, 'full': ps}
+        """
+        if active_ids is None:
+            active_ids = list(self.model.active_ids)
+
+        with self._lock:
+            # --- 全区間データの計算 ---
+            df_full_features, ps_full = self.feature_cache.get_or_compute(
+                full_slice, active_ids, self._calculate_full_features, self._full_kind())
+
+            # --- スライディング窓データの計算 ---
+            df_sliding_features, ps_sliding = pd.DataFrame(), {}
+            if sliding_slice:
+                df_sliding_features, ps_sliding = self.feature_cache.get_or_compute(
+                    sliding_slice, active_ids, self._calculate_sliding_features, self._sliding_kind())
+
+        slope_dfs = {'sliding': df_sliding_features, 'full': df_full_features}
+        power_spectrums = {'sliding': ps_sliding, 'full': ps_full}
+        return slope_dfs, power_spectrums
+
+    def get_window_features(self, window, active_ids=None):
+        """
+        任意の区間 (HistoryWindow) の特徴量を返す。計算済みならキャッシュの結果を使う。
+        エンジンの状態に触れないので、保存スレッドなどから呼び出してよい。
+        """
+        if active_ids is None:
+            active_ids = list(self.model.active_ids)
+        return self.feature_cache.get_or_compute(window, list(active_ids), self.data_processor.get_features_from_window,
+                                                 'exact')
 
     def process_and_store_features(self, full_slice, sliding_slice=None):
         """
         特徴量を計算し、結果をモデルに格納する。
         (Controllerからロジックを移動)
         """
-        # --- 全区間データの計算 ---
-        df_full = self.data_processor.convert_history_to_df(full_slice, self.model.active_ids)
-        df_full_features, ps_full = self.data_processor.get_features_from_df(df_full, self.model.active_ids)
+        slope_dfs, power_spectrums = self.compute_features(full_slice, sliding_slice)
 
-        # --- スライディング窓データの計算 ---
-        df_sliding_features, ps_sliding = pd.DataFrame(), {}
-        if sliding_slice:
-            df_sliding = self.data_processor.convert_history_to_df(sliding_slice, self.model.active_ids)
-            df_sliding_features, ps_sliding = self.data_processor.get_features_from_df(df_sliding, self.model.active_ids)
-            
         # --- 計算結果をModelに保存 ---
-        self.model.last_slope_dfs = {'sliding': df_sliding_features, 'full': df_full_features}
-        self.model.last_power_spectrums = {'sliding': ps_sliding, 'full': ps_full}
-        
+        self.model.last_slope_dfs = slope_dfs
+        self.model.last_power_spectrums = power_spectrums
+
         # --- 一括解析用に計算結果を返す ---
-        return df_full_features, ps_full
+        return slope_dfs['full'], power_spectrums['full']
 
     def perform_batch_analysis(self, all_data_history):
         """
         一括解析の重い計算処理を実行する。
         (Controllerの別スレッド処理からロジックを移動)
+
+        Args:
+            all_data_history (pd.DataFrame | list[dict]): '{ID}_{変数}' 列を持つDataFrame
+                (model.csv_replay_data) なら列単位で一括して取り込む。パケット辞書のリストも受け付ける。
         """
-        df_full = self.data_processor.convert_history_to_df(all_data_history, self.model.active_ids)
-        df_full_features, ps_full = self.data_processor.get_features_from_df(df_full, self.model.active_ids)
-        
         # --- Modelに再生用・保存用データを格納 ---
-        self.model.full_history = all_data_history
+        # パケット辞書が必要な箇所は full_history[i] で従来形式のパケットを都度組み立てて参照できる
+        self.model.full_history.clear()
+        if isinstance(all_data_history, pd.DataFrame):
+            self.model.full_history.extend_dataframe(all_data_history, self.model.active_ids)
+        else:
+            self.model.full_history.extend(all_data_history)
+        with self._lock:
+            df_full_features, ps_full = self.feature_cache.get_or_compute(
+                self.model.full_history[:], list(self.model.active_ids), self._calculate_full_features,
+                self._full_kind())
+
         self.model.last_slope_dfs = {'full': df_full_features, 'sliding': pd.DataFrame()}
         self.model.last_power_spectrums = {'full': ps_full, 'sliding': {}}
-        
-        return df_full_features
\ No newline at end of file
+
+        return df_full_features
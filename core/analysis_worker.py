@@ -0,0 +1,156 @@
+# ファイル名: core/analysis_worker.py (新規作成)
+
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class FeatureSnapshot:
+    """解析ワーカーが公開する計算結果。公開後は書き換えずに読み取り専用として扱う。"""
+    sequence: int           # 計算要求の通し番号
+    history_index: int      # 計算対象とした履歴の末尾インデックス
+    generation: int         # 計算時点の HistoryStore の世代番号
+    slope_dfs: dict         # {'sliding': df, 'full': df}
+    power_spectrums: dict   # {'sliding': ps, 'full': ps}
+    requested_at: float     # 要求された時刻 (time.monotonic)
+    completed_at: float     # 計算が完了した時刻 (time.monotonic)
+
+
+class AnalysisWorker:
+    """
+    特徴量計算を専用スレッドで実行するワーカー。
+    UIスレッドは submit() で計算を要求し、latest_snapshot() で完成済みの最新結果を受け取るだけで、
+    計算の完了を待つことはない。計算が追いつかない場合は、未着手の古い要求を最新の要求で上書きして捨てる。
+    """
+    def __init__(self, analysis_service):
+        self.analysis_service = analysis_service
+        self.model = analysis_service.model
+        self._condition = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._latest = None
+        self._stopped = False
+        self._sequence = 0
+        self._thread = None
+
+        # --- 計測用カウンタ ---
+        self.ticks_requested = 0
+        self.ticks_computed = 0
+        self.ticks_skipped = 0
+
+    def start(self):
+        """ワーカースレッドを開始する"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="AnalysisWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ワーカースレッドを停止する"""
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def submit(self, history_index, sliding_window):
+        """
+        指定した履歴インデックスでの特徴量計算を要求する。
+        まだ着手されていない要求があれば、それは古い要求として破棄する。
+        履歴は書き込みと同じ (UI) スレッドでスナップショットを取って渡し、ワーカーは生きた履歴を読まない。
+        """
+        history = self.model.full_history
+        with self._condition:
+            self._sequence += 1
+            if self._pending is not None:
+                self.ticks_skipped += 1
+            self._pending = {
+                'sequence': self._sequence,
+                'history_index': history_index,
+                'sliding_window': sliding_window,
+                'generation': history.generation,
+                'history': history.snapshot(),
+                'active_ids': list(self.model.active_ids),
+                'requested_at': time.monotonic(),
+            }
+            self.ticks_requested += 1
+            self._condition.notify()
+
+    def latest_snapshot(self):
+        """完成済みの最新スナップショットを返す (未完成なら None)"""
+        with self._condition:
+            return self._latest
+
+    def is_idle(self):
+        """実行中・待機中の要求がなければTrueを返す"""
+        with self._condition:
+            return not self._busy and self._pending is None
+
+    def get_stats(self):
+        """計測用カウンタとスナップショットの経過時間 (秒) を返す"""
+        with self._condition:
+            latest = self._latest
+            stats = {
+                'ticks_requested': self.ticks_requested,
+                'ticks_computed': self.ticks_computed,
+                'ticks_skipped': self.ticks_skipped,
+            }
+        now = time.monotonic()
+        stats['snapshot_age'] = (now - latest.completed_at) if latest else None
+        stats['snapshot_latency'] = (latest.completed_at - latest.requested_at) if latest else None
+        return stats
+
+    def _run(self):
+        """【別スレッド】要求を待ち受け、最新の要求だけを計算する"""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                request = self._pending
+                self._pending = None
+                self._busy = True
+
+            try:
+                snapshot = self._compute(request)
+                with self._condition:
+                    if snapshot is not None:
+                        self._latest = snapshot
+                        self.ticks_computed += 1
+                    else:
+                        self.ticks_skipped += 1
+            except Exception as e:
+                print(f"ERROR: (解析ワーカー) 特徴量の計算中にエラーが発生しました: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+
+    def _compute(self, request):
+        """1件の要求を計算してスナップショットを作る。履歴が差し替えられていれば None"""
+        if self.model.full_history.generation != request['generation']:
+            return None
+
+        # 要求時のスナップショットだけを読む (計算中にUIスレッドが追記しても配列の形が変わらない)
+        history = request['history']
+        target_index = request['history_index']
+        full_slice = history[:target_index + 1]
+        sliding_slice = history[max(0, target_index - request['sliding_window'] + 1): target_index + 1]
+        slope_dfs, power_spectrums = self.analysis_service.compute_features(
+            full_slice, sliding_slice, active_ids=request['active_ids'])
+        if self.model.full_history.generation != request['generation']:
+            return None
+
+        return FeatureSnapshot(
+            sequence=request['sequence'],
+            history_index=target_index,
+            generation=request['generation'],
+            slope_dfs=slope_dfs,
+            power_spectrums=power_spectrums,
+            requested_at=request['requested_at'],
+            completed_at=time.monotonic(),
+        )
@@ -0,0 +1,151 @@
+# ファイル名: core/cluster_cache.py (新規作成)
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+
+def frame_fingerprint(df_features):
+    """
+    特徴量DataFrameの内容 (ID・列名・値) から指紋を作る。
+    中身が同じなら別のオブジェクトでも同じ値になるので、ティックごとに作り直されたDataFrameでも結果を再利用できる。
+    """
+    values = np.ascontiguousarray(df_features.fillna(0).to_numpy(dtype=np.float64))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(df_features.index), tuple(df_features.columns), values.shape)).encode('utf-8'))
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+class ClusterResultCache:
+    """
+    クラスタリングの中間結果 (標準化した行列・連結行列・k-meansのラベル) を保持するLRUキャッシュ。
+    キーは (特徴量DataFrameの指紋, 種類, 手法またはk)。一時停止中やスライダーの往復、手法・kの切り替えでは
+    特徴量が変わらないので、計算をやり直さずに前の結果を返す。
+
+    precompute_kmeans() を呼ぶと、スライダーの範囲のkについてk-meansを別スレッドで先に計算しておく。
+    未着手の古い要求は新しい要求で上書きして捨てる。UIスレッドと先読みスレッドから共有される。
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max(0, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._pending = None
+        self._thread = None
+
+        # --- 計測用カウンタ ---
+        self.hits = 0
+        self.misses = 0
+
+    def scaled(self, df_features):
+        """
+        欠損を0で埋めて標準化した行列を返す。
+
+        Returns:
+            tuple[str, np.ndarray]: (DataFrameの指紋, 標準化した行列)。
+        """
+        fingerprint = frame_fingerprint(df_features)
+        return fingerprint, self._scaled_by_fingerprint(fingerprint, df_features)
+
+    def linkage(self, df_features, method='ward'):
+        """階層型クラスタリングの連結行列を返す"""
+        fingerprint, scaled_features = self.scaled(df_features)
+        return self._get_or_compute((fingerprint, 'linkage', method),
+                                    lambda: linkage(scaled_features, method=method))
+
+    def kmeans_labels(self, df_features, k):
+        """
+        k-meansのクラスタ番号を返す。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (標準化した行列, 各IDのクラスタ番号)。
+        """
+        fingerprint, scaled_features = self.scaled(df_features)
+        return scaled_features, self._kmeans_by_fingerprint(fingerprint, scaled_features, k)
+
+    def precompute_kmeans(self, frames, k_values):
+        """frames の各特徴量DataFrameについて、k_values の各kのk-meansを別スレッドで計算しておく"""
+        frames = [df for df in frames if df is not None and not df.empty]
+        if self.max_entries == 0 or not frames:
+            return
+        with self._condition:
+            self._pending = (frames, list(k_values))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run_precompute, name="KmeansPrecompute", daemon=True)
+                self._thread.start()
+
+    def clear(self):
+        """全エントリを破棄する"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """件数・ヒット数・ミス数を返す"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _scaled_by_fingerprint(self, fingerprint, df_features):
+        return self._get_or_compute((fingerprint, 'scaled', None),
+                                    lambda: StandardScaler().fit_transform(df_features.fillna(0)))
+
+    def _kmeans_by_fingerprint(self, fingerprint, scaled_features, k):
+        return self._get_or_compute(
+            (fingerprint, 'kmeans', k),
+            lambda: KMeans(n_clusters=k, random_state=42, n_init=10).fit_predict(scaled_features))
+
+    def _get_or_compute(self, key, compute):
+        """キャッシュにあればそれを返し、なければ compute() の結果を登録して返す"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = compute()
+        if self.max_entries == 0:
+            return result
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def _contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def _precompute(self, frames, k_values):
+        """キャッシュにないk-meansの結果を順に計算する。新しい要求が届いたら残りは計算しない"""
+        for df_features in frames:
+            fingerprint, scaled_features = self.scaled(df_features)
+            # IDがkより少ないものはクラスタリングできないので飛ばす
+            for k in (k for k in k_values if k <= len(df_features)):
+                with self._condition:
+                    if self._pending is not None:
+                        return
+                if not self._contains((fingerprint, 'kmeans', k)):
+                    self._kmeans_by_fingerprint(fingerprint, scaled_features, k)
+
+    def _run_precompute(self):
+        """【別スレッド】最新の先読み要求だけを処理し、要求がなくなったら終了する"""
+        while True:
+            with self._condition:
+                if self._pending is None:
+                    self._thread = None
+                    return
+                frames, k_values = self._pending
+                self._pending = None
+
+            try:
+                self._precompute(frames, k_values)
+            except Exception as e:
+                print(f"ERROR: (k-means先読み) クラスタリングの計算中にエラーが発生しました: {e}")
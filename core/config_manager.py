@@ -17,11 +17,73 @@ class RealtimeSettingsConfig:
     yolo_model_path: str = "models/yolov8n.pt"
     mediapipe_model_path: str = "models/face_landmarker.task"
     device: str = "cpu"
+    # 映像を別スレッドで先読みデコードする。方式は "auto" / "latest" (カメラ向け) / "ordered" (ファイル向け)
+    video_prefetch: bool = True
+    video_prefetch_policy: str = "auto"
+    video_buffer_size: int = 4
+    # 0より大きければ、この幅を超えるフレームをデコード時に縮小する
+    video_max_width: int = 0
+    # "serial" (1スレッドで順に処理) または "pipelined" (デコード/検出/ランドマークを並行処理)
+    orchestrator_mode: str = "pipelined"
+    # パイプラインのステージ間キューの上限
+    pipeline_queue_size: int = 2
+    # 人物ごとのランドマーク抽出を並行して行うインスタンス数 (1なら順に処理)
+    landmark_workers: int = 1
+    # 2以上にすると、最大この人数分の人物画像を1枚のモザイク画像にまとめてランドマークを推論する (0で無効)
+    landmark_mosaic_faces: int = 0
+    # モザイク内の1人分のタイルの一辺 (ピクセル)
+    landmark_mosaic_tile_size: int = 256
+    # YOLOで検出するフレームの間隔。2以上なら間のフレームはボックス内の特徴点のオプティカルフローで追跡する
+    detect_interval: int = 1
+    # ランドマーク抽出のスケジュール: "all" (毎フレーム全員), "rate" (IDごとに目標レート), "round_robin" (時間予算内で順番に)
+    landmark_schedule: str = "all"
+    landmark_target_hz: float = 5.0
+    landmark_budget_ms: float = 50.0
+    # 処理がライブソース (カメラ) のフレームレートに追いつかないとき、遅れた分のフレームを読み飛ばす (動画ファイルでは読み飛ばさない)
+    drop_frames_when_behind: bool = True
+    # GUI側の取り出しが遅れているとき、特徴量をまとめて送る最大の行数と待ち時間
+    packet_batch_max_rows: int = 30
+    packet_batch_max_delay_ms: float = 500.0
 
 @dataclass
 class AnalysisParametersConfig:
     UPDATE_INTERVAL_MS: int = 1000
     SLIDING_WINDOW_SECONDS: int = 30
+    # 全区間特徴量の計算方式 ("incremental" または "recompute")
+    FULL_FEATURE_MODE: str = "incremental"
+    # 0 (既定) なら毎回厳密に再計算する。正の値にすると近似を使い、系列のサンプル数がこの割合だけ増えるまで
+    # 前回結果を再利用する (償却コストが一定に近くなる)。結果に含まれない最新サンプルは全体の ratio / (1 + ratio) 以下 (0.05なら約4.8%)
+    FULL_REFRESH_RATIO: float = 0.0
+    # インクリメンタル計算の結果を calculate_slope と照合する
+    FEATURE_PARITY_CHECK: bool = False
+    # スライディング窓特徴量の計算方式 ("sliding_dft" または "recompute")
+    SLIDING_FEATURE_MODE: str = "sliding_dft"
+    # スライディングDFTをこの回数だけ更新したらFFTで再同期する (丸め誤差対策)
+    SLIDING_DFT_RESYNC_INTERVAL: int = 300
+    # 特徴量計算をUIスレッドではなく解析ワーカースレッドで行う
+    ANALYSIS_WORKER_ENABLED: bool = True
+    # CSV再生で1ティックあたりに進める行数 (10なら10倍速で再生)
+    REPLAY_SPEED: float = 1.0
+    # リアルタイムで届いたフレームの扱い: "resample" (一定間隔のグリッドに載せ直す), "all" (全行を追加),
+    # "mean" (1ティック分の平均を1行), "latest" (1ティック分の最新値を1行)
+    REALTIME_INGEST_MODE: str = "resample"
+    # "resample" のグリッド間隔 (秒)。スペクトル計算はサンプル間隔1を前提にしているので、通常は1.0のまま
+    REALTIME_GRID_INTERVAL_SEC: float = 1.0
+    # サンプルのないセルの扱い: "hold" (直前の値で埋める) または "none" (欠損のまま)
+    REALTIME_GAP_FILL: str = "hold"
+    # "hold" で埋める最大の空白 (秒)。これより長く観測がないIDは欠損にする
+    REALTIME_MAX_GAP_SEC: float = 3.0
+    # 計算済み特徴量のキャッシュの上限 (件数とメガバイト数)
+    FEATURE_CACHE_ENTRIES: int = 64
+    FEATURE_CACHE_MAX_MB: int = 256
+    # クラスタリング結果 (標準化した行列・連結行列・k-meansのラベル) のキャッシュの上限件数
+    CLUSTER_CACHE_ENTRIES: int = 128
+    # k-meansビューの描画後、スライダーの範囲のkを別スレッドで先に計算しておく (KMEANS_MODE が "full" のときのみ)
+    KMEANS_PRECOMPUTE: bool = True
+    # k-meansの計算方式: "incremental" (前回の重心から始めてクラスタ番号を揃える) または "full" (毎回10回の初期化から計算)
+    KMEANS_MODE: str = "incremental"
+    # "incremental" で、1点あたりのイナーシャが最後に全体から計算したときのこの倍率を超えたら計算し直す
+    KMEANS_REFIT_INERTIA_RATIO: float = 1.5
 
 @dataclass
 class AppConfig:
@@ -3,11 +3,15 @@
 import pandas as pd
 import numpy as np
 from constants import ALL_VARIABLES
+from core.history_store import HistoryWindow
 
 class DataProcessor:
     """
     データフレームを受け取り、特徴量の計算を行う専門クラス。
     """
+    def __init__(self):
+        self._freq_cache = {}
+
     def calculate_slope(self, values):
         """時系列データからFFTを行い、そのパワースペクトルの傾きを計算する"""
         n = len(values)
@@ -30,34 +34,147 @@ class DataProcessor:
 
         return slope, frequency[mask], amplitude[mask], intercept
 
+    def calculate_slopes_batch(self, matrix, lengths=None):
+        """
+        複数系列の傾きをまとめて計算する (calculate_slope のベクトル化版)。
+
+        Args:
+            matrix (np.ndarray): (系列数, 時刻) の2次元配列。各行の有効値は先頭に詰めておく。
+            lengths (np.ndarray | None): 各行の有効サンプル数。None なら全行が列数と同じ長さ。
+
+        Returns:
+            list[tuple]: 行ごとの (slope, freq, amp, intercept)。calculate_slope と同じ形式。
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        num_series = matrix.shape[0]
+        if lengths is None:
+            lengths = np.full(num_series, matrix.shape[1])
+        results = [(0, None, None, None)] * num_series
+
+        # 長さごとにまとめて、1回のrFFTと閉形式の最小二乗で解く
+        for n in np.unique(lengths):
+            if n < 4:
+                continue
+            rows = np.flatnonzero(lengths == n)
+            amplitude = np.abs(np.fft.rfft(matrix[rows, :n], axis=-1)[:, 1:]) / (n / 2)
+            for row, result in zip(rows, self.fit_spectra_batch(amplitude, int(n))):
+                results[row] = result
+        return results
+
+    def fit_spectra_batch(self, amplitude, n):
+        """
+        同じ長さnの系列から得た振幅スペクトルをまとめて両対数の1次式で近似する。
+
+        Args:
+            amplitude (np.ndarray): (系列数, n//2) の振幅。rFFTの直流成分を除いた各ビンを n/2 で割ったもの。
+            n (int): 元の系列の長さ。
+
+        Returns:
+            list[tuple]: 行ごとの (slope, freq, amp, intercept)。近似できない行は (0, None, None, None)。
+        """
+        freq, log_freq = self._frequency_axis(n)
+        mask = amplitude > 0
+
+        with np.errstate(divide='ignore'):
+            log_amp = np.where(mask, np.log10(amplitude), 0.0)
+        weights = mask.astype(np.float64)
+        count = weights.sum(axis=1)
+        sum_x = weights @ log_freq
+        sum_xx = weights @ (log_freq * log_freq)
+        sum_y = log_amp.sum(axis=1)
+        sum_xy = log_amp @ log_freq
+        denom = count * sum_xx - sum_x * sum_x
+        fitted = (count >= 2) & (denom > 0)
+        safe_denom = np.where(fitted, denom, 1.0)
+        slopes = (count * sum_xy - sum_x * sum_y) / safe_denom
+        intercepts = (sum_y - slopes * sum_x) / np.where(fitted, count, 1.0)
+
+        # 振幅0のビンがない行はマスクで切り出さずにそのまま返す
+        full_rows = mask.all(axis=1)
+        results = []
+        for i in range(len(amplitude)):
+            if not fitted[i]:
+                results.append((0, None, None, None))
+            elif full_rows[i]:
+                results.append((slopes[i], freq, amplitude[i], intercepts[i]))
+            else:
+                row_mask = mask[i]
+                results.append((slopes[i], freq[row_mask], amplitude[i, row_mask], intercepts[i]))
+        return results
+
+    def _frequency_axis(self, n):
+        """長さnのrFFTにおける正の周波数とその常用対数を返す (長さごとにキャッシュ)"""
+        axis = self._freq_cache.get(n)
+        if axis is None:
+            freq = np.fft.rfftfreq(n, d=1.0)[1:]
+            axis = (freq, np.log10(freq))
+            if len(self._freq_cache) >= 64:
+                self._freq_cache.clear()
+            self._freq_cache[n] = axis
+        return axis
+
+    def pack_valid(self, matrix):
+        """(系列数, 時刻) の配列からNaNを除き、有効値を各行の先頭に詰める (dropna相当)"""
+        nan_mask = np.isnan(matrix)
+        lengths = matrix.shape[1] - nan_mask.sum(axis=1)
+        if not nan_mask.any():
+            return matrix, lengths
+        order = np.argsort(nan_mask, axis=1, kind='stable')
+        return np.take_along_axis(matrix, order, axis=1), lengths
+
+    def _assemble_features(self, active_ids, series_keys, results):
+        """系列ごとの計算結果を get_features_from_df の戻り値の形式に組み立てる"""
+        id_pos = {id_name: i for i, id_name in enumerate(active_ids)}
+        var_pos = {var: j for j, var in enumerate(ALL_VARIABLES)}
+        feature_matrix = np.zeros((len(active_ids), len(ALL_VARIABLES)))
+        power_spectrums = {id_name: {} for id_name in active_ids}
+        for (id_name, var), (slope, freq, amp, intercept) in zip(series_keys, results):
+            feature_matrix[id_pos[id_name], var_pos[var]] = slope
+            if freq is not None:
+                power_spectrums[id_name][var] = (freq, amp, slope, intercept)
+        return pd.DataFrame(feature_matrix, index=list(active_ids), columns=ALL_VARIABLES), power_spectrums
+
     def get_features_from_df(self, df, active_ids):
         """【メインの計算ロジック】DataFrameから全IDの特徴量とスペクトルを計算する"""
         if df is None or df.empty or not active_ids:
             return pd.DataFrame(), {}
 
-        feature_matrix = {id_name: {} for id_name in active_ids}
-        power_spectrums = {id_name: {} for id_name in active_ids}
-
+        series_keys, columns = [], []
         for id_name in active_ids:
-            slopes = {}
             for var in ALL_VARIABLES:
                 column_name = f"{id_name}_{var}"
                 if column_name in df.columns:
-                    values = df[column_name].dropna().values
-                    slope, freq, amp, intercept = self.calculate_slope(values)
-                    slopes[var] = slope
-                    if freq is not None:
-                        power_spectrums[id_name][var] = (freq, amp, slope, intercept)
-                else:
-                    slopes[var] = 0
-            feature_matrix[id_name] = slopes
-        
-        return pd.DataFrame(feature_matrix).T, power_spectrums
+                    series_keys.append((id_name, var))
+                    columns.append(column_name)
+
+        results = []
+        if columns:
+            matrix = df[columns].to_numpy(dtype=np.float64).T
+            results = self.calculate_slopes_batch(*self.pack_valid(matrix))
+        return self._assemble_features(active_ids, series_keys, results)
+
+    def get_features_from_window(self, window, active_ids):
+        """
+        HistoryWindow から直接、全IDの特徴量とスペクトルを計算する。
+        DataFrameを経由しない以外は convert_history_to_df + get_features_from_df と同じ結果になる。
+        """
+        store = window.store
+        ids = [id_name for id_name in active_ids if id_name in store.id_index]
+        if len(window) == 0 or not ids:
+            return pd.DataFrame(), {}
+
+        rows = [store.id_index[id_name] for id_name in ids]
+        matrix = np.asarray(window.data[rows], dtype=np.float64).reshape(len(ids) * len(store.variables), -1)
+        series_keys = [(id_name, var) for id_name in ids for var in store.variables]
+        results = self.calculate_slopes_batch(*self.pack_valid(matrix))
+        return self._assemble_features(active_ids, series_keys, results)
 
     def convert_history_to_df(self, history_slice, active_ids):
-        """history形式のデータ(辞書のリスト)をDataFrameに変換する"""
+        """history形式のデータ(辞書のリスト または HistoryWindow)をDataFrameに変換する"""
         if not history_slice or not active_ids:
             return pd.DataFrame()
+        if isinstance(history_slice, HistoryWindow):
+            return history_slice.to_dataframe(active_ids)
 
         records = []
         for dp in history_slice:
@@ -67,5 +184,5 @@ class DataProcessor:
                     for var, value in dp[id_name].items():
                         record[f"{id_name}_{var}"] = value
             records.append(record)
-        
+
         return pd.DataFrame(records).set_index('timestamp')
\ No newline at end of file
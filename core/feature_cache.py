@@ -0,0 +1,98 @@
+# ファイル名: core/feature_cache.py (新規作成)
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FeatureSnapshotCache:
+    """
+    計算済みの特徴量 (特徴量DataFrame, パワースペクトル) を保持するLRUキャッシュ。
+    キーは (計算方式, 履歴の世代番号, 末尾の履歴インデックス, 窓の長さ, 対象IDの組)。
+    HistoryStore は追記のみで過去の値を書き換えないので、世代番号が同じ間は同じキーの結果は変わらない。
+    計算方式 ('exact', 'full-incremental', 'sliding-dft') もキーに含めるので、履歴がスライディング窓より短く
+    全区間と窓の範囲が一致するときでも、近似を含む結果が別の方式の結果として返されることはない。
+
+    件数と、パワースペクトルの配列が占めるおおよそのバイト数の両方で上限を設け、
+    超えた分は最も長く使われていないものから捨てる。解析ワーカー・保存スレッド・UIスレッドから共有される。
+    """
+    def __init__(self, max_entries=64, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max(0, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()   # key -> (result, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # --- 計測用カウンタ ---
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(window, active_ids, kind='exact'):
+        """計算方式・HistoryWindow・対象IDからキャッシュのキーを作る"""
+        return (kind, window.store.generation, window.stop - 1, len(window), tuple(active_ids))
+
+    def get(self, key):
+        """キャッシュされた結果を返す (なければ None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        """計算結果を登録する。上限を超えた分は古いものから捨てる"""
+        if self.max_entries == 0:
+            return
+        nbytes = self._estimate_nbytes(result)
+        if self.max_bytes and nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (result, nbytes)
+            self._total_bytes += nbytes
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes and self._total_bytes > self.max_bytes)):
+                _key, (_result, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+
+    def get_or_compute(self, window, active_ids, compute, kind='exact'):
+        """キャッシュにあればそれを返し、なければ compute(window, active_ids) の結果を登録して返す"""
+        key = self.make_key(window, active_ids, kind)
+        result = self.get(key)
+        if result is None:
+            result = compute(window, active_ids)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        """全エントリを破棄する"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self):
+        """件数・推定バイト数・ヒット数・ミス数を返す"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._total_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def _estimate_nbytes(result):
+        """結果が保持する配列のおおよそのバイト数 (DataFrame本体と各スペクトルの配列。共有された配列は1回だけ数える)"""
+        df_features, power_spectrums = result
+        nbytes = int(df_features.memory_usage(deep=False).sum()) if df_features is not None else 0
+        seen = set()
+        for var_data in power_spectrums.values():
+            for freq, amp, _slope, _intercept in var_data.values():
+                for array in (freq, amp):
+                    if isinstance(array, np.ndarray) and id(array) not in seen:
+                        seen.add(id(array))
+                        nbytes += array.nbytes
+        return nbytes
@@ -0,0 +1,37 @@
+# ファイル名: core/feature_export.py (新規作成)
+
+import os
+import pandas as pd
+
+FEATURES_CSV_NAME = "features.csv"
+SLOPES_CSV_NAME = "slopes_and_intercepts.csv"
+
+
+def save_features_csv(df_features, output_folder):
+    """特徴量 (ID × 変数の傾き) を features.csv に保存する。保存したパス (データがなければ None) を返す"""
+    if df_features is None or df_features.empty:
+        return None
+    filepath = os.path.join(output_folder, FEATURES_CSV_NAME)
+    df_features.to_csv(filepath, encoding='utf-8-sig')
+    return filepath
+
+
+def build_slopes_table(power_spectrums):
+    """パワースペクトルの近似結果から ID, Variable, Slope, Intercept の表を作る"""
+    results_list = []
+    for id_name, var_data in power_spectrums.items():
+        for var_name, spec_tuple in var_data.items():
+            _freq, _amp, slope, intercept = spec_tuple
+            if slope is not None and intercept is not None:
+                results_list.append({'ID': id_name, 'Variable': var_name, 'Slope': slope, 'Intercept': intercept})
+    return pd.DataFrame(results_list)
+
+
+def save_slopes_csv(power_spectrums, output_folder):
+    """近似直線の傾きと切片を slopes_and_intercepts.csv に保存する。保存したパス (データがなければ None) を返す"""
+    table = build_slopes_table(power_spectrums or {})
+    if table.empty:
+        return None
+    filepath = os.path.join(output_folder, SLOPES_CSV_NAME)
+    table.to_csv(filepath, index=False, encoding='utf-8-sig')
+    return filepath
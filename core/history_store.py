@@ -0,0 +1,281 @@
+# ファイル名: core/history_store.py (新規作成)
+
+import numpy as np
+import pandas as pd
+from constants import ALL_VARIABLES
+
+
+class HistoryStore:
+    """
+    時系列履歴を列指向で保持するストア。
+    値は (ID, 変数, 時刻) の3次元NumPy配列に格納し、欠損はNaNで表す。
+    容量は倍々で確保するので追記は償却O(1)、スライスはコピーを伴わないビューになる。
+
+    従来の「辞書のリスト」形式とも互換性を保つため、整数インデックスでアクセスすると
+    その時点のパケット辞書 ({'timestamp': t, 'ID_n': {var: value}}) を組み立てて返す。
+    """
+    INITIAL_CAPACITY = 1024
+    INITIAL_ID_CAPACITY = 8
+
+    def __init__(self, variables=ALL_VARIABLES, dtype=np.float32):
+        self.variables = list(variables)
+        self.var_index = {var: i for i, var in enumerate(self.variables)}
+        self.dtype = np.dtype(dtype)
+        # clear() のたびに増える世代番号 (キャッシュの無効化判定に使う)
+        self.generation = 0
+        self._allocate()
+
+    def _allocate(self):
+        self.ids = []
+        self.id_index = {}
+        self._size = 0
+        self._timestamps = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._data = np.full((self.INITIAL_ID_CAPACITY, len(self.variables), self.INITIAL_CAPACITY), np.nan, dtype=self.dtype)
+
+    def clear(self):
+        """全データを破棄して初期状態に戻す"""
+        self._allocate()
+        self.generation += 1
+
+    # --- 容量管理 ---
+    def _reserve(self, length):
+        """時刻方向に length サンプル分の容量を確保する"""
+        capacity = self._data.shape[2]
+        if length <= capacity:
+            return
+        new_capacity = max(length, capacity * 2)
+        new_data = np.full((self._data.shape[0], self._data.shape[1], new_capacity), np.nan, dtype=self.dtype)
+        new_data[:, :, :self._size] = self._data[:, :, :self._size]
+        self._data = new_data
+        self._timestamps = np.resize(self._timestamps, new_capacity)
+
+    def _ensure_id(self, id_name):
+        """IDの行番号を返す。未登録なら行を追加する"""
+        row = self.id_index.get(id_name)
+        if row is not None:
+            return row
+        row = len(self.ids)
+        if row == self._data.shape[0]:
+            new_data = np.full((row * 2, self._data.shape[1], self._data.shape[2]), np.nan, dtype=self.dtype)
+            new_data[:row] = self._data
+            self._data = new_data
+        self.ids.append(id_name)
+        self.id_index[id_name] = row
+        return row
+
+    # --- 書き込み ---
+    def append(self, packet):
+        """パケット辞書1件を末尾に追加する"""
+        self._reserve(self._size + 1)
+        t = self._size
+        self._timestamps[t] = packet['timestamp']
+        for id_name, id_data in packet.items():
+            if id_name == 'timestamp' or not isinstance(id_data, dict):
+                continue
+            row = self._ensure_id(id_name)
+            for var, value in id_data.items():
+                col = self.var_index.get(var)
+                if col is not None and value is not None:
+                    self._data[row, col, t] = value
+        self._size += 1
+
+    def extend(self, packets):
+        """パケット辞書のリストをまとめて追加する"""
+        self._reserve(self._size + len(packets))
+        for packet in packets:
+            self.append(packet)
+
+    def extend_dataframe(self, df, active_ids):
+        """
+        '{ID}_{変数}' 列を持つDataFrame (data_loader.load_csvs の形式) を列単位でまとめて追加する。
+        行ごとにパケット辞書を組み立てないので、長い記録でも一括で取り込める。
+        結果は各行をパケット化して append した場合と同じになる (全区間が欠損のIDは登録しない)。
+        """
+        length = len(df)
+        if length == 0:
+            return
+        self._reserve(self._size + length)
+        t0, t1 = self._size, self._size + length
+        self._timestamps[t0:t1] = np.asarray(df.index, dtype=np.float64)
+
+        for id_name in active_ids:
+            columns, cols = [], []
+            for var in self.variables:
+                column_name = f"{id_name}_{var}"
+                if column_name in df.columns:
+                    columns.append(column_name)
+                    cols.append(self.var_index[var])
+            if not columns:
+                continue
+            block = df[columns].to_numpy(dtype=np.float64).T
+            if np.isnan(block).all():
+                continue
+            row = self._ensure_id(id_name)
+            self._data[row, cols, t0:t1] = block
+        self._size = t1
+
+    def extend_rows(self, timestamps, ids, values):
+        """
+        複数時刻分の値配列をまとめて追加する (ReplayCursor.next_rows の形式)。
+
+        Args:
+            timestamps (np.ndarray): 各行のタイムスタンプ。
+            ids (list[str]): values の2軸目に対応するID。
+            values (np.ndarray): (行, ID, 変数) の値配列。変数の並びはこのストアの variables と同じ。
+        """
+        length = len(timestamps)
+        if length == 0:
+            return
+        self._reserve(self._size + length)
+        t0, t1 = self._size, self._size + length
+        self._timestamps[t0:t1] = timestamps
+        present = ~np.isnan(values).all(axis=(0, 2))
+        for j in np.flatnonzero(present):
+            row = self._ensure_id(ids[j])
+            self._data[row, :, t0:t1] = values[:, j, :].T
+        self._size = t1
+
+    # --- スナップショット ---
+    @property
+    def origin(self):
+        """スナップショットの元になったストア (ストア自身なら自分)。エンジンが同じ履歴かどうかの判定に使う"""
+        return self
+
+    def snapshot(self):
+        """
+        現時点のIDの並びと長さで固定した、読み取り専用のスナップショットを返す。
+        配列はコピーせずに共有する。書き込みは新しいIDの行・新しい時刻の列か、作り直した配列に対してだけ行われ、
+        スナップショットの範囲の値は変わらないので、書き込み側と別のスレッドから読んでもよい。
+        """
+        return HistorySnapshot(self)
+
+    # --- 読み出し ---
+    def __len__(self):
+        return self._size
+
+    @property
+    def timestamps(self):
+        """全タイムスタンプのビュー"""
+        return self._timestamps[:self._size]
+
+    @property
+    def data(self):
+        """(ID, 変数, 時刻) の値配列のビュー"""
+        return self._data[:len(self.ids), :, :self._size]
+
+    def window(self, start, stop):
+        """[start, stop) の区間を表すビューを返す"""
+        start = max(0, min(start, self._size))
+        stop = max(start, min(stop, self._size))
+        return HistoryWindow(self, start, stop)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            if step != 1:
+                raise ValueError("HistoryStore はステップ付きスライスに対応していません。")
+            return self.window(start, stop)
+        return self.packet_at(key)
+
+    def __iter__(self):
+        for t in range(self._size):
+            yield self.packet_at(t)
+
+    def packet_at(self, index):
+        """指定時刻のデータを従来形式のパケット辞書として組み立てる"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        packet = {'timestamp': float(self._timestamps[index])}
+        column = self._data[:len(self.ids), :, index]
+        for row, id_name in enumerate(self.ids):
+            id_data = {var: float(column[row, col]) for col, var in enumerate(self.variables) if not np.isnan(column[row, col])}
+            if id_data:
+                packet[id_name] = id_data
+        return packet
+
+
+class HistorySnapshot(HistoryStore):
+    """
+    HistoryStore.snapshot() が返す読み取り専用のスナップショット。
+    解析ワーカーは、UIスレッドが履歴に追記している間もこれを読んで計算する。
+    """
+    def __init__(self, store):
+        self.variables = store.variables
+        self.var_index = store.var_index
+        self.dtype = store.dtype
+        self.generation = store.generation
+        self.ids = list(store.ids)
+        self.id_index = dict(store.id_index)
+        self._size = store._size
+        self._timestamps = store._timestamps
+        self._data = store._data
+        self._origin = store.origin
+
+    @property
+    def origin(self):
+        return self._origin
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("HistorySnapshot は読み取り専用です。")
+
+    append = extend = extend_dataframe = extend_rows = clear = _read_only
+
+
+class HistoryWindow:
+    """
+    HistoryStore の連続区間 [start, stop) を表す軽量なビュー。
+    配列はアクセスのたびにストアから切り出すので、ストアが拡張された後も有効。
+    """
+    def __init__(self, store, start, stop):
+        self.store = store
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def timestamps(self):
+        return self.store._timestamps[self.start:self.stop]
+
+    @property
+    def data(self):
+        """(ID, 変数, 時刻) の値配列のビュー"""
+        return self.store._data[:len(self.store.ids), :, self.start:self.stop]
+
+    def series(self, id_name, var):
+        """1系列分の値のビューを返す。存在しなければ None"""
+        row = self.store.id_index.get(id_name)
+        col = self.store.var_index.get(var)
+        if row is None or col is None:
+            return None
+        return self.store._data[row, col, self.start:self.stop]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("HistoryWindow はステップ付きスライスに対応していません。")
+            return HistoryWindow(self.store, self.start + start, self.start + stop)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("history index out of range")
+        return self.store.packet_at(self.start + key)
+
+    def __iter__(self):
+        for t in range(self.start, self.stop):
+            yield self.store.packet_at(t)
+
+    def to_dataframe(self, active_ids):
+        """'{ID}_{変数}' 列を持つDataFrameに変換する (convert_history_to_df と同じ形式)"""
+        ids = [id_name for id_name in active_ids if id_name in self.store.id_index]
+        if len(self) == 0 or not ids:
+            return pd.DataFrame()
+        rows = [self.store.id_index[id_name] for id_name in ids]
+        block = np.asarray(self.store._data[rows, :, self.start:self.stop], dtype=np.float64)
+        columns = [f"{id_name}_{var}" for id_name in ids for var in self.store.variables]
+        index = pd.Index(self.timestamps, name='timestamp')
+        return pd.DataFrame(block.reshape(len(columns), -1).T, index=index, columns=columns)
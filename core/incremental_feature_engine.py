@@ -0,0 +1,170 @@
+# ファイル名: core/incremental_feature_engine.py (新規作成)
+
+import numpy as np
+import pandas as pd
+from constants import ALL_VARIABLES
+
+
+class _SeriesBuffer:
+    """(ID, 変数) ごとの有効サンプルを保持する伸長可能なバッファ"""
+    INITIAL_CAPACITY = 256
+
+    def __init__(self):
+        self.values = np.empty(self.INITIAL_CAPACITY, dtype=np.float64)
+        self.history_indices = np.empty(self.INITIAL_CAPACITY, dtype=np.int64)
+        self.size = 0
+        # 直近の計算結果のキャッシュ (サンプル数, (slope, freq, amp, intercept))
+        self.cached_count = -1
+        self.cached_result = None
+
+    def extend(self, history_indices, values):
+        """サンプル列を末尾に追加する (容量は倍々で確保するので償却O(1))"""
+        new_size = self.size + len(values)
+        if new_size > len(self.values):
+            new_capacity = max(new_size, len(self.values) * 2)
+            self.values = np.resize(self.values, new_capacity)
+            self.history_indices = np.resize(self.history_indices, new_capacity)
+        self.values[self.size:new_size] = values
+        self.history_indices[self.size:new_size] = history_indices
+        self.size = new_size
+
+    def count_until(self, history_index):
+        """指定した履歴インデックスまでに含まれるサンプル数を返す"""
+        return int(np.searchsorted(self.history_indices[:self.size], history_index, side='right'))
+
+
+class IncrementalFeatureEngine:
+    """
+    全区間の特徴量をインクリメンタルに計算するエンジン。
+    履歴を毎ティックDataFrameに変換し直す代わりに、(ID, 変数) ごとのバッファへ
+    新しいサンプルだけを追記し、サンプル数が変化した系列のみスペクトルを再計算する。
+
+    全区間の周波数軸はサンプル数とともに変わるので、スペクトルを厳密に差分更新することはできない。
+    既定 (refresh_ratio = 0) では毎ティック厳密に計算し直す (1ティックのコストは履歴の長さに比例して増える)。
+    近似は明示的に有効にしたときだけ使う: refresh_ratio = r > 0 のときは、系列の長さが (1 + r) 倍になるたびにだけFFTで計算し直す。
+    長さ n までの計算量の合計は O(n log n / r) なので、1サンプルあたりの償却コストは O(log n / r) になる。
+    その代わり、返す結果は最新の系列のうち少なくとも 1 / (1 + r) の長さの先頭部分から計算したもので、
+    含まれていない新しいサンプルは全体の r / (1 + r) 以下 (r = 0.05 なら約4.8%以下) に限られる。
+    """
+    def __init__(self, data_processor, refresh_ratio=0.0, parity_check=False):
+        """
+        Args:
+            data_processor (DataProcessor): スペクトルのバッチ計算と、パリティチェック時の基準計算に使う。
+            refresh_ratio (float): 0 (既定) なら新しいサンプルが来るたびに厳密に再計算する。
+                正の値なら、前回計算時からサンプル数が (1 + refresh_ratio) 倍に
+                増えるまで前回の結果を使い回す (1サンプルあたりの償却コストが O(log n / refresh_ratio) になる)。
+            parity_check (bool): Trueなら計算結果を DataProcessor.calculate_slope と照合する。
+        """
+        self.data_processor = data_processor
+        self.refresh_ratio = max(0.0, float(refresh_ratio))
+        self.parity_check = parity_check
+        self.parity_mismatches = 0
+        self.reset()
+
+    def reset(self):
+        """取り込み済みの状態をすべて破棄する"""
+        self._series = {}
+        self._source = None
+        self._generation = None
+        self._ingested = 0
+
+    def sync(self, history):
+        """
+        履歴ストア (HistoryStore) のうち、まだ取り込んでいない区間だけをバッファに追記する。
+        履歴が差し替えられた・クリアされた・短くなった場合は最初から取り込み直す。
+        """
+        if (history.origin is not self._source or history.generation != self._generation
+                or len(history) < self._ingested):
+            self.reset()
+            self._source = history.origin
+            self._generation = history.generation
+
+        stop = len(history)
+        if stop == self._ingested:
+            return
+        block = history.data[:, :, self._ingested:stop]
+        valid = ~np.isnan(block)
+        for row, col in zip(*np.nonzero(valid.any(axis=2))):
+            key = (history.ids[row], history.variables[col])
+            buffer = self._series.get(key)
+            if buffer is None:
+                buffer = self._series[key] = _SeriesBuffer()
+            mask = valid[row, col]
+            buffer.extend(np.flatnonzero(mask) + self._ingested, block[row, col][mask])
+        self._ingested = stop
+
+    def compute(self, target_index, active_ids):
+        """
+        履歴の先頭から target_index までを対象に、全IDの特徴量とスペクトルを返す。
+        戻り値は DataProcessor.get_features_from_df と同じ形式。
+        """
+        if not active_ids or target_index < 0:
+            return pd.DataFrame(), {}
+
+        # --- 1. 各系列の対象サンプル数を求め、再計算が必要な系列を集める ---
+        targets = []
+        stale = []
+        for id_name in active_ids:
+            for var in ALL_VARIABLES:
+                buffer = self._series.get((id_name, var))
+                count = buffer.count_until(target_index) if buffer is not None else 0
+                if count == 0:
+                    continue
+                targets.append((id_name, var, buffer))
+                if self._needs_refresh(buffer, count):
+                    stale.append((buffer, count))
+
+        if not targets:
+            return pd.DataFrame(), {}
+
+        # --- 2. 再計算が必要な系列を同じ長さごとにまとめてバッチ計算する ---
+        self._refresh(stale)
+
+        # --- 3. キャッシュ済みの結果から戻り値を組み立てる ---
+        feature_matrix = {id_name: {var: 0 for var in ALL_VARIABLES} for id_name in active_ids}
+        power_spectrums = {id_name: {} for id_name in active_ids}
+        for id_name, var, buffer in targets:
+            slope, freq, amp, intercept = buffer.cached_result
+            feature_matrix[id_name][var] = slope
+            if freq is not None:
+                power_spectrums[id_name][var] = (freq, amp, slope, intercept)
+        return pd.DataFrame(feature_matrix).T, power_spectrums
+
+    def _needs_refresh(self, buffer, count):
+        """キャッシュ済みの結果を使い回せない場合にTrueを返す"""
+        cached_count = buffer.cached_count
+        if cached_count == count:
+            return False
+        if (self.refresh_ratio > 0 and cached_count >= 4 and
+                cached_count < count < cached_count * (1 + self.refresh_ratio)):
+            return False
+        return True
+
+    def _refresh(self, stale):
+        """(バッファ, サンプル数) の組をサンプル数ごとにまとめて再計算し、キャッシュに格納する"""
+        groups = {}
+        for buffer, count in stale:
+            groups.setdefault(count, []).append(buffer)
+
+        for count, buffers in groups.items():
+            matrix = np.stack([buffer.values[:count] for buffer in buffers])
+            results = self.data_processor.calculate_slopes_batch(matrix)
+            for buffer, values, result in zip(buffers, matrix, results):
+                if self.parity_check:
+                    self._check_parity(values, result)
+                buffer.cached_count = count
+                buffer.cached_result = result
+
+    def _check_parity(self, values, result):
+        """計算結果を DataProcessor.calculate_slope の結果と照合する"""
+        ref_slope, _ref_freq, _ref_amp, ref_intercept = self.data_processor.calculate_slope(values)
+        slope, _freq, _amp, intercept = result
+        same_slope = np.isclose(slope, ref_slope, rtol=1e-6, atol=1e-9)
+        same_intercept = (intercept is None and ref_intercept is None) or (
+            intercept is not None and ref_intercept is not None and
+            np.isclose(intercept, ref_intercept, rtol=1e-6, atol=1e-9))
+        if not (same_slope and same_intercept):
+            self.parity_mismatches += 1
+            print(f"WARN: インクリメンタル計算の結果が calculate_slope と一致しません "
+                  f"(n={len(values)}, slope={slope}, 基準={ref_slope})")
+
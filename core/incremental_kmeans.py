@@ -0,0 +1,107 @@
+# ファイル名: core/incremental_kmeans.py (新規作成)
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans
+
+
+class IncrementalKMeans:
+    """
+    ティックごとのk-meansを、前回の重心から1回だけ反復を始める (init=前回の重心, n_init=1) ことで軽くするクラス。
+    新しい重心は前回の重心と対応付けてクラスタ番号を揃えるので、ティックの間で番号 (色) が入れ替わらない。
+
+    前回の重心から始めた結果の1点あたりのイナーシャが、最後に全体から計算し直したときの
+    refit_ratio 倍を超えたら、局所解に留まったとみなして全体から計算し直す (kや次元が変わったときも同様)。
+    """
+    def __init__(self, refit_ratio=1.5):
+        """
+        Args:
+            refit_ratio (float): 全体から計算し直すイナーシャの悪化の割合。
+        """
+        self.refit_ratio = max(1.0, float(refit_ratio))
+        self.reset()
+
+    def reset(self):
+        """前回の重心を破棄する (次の update は全体から計算する)"""
+        self.centers = None
+        self._baseline_inertia = None
+        self._last_key = None
+        self._last_labels = None
+
+        # --- 計測用カウンタ ---
+        self.warm_fits = 0
+        self.full_refits = 0
+
+    def update(self, scaled_features, k, full_fit, fingerprint=None):
+        """
+        クラスタ番号を返す。
+
+        Args:
+            scaled_features (np.ndarray): 標準化した (ID, 特徴量) の行列。
+            k (int): クラスタ数。
+            full_fit (callable): 全体から計算し直すときに呼ぶ。クラスタ番号の配列を返す
+                (ClusterResultCache.kmeans_labels を渡せば、先読み済みの結果を使える)。
+            fingerprint (str | None): 特徴量の指紋。前回と同じでkも同じなら、計算せずに前回の番号を返す。
+        """
+        if fingerprint is not None and self._last_key == (fingerprint, k):
+            return self._last_labels
+
+        num_features = scaled_features.shape[1]
+        can_warm_start = (self.centers is not None and len(self.centers) == k
+                          and self.centers.shape[1] == num_features)
+        labels = None
+        if can_warm_start:
+            kmeans = KMeans(n_clusters=k, init=self.centers, n_init=1)
+            labels = kmeans.fit_predict(scaled_features)
+            centers = kmeans.cluster_centers_
+            inertia = kmeans.inertia_ / len(scaled_features)
+            self.warm_fits += 1
+            if self._baseline_inertia is not None and inertia > self._baseline_inertia * self.refit_ratio:
+                labels = None
+
+        if labels is None:
+            labels = np.asarray(full_fit())
+            centers = self._centers_of(scaled_features, labels, k)
+            inertia = self._inertia(scaled_features, labels, centers)
+            self._baseline_inertia = inertia
+            self.full_refits += 1
+
+        labels, centers = self._match_previous(labels, centers)
+        self.centers = centers
+        self._last_key = (fingerprint, k) if fingerprint is not None else None
+        self._last_labels = labels
+        return labels
+
+    def _match_previous(self, labels, centers):
+        """新しい重心を前回の重心に最も近い組み合わせで対応付け、クラスタ番号を付け替える"""
+        if self.centers is None or self.centers.shape[1] != centers.shape[1]:
+            return labels, centers
+        cost = np.linalg.norm(centers[:, np.newaxis, :] - self.centers[np.newaxis, :, :], axis=2)
+        new_rows, previous_rows = linear_sum_assignment(cost)
+
+        # kが減ったときは範囲外になる番号を使わず、対応先のない重心には使われていない番号を小さい順に割り当てる
+        valid = previous_rows < len(centers)
+        mapping = np.full(len(centers), -1, dtype=np.int64)
+        mapping[new_rows[valid]] = previous_rows[valid]
+        used = set(mapping[mapping >= 0].tolist())
+        unused = [label for label in range(len(centers)) if label not in used]
+        mapping[mapping < 0] = unused[:int((mapping < 0).sum())]
+
+        reordered = np.empty_like(centers)
+        reordered[mapping] = centers
+        return mapping[labels], reordered
+
+    @staticmethod
+    def _centers_of(scaled_features, labels, k):
+        """クラスタ番号から重心を求める (空のクラスタは原点)"""
+        centers = np.zeros((k, scaled_features.shape[1]), dtype=np.float64)
+        for label in range(k):
+            members = scaled_features[labels == label]
+            if len(members):
+                centers[label] = members.mean(axis=0)
+        return centers
+
+    @staticmethod
+    def _inertia(scaled_features, labels, centers):
+        """1点あたりのイナーシャ (所属する重心までの距離の2乗の平均)"""
+        return float(((scaled_features - centers[labels]) ** 2).sum() / len(scaled_features))
@@ -1,6 +1,7 @@
 # ファイル名: model.py (修正後)
 
 from . import data_loader
+from .history_store import HistoryStore
 
 class AnalysisModel:
     def __init__(self):
@@ -9,7 +10,8 @@ class AnalysisModel:
         計算ロジックは持たない。
         """
         # --- データ管理 ---
-        self.full_history = []
+        # 列指向の履歴ストア (ID × 変数 × 時刻)
+        self.full_history = HistoryStore()
         self.active_ids = []
         self.time_series_df = None
         self.csv_replay_data = None
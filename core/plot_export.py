@@ -0,0 +1,183 @@
+# ファイル名: core/plot_export.py (新規作成)
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# 描画プロセスに引き継ぐmatplotlibの設定 (日本語フォントなど)
+INHERITED_RC_KEYS = ('font.family', 'font.sans-serif')
+
+
+# ============================================================
+# 描画関数 (pyplotを使わず Figure + Aggキャンバスで描くので、どのスレッド・プロセスからでも呼べる)
+# ============================================================
+def draw_radar(ax, labels, rows, title, max_val, show_values=True):
+    """
+    レーダーチャートを1つ描画する。
+
+    Args:
+        labels (list[str]): 軸ラベル (変数名)。
+        rows (list[tuple[str, list[float]]]): 凡例名と各軸の値の組。
+    """
+    num_vars = len(labels)
+
+    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
+    angles_closed = angles + angles[:1]
+
+    ax.set_theta_offset(np.pi / 2)
+    ax.set_theta_direction(-1)
+
+    ax.set_xticks(angles)
+    ax.set_xticklabels(labels, fontsize=8)
+
+    ax.set_ylim(0, max_val)
+    ax.set_title(title, pad=25)
+
+    for row_name, stats in rows:
+        stats = list(stats)
+        stats_closed = stats + stats[:1]
+        ax.plot(angles_closed, stats_closed, label=row_name)
+        ax.fill(angles_closed, stats_closed, alpha=0.1)
+
+        if show_values:
+            for angle, value in zip(angles, stats):
+                ax.text(angle, value + 0.05, f"{value:.2f}",
+                        ha='center', va='center', fontsize=7, color='black')
+
+    if rows:
+        ax.legend(loc='upper right', bbox_to_anchor=(1.25, 1.15), fontsize='small')
+
+
+def render_spectrum(task):
+    """1変数分のパワースペクトルのグラフをPNGに保存する"""
+    freq, amp = np.asarray(task['freq']), np.asarray(task['amp'])
+    slope, intercept = task['slope'], task['intercept']
+    label = f"{task['id_name']}_{task['param_name']}"
+
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.loglog(freq, amp, label=label)
+
+    if slope is not None and intercept is not None:
+        fit_line = 10**(slope * np.log10(freq) + intercept)
+        ax.loglog(freq, fit_line, '--')
+        equation = f"y={slope:.2f}x+{intercept:.2f}"
+        ax.set_title(f"パワースペクトル - {label}\n({equation})")
+    else:
+        ax.set_title(f"パワースペクトル - {label}")
+
+    ax.set_xlabel("Frequency (log)")
+    ax.set_ylabel("Amplitude (log)")
+    ax.grid(True, which="both", ls="--")
+    ax.legend()
+
+    fig.suptitle(f"Saved at: {task['timestamp']:.1f} sec", fontsize=10, y=0.02, ha='right')
+    fig.savefig(task['file_path'], dpi=150)
+
+
+def render_radar(task):
+    """1ID分の感情・行動レーダーチャートをPNGに保存する"""
+    fig = Figure(figsize=(14, 6))
+    FigureCanvasAgg(fig)
+    ax1 = fig.add_subplot(1, 2, 1, polar=True)
+    ax2 = fig.add_subplot(1, 2, 2, polar=True)
+    id_name = task['id_name']
+
+    draw_radar(ax1, task['emotion_labels'], [(id_name, task['emotion_values'])],
+               f"感情 (EMOTION) - {id_name}", task['max_val'], show_values=True)
+    draw_radar(ax2, task['behavior_labels'], [(id_name, task['behavior_values'])],
+               f"行動 (BEHAVIOR) - {id_name}", task['max_val'], show_values=True)
+
+    fig.suptitle(f"Saved at: {task['timestamp']:.1f} sec", fontsize=10, y=0.02, ha='right')
+    fig.savefig(task['file_path'], dpi=150)
+
+
+RENDERERS = {
+    'spectrum': render_spectrum,
+    'radar': render_radar,
+}
+
+
+def render_task(task):
+    """描画タスク (kind と描画に必要な値だけを持つ辞書) を1件描画して保存する"""
+    RENDERERS[task['kind']](task)
+
+
+def _render_chunk(tasks):
+    """【描画プロセスで実行】複数のタスクをまとめて描画し、描画した件数を返す"""
+    for task in tasks:
+        render_task(task)
+    return len(tasks)
+
+
+def _init_worker(rc_params):
+    """【描画プロセスで実行】フォントなどの設定を親プロセスと揃える"""
+    matplotlib.use('Agg')
+    matplotlib.rcParams.update(rc_params)
+
+
+# ============================================================
+# エクスポートエンジン
+# ============================================================
+class PlotExporter:
+    """
+    描画タスクをAggバックエンドのプロセスプールに振り分けてPNGを書き出すエンジン。
+    プールは初回の書き出し時に起動し、以降の書き出しでも使い回す。
+    """
+    def __init__(self, max_workers=None, chunk_size=8):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            rc_params = {key: matplotlib.rcParams[key] for key in INHERITED_RC_KEYS}
+            # Tkのスレッドを抱えたプロセスをforkしないよう、spawnで起動する
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(rc_params,)
+            )
+        return self._executor
+
+    def run(self, tasks, progress_callback=None, cancel_check=None):
+        """
+        タスクを並列に描画する。チャンクが終わるたびに、その件数だけ progress_callback を呼ぶ。
+
+        Returns:
+            bool: 全件を描画できればTrue。キャンセルされた場合はFalse。
+        """
+        if not tasks:
+            return True
+        executor = self._get_executor()
+        chunks = [tasks[i:i + self.chunk_size] for i in range(0, len(tasks), self.chunk_size)]
+        pending = {executor.submit(_render_chunk, chunk) for chunk in chunks}
+
+        try:
+            while pending:
+                if cancel_check and cancel_check():
+                    return False
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    count = future.result()
+                    if progress_callback:
+                        for _ in range(count):
+                            progress_callback()
+            return True
+        finally:
+            # キャンセルやエラーで抜けた場合、未着手のチャンクは破棄する
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self, wait=False):
+        """プロセスプールを終了する (wait=True なら描画プロセスの終了まで待つ)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
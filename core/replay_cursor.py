@@ -0,0 +1,75 @@
+# ファイル名: core/replay_cursor.py (新規作成)
+
+import math
+import numpy as np
+from constants import ALL_VARIABLES
+
+
+class ReplayCursor:
+    """
+    CSVリプレイ用のカーソル。
+    '{ID}_{変数}' 列を持つDataFrameを最初に一度だけ (時刻, ID, 変数) の連続したNumPy配列に変換し、
+    以降は行ごとに iloc や列名の組み立てをせずにパケット辞書や行ブロックを取り出す。
+    """
+    def __init__(self, df, active_ids, variables=ALL_VARIABLES):
+        self.variables = list(variables)
+        self.timestamps = np.asarray(df.index, dtype=np.float64)
+
+        # 列名 → (ID, 変数) の対応表。DataFrameに列が1つもないIDは対象外
+        self.column_map = {}
+        for id_name in active_ids:
+            for var in self.variables:
+                column_name = f"{id_name}_{var}"
+                if column_name in df.columns:
+                    self.column_map[column_name] = (id_name, var)
+        self.ids = [id_name for id_name in active_ids
+                    if any(mapped_id == id_name for mapped_id, _ in self.column_map.values())]
+        id_pos = {id_name: i for i, id_name in enumerate(self.ids)}
+        var_pos = {var: j for j, var in enumerate(self.variables)}
+
+        # 欠損や存在しない列はNaNのまま残す
+        self.values = np.full((len(df), len(self.ids), len(self.variables)), np.nan, dtype=np.float64)
+        for column_name, (id_name, var) in self.column_map.items():
+            self.values[:, id_pos[id_name], var_pos[var]] = df[column_name].to_numpy(dtype=np.float64)
+
+        self.position = 0
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def remaining(self):
+        """まだ取り出していない行数"""
+        return len(self) - self.position
+
+    def seek(self, position):
+        """次に取り出す行の位置を設定する"""
+        self.position = max(0, min(int(position), len(self)))
+
+    def next_packet(self):
+        """次の1行をパケット辞書として返し、位置を進める。終端なら None"""
+        if self.position >= len(self):
+            return None
+        packet = self.packet_at(self.position)
+        self.position += 1
+        return packet
+
+    def packet_at(self, index):
+        """指定行をパケット辞書 ({'timestamp': t, 'ID_n': {var: value}}) に組み立てる (欠損値は含めない)"""
+        packet = {'timestamp': float(self.timestamps[index])}
+        for id_name, row in zip(self.ids, self.values[index].tolist()):
+            id_data = {var: value for var, value in zip(self.variables, row) if not math.isnan(value)}
+            if id_data:
+                packet[id_name] = id_data
+        return packet
+
+    def next_rows(self, count):
+        """
+        最大 count 行をまとめて取り出し、位置を進める。
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: タイムスタンプと (行, ID, 変数) の値配列のビュー。終端なら長さ0。
+        """
+        start = self.position
+        stop = min(len(self), start + max(0, int(count)))
+        self.position = stop
+        return self.timestamps[start:stop], self.values[start:stop]
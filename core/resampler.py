@@ -0,0 +1,138 @@
+# ファイル名: core/resampler.py (新規作成)
+
+import numpy as np
+
+
+class UniformGridResampler:
+    """
+    不規則な時刻に届くサンプルを、一定間隔 (interval 秒) の時間グリッドに載せ直すストリーミング処理。
+    スペクトル計算は等間隔サンプルを前提にしているので、リアルタイムの値は履歴に入れる前にここを通す。
+
+    各グリッドのセル [t0 + k*interval, t0 + (k+1)*interval) に入ったサンプルをID・変数ごとに平均する。
+    セルが確定するのは、それより後の時刻のサンプルが届いたとき (キャプチャ側の時刻は単調に増える)。
+    サンプルのないセルは gap_fill が 'hold' なら直前の値で埋め (ただし最後の観測から max_gap 秒以内まで)、
+    'none' ならNaNのままにする。計算は全ID・全変数をまとめて配列で行う。
+
+    入出力は HistoryStore.extend_rows と同じ (timestamps, ids, values[行, ID, 変数]) の形式。
+    """
+    GAP_FILLS = ('none', 'hold')
+
+    def __init__(self, num_variables, interval=1.0, gap_fill='hold', max_gap=3.0):
+        self.num_variables = num_variables
+        self.interval = float(interval)
+        self.gap_fill = gap_fill if gap_fill in self.GAP_FILLS else 'hold'
+        self.max_gap_cells = int(np.floor(max(0.0, float(max_gap)) / self.interval + 1e-9))
+        self.reset()
+
+    def reset(self):
+        """状態をすべて破棄する (新しい計測を始めるとき)"""
+        self.ids = []
+        self._id_index = {}
+        self._origin = None         # グリッドの原点 t0
+        self._next_cell = 0         # 次に確定させるセルの番号
+        # まだ確定していないセルのサンプル
+        self._pending_timestamps = np.empty(0, dtype=np.float64)
+        self._pending_values = np.empty((0, 0, self.num_variables), dtype=np.float32)
+        # ID・変数ごとの最後の観測値と、それを観測したセルの番号 (穴埋め用)
+        self._last_values = np.empty((0, self.num_variables), dtype=np.float32)
+        self._last_cells = np.empty((0, self.num_variables), dtype=np.int64)
+
+    def _register_ids(self, ids):
+        """新しいIDを登録し、入力のIDの並びを内部の並びに対応付ける番号を返す"""
+        new_ids = [id_name for id_name in ids if id_name not in self._id_index]
+        if new_ids:
+            for id_name in new_ids:
+                self._id_index[id_name] = len(self.ids)
+                self.ids.append(id_name)
+            grow = len(new_ids)
+            self._pending_values = np.concatenate(
+                [self._pending_values,
+                 np.full((len(self._pending_timestamps), grow, self.num_variables), np.nan, dtype=np.float32)], axis=1)
+            self._last_values = np.concatenate(
+                [self._last_values, np.full((grow, self.num_variables), np.nan, dtype=np.float32)])
+            self._last_cells = np.concatenate(
+                [self._last_cells, np.full((grow, self.num_variables), -1, dtype=np.int64)])
+        return [self._id_index[id_name] for id_name in ids]
+
+    def push(self, timestamps, ids, values):
+        """
+        サンプルを追加し、確定したセルの値を返す。
+
+        Returns:
+            tuple[np.ndarray, list[str], np.ndarray]: セルの開始時刻、ID、(セル, ID, 変数) の値。
+                確定したセルがなければ行数0の配列。
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps):
+            columns = self._register_ids(ids)
+            incoming = np.full((len(timestamps), len(self.ids), self.num_variables), np.nan, dtype=np.float32)
+            incoming[:, columns] = values
+            if self._origin is None:
+                self._origin = float(timestamps[0])
+            self._pending_timestamps = np.concatenate([self._pending_timestamps, timestamps])
+            self._pending_values = np.concatenate([self._pending_values, incoming])
+
+        if not len(self._pending_timestamps):
+            return self._empty_result()
+
+        # 最新のサンプルが入っているセルより前は、もうサンプルが来ないので確定できる
+        cells = np.floor((self._pending_timestamps - self._origin) / self.interval).astype(np.int64)
+        cells = np.maximum(cells, self._next_cell)
+        closed_until = int(cells.max())
+        if closed_until <= self._next_cell:
+            return self._empty_result()
+
+        closing = cells < closed_until
+        result = self._bin(cells[closing] - self._next_cell, self._pending_values[closing], closed_until - self._next_cell)
+        self._pending_timestamps = self._pending_timestamps[~closing]
+        self._pending_values = self._pending_values[~closing]
+
+        first_cell = self._next_cell
+        self._next_cell = closed_until
+        grid = self._origin + self.interval * np.arange(first_cell, closed_until, dtype=np.float64)
+        return grid, list(self.ids), self._fill_gaps(result, first_cell)
+
+    def _bin(self, offsets, values, num_cells):
+        """セルごとにサンプルを平均する (観測のないところはNaN)"""
+        observed = ~np.isnan(values)
+        sums = np.zeros((num_cells,) + values.shape[1:], dtype=np.float64)
+        counts = np.zeros((num_cells,) + values.shape[1:], dtype=np.int64)
+        np.add.at(sums, offsets, np.where(observed, values, 0.0))
+        np.add.at(counts, offsets, observed)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan).astype(np.float32)
+
+    def _fill_gaps(self, block, first_cell):
+        """観測のないセルを直前の値で埋め、ID・変数ごとの最後の観測値を更新する"""
+        num_cells = len(block)
+        cell_numbers = first_cell + np.arange(num_cells, dtype=np.int64)[:, np.newaxis, np.newaxis]
+        observed = ~np.isnan(block)
+
+        # 各セルから見て、最後に観測されたセルの番号 (このブロックより前なら保存してある番号)
+        last_cells = np.where(observed, cell_numbers, -1)
+        last_cells = np.maximum(np.maximum.accumulate(last_cells, axis=0), self._last_cells[np.newaxis])
+
+        if self.gap_fill == 'hold':
+            # このブロック内の位置、またはブロックより前なら保存してある値から引く
+            source = last_cells - first_cell
+            within = source >= 0
+            id_axis = np.arange(block.shape[1])[np.newaxis, :, np.newaxis]
+            var_axis = np.arange(block.shape[2])[np.newaxis, np.newaxis, :]
+            held = np.where(within,
+                            block[np.clip(source, 0, None), id_axis, var_axis],
+                            self._last_values[np.newaxis])
+            fillable = (~observed & (last_cells >= 0) & (cell_numbers - last_cells <= self.max_gap_cells))
+            block = np.where(fillable, held, block)
+
+        # 次のブロックのために最後の観測値を更新する
+        any_observed = observed.any(axis=0)
+        if any_observed.any():
+            last_row = num_cells - 1 - np.argmax(observed[::-1], axis=0)
+            latest = np.take_along_axis(block, last_row[np.newaxis], axis=0)[0]
+            self._last_values = np.where(any_observed, latest, self._last_values)
+            self._last_cells = np.where(any_observed, first_cell + last_row, self._last_cells)
+        return block
+
+    def _empty_result(self):
+        return (np.empty(0, dtype=np.float64), list(self.ids),
+                np.empty((0, len(self.ids), self.num_variables), dtype=np.float32))
@@ -4,12 +4,12 @@ from tkinter import filedialog
 import threading
 import os
 from datetime import datetime
-import pandas as pd
-import matplotlib
 
 from app.views.progress_dialog import ProgressDialog
 from app.views.save_selection_dialog import SaveSelectionDialog
 from constants import ALL_VARIABLES
+from core.feature_export import save_features_csv, save_slopes_csv
+from core.plot_export import PlotExporter
 
 class SaveManager:
     def __init__(self, controller):
@@ -19,6 +19,8 @@ class SaveManager:
         self.controller = controller
         self.app = controller.app
         self.model = controller.model
+        # グラフ画像の並列書き出しエンジン (プロセスプールは初回の保存時に起動する)
+        self.plot_exporter = PlotExporter()
 
     def save_all_plots(self, save_timestamp):
         """【司令塔】指定されたタイムスタンプのスナップショットを保存する"""
@@ -30,16 +32,14 @@ class SaveManager:
         # --- 1. 保存対象となるデータのスナップショットを作成 ---
         history_slice_to_save = self.model.full_history[:save_index + 1]
         sliding_slice_to_save = self.model.full_history[max(0, save_index - self.controller.sliding_window + 1): save_index + 1]
-        save_timestamp = history_slice_to_save[-1]['timestamp']
+        save_timestamp = float(history_slice_to_save.timestamps[-1])
         
-        data_processor = self.controller.data_processor
+        # 表示中の時点であれば、解析時に計算済みの結果をキャッシュから再利用する
+        analysis_service = self.controller.analysis_service
         active_ids = self.model.active_ids
 
-        df_full_history = data_processor.convert_history_to_df(history_slice_to_save, active_ids)
-        df_full, ps_full = data_processor.get_features_from_df(df_full_history, active_ids)
-
-        df_sliding_history = data_processor.convert_history_to_df(sliding_slice_to_save, active_ids)
-        df_sliding, ps_sliding = data_processor.get_features_from_df(df_sliding_history, active_ids)
+        df_full, ps_full = analysis_service.get_window_features(history_slice_to_save, active_ids)
+        df_sliding, ps_sliding = analysis_service.get_window_features(sliding_slice_to_save, active_ids)
         
         all_data_to_save = {
             'slope_dfs': {'full': df_full, 'sliding': df_sliding},
@@ -93,8 +93,6 @@ class SaveManager:
 
     def _perform_save_thread(self, output_folder, timestamp, all_data, save_selection):
         """【作業員】受け取ったスナップショットデータを元にファイル保存を実行する"""
-        matplotlib.use('Agg')
-        
         def progress_callback():
             self.controller.save_progress += 1
         
@@ -104,34 +102,32 @@ class SaveManager:
             # --- CSVファイルの保存 ---
             if cancel_check(): return
             if save_selection.get("features_csv"):
-                df_to_save = all_data.get('slope_dfs', {}).get('full')
-                if df_to_save is not None and not df_to_save.empty:
-                    filepath = os.path.join(output_folder, "features.csv")
-                    df_to_save.to_csv(filepath, encoding='utf-8-sig')
+                save_features_csv(all_data.get('slope_dfs', {}).get('full'), output_folder)
                 progress_callback()
 
             if cancel_check(): return
             if save_selection.get("slopes_csv"):
-                results_list = []
-                spectrum_data = all_data.get('power_spectrums', {}).get('full', {})
-                for id_name, var_data in spectrum_data.items():
-                    for var_name, spec_tuple in var_data.items():
-                        _freq, _amp, slope, intercept = spec_tuple
-                        if slope is not None and intercept is not None:
-                            results_list.append({'ID': id_name, 'Variable': var_name, 'Slope': slope, 'Intercept': intercept})
-                if results_list:
-                    pd.DataFrame(results_list).to_csv(os.path.join(output_folder, "slopes_and_intercepts.csv"), index=False, encoding='utf-8-sig')
+                save_slopes_csv(all_data.get('power_spectrums', {}).get('full', {}), output_folder)
                 progress_callback()
 
             # --- 各Viewのグラフ保存 ---
+            # 描画タスクを作れるビューはタスクを集めてプロセスプールでまとめて描画し、
+            # それ以外のビューはこのスレッドで save_plot を呼ぶ
+            export_tasks = []
             views = self.app.views
             for view_name, view_instance in views.items():
                 if cancel_check(): break
-                
-                # 選択されており、かつ保存機能を持つビューのみ実行
-                if save_selection.get(view_name) and hasattr(view_instance, 'save_plot'):
-                    if view_name == 'video': continue
-                    
+                if not save_selection.get(view_name) or view_name == 'video':
+                    continue
+
+                if hasattr(view_instance, 'build_export_tasks'):
+                    export_tasks.extend(view_instance.build_export_tasks(
+                        output_folder,
+                        all_data,
+                        progress_callback,
+                        timestamp
+                    ))
+                elif hasattr(view_instance, 'save_plot'):
                     print(f"INFO: {view_name} のグラフを保存します。")
                     view_instance.save_plot(
                         output_folder,
@@ -141,6 +137,11 @@ class SaveManager:
                         cancel_check
                     )
 
+            if export_tasks and not cancel_check():
+                print(f"INFO: {len(export_tasks)} 枚のグラフを並列に描画します。")
+                if not self.plot_exporter.run(export_tasks, progress_callback, cancel_check):
+                    print("INFO: グラフの保存がキャンセルされました。")
+
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -0,0 +1,212 @@
+# ファイル名: core/sliding_dft_engine.py (新規作成)
+
+import numpy as np
+import pandas as pd
+from constants import ALL_VARIABLES
+
+
+class SlidingDFTEngine:
+    """
+    スライディング窓の特徴量をスライディングDFTで更新するエンジン。
+    窓が1サンプル進むごとに、全系列のスペクトルを
+        X'[k] = (X[k] - x_old + x_new) * exp(2πik/N)
+    で一括してO(ビン数)更新し、スペクトルが変化した系列だけ傾きを近似し直す。
+    窓内の有効サンプル数が変わった系列や、窓が連続して進まなかった場合はFFTで計算し直す。
+
+    状態は (ID, 変数, ビン) の配列で持ち、系列ごとの長さ N の違いは回転因子の配列で吸収する。
+    """
+    def __init__(self, data_processor, resync_interval=300, parity_check=False):
+        """
+        Args:
+            data_processor (DataProcessor): 近似計算とパリティチェックに使う。
+            resync_interval (int): 丸め誤差の蓄積を防ぐため、この回数だけ更新したらFFTで再同期する。
+            parity_check (bool): Trueなら計算結果を DataProcessor.calculate_slope と照合する。
+        """
+        self.data_processor = data_processor
+        self.resync_interval = max(1, int(resync_interval))
+        self.parity_check = parity_check
+        self.parity_mismatches = 0
+        self.reset()
+
+    def reset(self):
+        """保持している状態をすべて破棄する"""
+        self._source = None
+        self._generation = None
+        self._start = -1
+        self._stop = -1
+        self._allocate(0, len(ALL_VARIABLES), 1)
+
+    def _allocate(self, num_ids, num_vars, num_bins):
+        """状態配列を確保する。既存の状態は可能な範囲で引き継ぐ"""
+        old = getattr(self, '_spectrum', None)
+        lengths = np.full((num_ids, num_vars), -1, dtype=np.int64)
+        updates = np.zeros((num_ids, num_vars), dtype=np.int64)
+        spectrum = np.zeros((num_ids, num_vars, num_bins), dtype=np.complex128)
+        twiddle = np.zeros((num_ids, num_vars, num_bins), dtype=np.complex128)
+        results = np.empty((num_ids, num_vars), dtype=object)
+        results.fill((0, None, None, None))
+        if old is not None and old.shape[0] <= num_ids and old.shape[2] <= num_bins:
+            r, _, b = old.shape
+            lengths[:r] = self._lengths
+            updates[:r] = self._updates
+            spectrum[:r, :, :b] = self._spectrum
+            twiddle[:r, :, :b] = self._twiddle
+            results[:r] = self._results
+        self._lengths = lengths          # 窓内の有効サンプル数 (-1 は未計算)
+        self._updates = updates          # 前回のFFTによる再同期からの更新回数
+        self._spectrum = spectrum        # rFFTの各ビン (0 .. N//2)。残りは0
+        self._twiddle = twiddle          # 各ビンに掛ける回転因子。残りは0
+        self._results = results          # 系列ごとの (slope, freq, amp, intercept)
+
+    def compute(self, window, active_ids):
+        """
+        HistoryWindow を対象に全IDの特徴量とスペクトルを返す。
+        戻り値は DataProcessor.get_features_from_window と同じ形式。
+
+        前回から窓が複数サンプル進んだ場合 (リサンプルで複数セルが確定したティックや、REPLAY_SPEED > 1) も、
+        進んだサンプル数が窓の長さ以内なら1サンプルずつスライディング更新する。
+        """
+        store = window.store
+        steps = window.stop - self._stop
+        is_continuation = (store.origin is self._source and store.generation == self._generation and
+                           1 <= steps <= max(1, len(window)) and 0 <= window.start - self._start <= steps)
+
+        num_ids = len(store.ids)
+        num_bins = len(window) // 2 + 1
+        if is_continuation:
+            if num_ids > self._spectrum.shape[0] or num_bins > self._spectrum.shape[2]:
+                self._allocate(max(num_ids, self._spectrum.shape[0]), len(store.variables),
+                               max(num_bins, self._spectrum.shape[2]))
+            updated = np.zeros((num_ids, len(store.variables)), dtype=bool)
+            start = self._start
+            for stop in range(self._stop + 1, window.stop + 1):
+                # 途中の窓の開始位置は、1サンプルずつ最終的な開始位置に近づける
+                next_start = max(start, window.start - (window.stop - stop))
+                leaving = start if next_start == start + 1 else None
+                updated |= self._advance(store.window(next_start, stop), leaving)
+                start = next_start
+            # 近似は最後の窓のスペクトルに対して1回だけ行う
+            self._refit(window, updated)
+        else:
+            self.reset()
+            self._source = store.origin
+            self._generation = store.generation
+            self._allocate(num_ids, len(store.variables), num_bins)
+            self._rebuild(window, np.ones((num_ids, len(store.variables)), dtype=bool))
+            self._refit(window, np.ones((num_ids, len(store.variables)), dtype=bool))
+        self._start, self._stop = window.start, window.stop
+
+        return self._assemble(window, active_ids)
+
+    def _advance(self, window, leaving):
+        """
+        窓が1サンプル進んだ分だけ、変化のあった系列のスペクトルを更新する。
+
+        Returns:
+            np.ndarray: スペクトルが変化した系列 (ID × 変数のブール配列)。近似し直すのは呼び出し側。
+        """
+        data = window.store.data
+        num_ids = data.shape[0]
+        entering_values = np.asarray(data[:, :, window.stop - 1], dtype=np.float64)
+        if leaving is not None:
+            leaving_values = np.asarray(data[:, :, leaving], dtype=np.float64)
+        else:
+            leaving_values = np.full(entering_values.shape, np.nan)
+
+        entering_nan = np.isnan(entering_values)
+        leaving_nan = np.isnan(leaving_values)
+        changed = ~(entering_nan & leaving_nan)
+
+        # 有効サンプルが1つ入って1つ抜ける系列だけスライディング更新できる。
+        # 有効サンプル数が変わる (周波数軸が変わる) 系列はFFTで計算し直す。
+        lengths = self._lengths[:num_ids]
+        slide = (changed & ~entering_nan & ~leaving_nan & (lengths >= 4) &
+                 (self._updates[:num_ids] < self.resync_interval))
+        rebuild = changed & ~slide
+
+        spectrum = self._spectrum[:num_ids]
+        if slide.all():
+            # 欠損のない定常状態では全系列をその場で更新する (未使用ビンは回転因子0のまま0に保たれる)
+            spectrum += (entering_values - leaving_values)[:, :, None]
+            spectrum *= self._twiddle[:num_ids]
+            self._updates[:num_ids] += 1
+        elif slide.any():
+            delta = (entering_values - leaving_values)[slide]
+            spectrum[slide] = (spectrum[slide] + delta[:, None]) * self._twiddle[:num_ids][slide]
+            self._updates[:num_ids][slide] += 1
+        self._rebuild(window, rebuild)
+        return changed
+
+    def _rebuild(self, window, target):
+        """
+        target (ID × 変数のブール配列) で指定した系列の窓内スペクトルをFFTで計算し直す。
+        近似し直すのは呼び出し側 (_refit)。
+        """
+        rows, cols = np.nonzero(target)
+        if len(rows) == 0:
+            return
+        matrix = np.asarray(window.data[rows, cols], dtype=np.float64)
+        packed, lengths = self.data_processor.pack_valid(matrix)
+
+        self._lengths[rows, cols] = lengths
+        self._updates[rows, cols] = 0
+        self._spectrum[rows, cols] = 0
+        self._twiddle[rows, cols] = 0
+        for n in np.unique(lengths):
+            if n < 4:
+                continue
+            idx = np.flatnonzero(lengths == n)
+            num_bins = n // 2 + 1
+            self._spectrum[rows[idx], cols[idx], :num_bins] = np.fft.rfft(packed[idx, :n], axis=-1)
+            self._twiddle[rows[idx], cols[idx], :num_bins] = np.exp(2j * np.pi * np.arange(num_bins) / n)
+
+    def _refit(self, window, target):
+        """スペクトルが変化した系列を長さごとにまとめて両対数近似し直す"""
+        rows, cols = np.nonzero(target)
+        lengths = self._lengths[rows, cols]
+        for n in np.unique(lengths):
+            idx = np.flatnonzero(lengths == n)
+            if n < 4:
+                for i in idx:
+                    self._results[rows[i], cols[i]] = (0, None, None, None)
+                continue
+            amplitude = np.abs(self._spectrum[rows[idx], cols[idx], 1:n // 2 + 1]) / (n / 2)
+            for i, result in zip(idx, self.data_processor.fit_spectra_batch(amplitude, int(n))):
+                self._results[rows[i], cols[i]] = result
+                if self.parity_check:
+                    self._check_parity(window, rows[i], cols[i])
+
+    def _assemble(self, window, active_ids):
+        """系列ごとの計算結果を get_features_from_window と同じ形式に組み立てる"""
+        store = window.store
+        ids = [id_name for id_name in active_ids if id_name in store.id_index]
+        if len(window) == 0 or not ids:
+            return pd.DataFrame(), {}
+
+        feature_matrix = np.zeros((len(active_ids), len(ALL_VARIABLES)))
+        power_spectrums = {id_name: {} for id_name in active_ids}
+        for i, id_name in enumerate(active_ids):
+            row = store.id_index.get(id_name)
+            if row is None:
+                continue
+            for col, var in enumerate(store.variables):
+                slope, freq, amp, intercept = self._results[row, col]
+                feature_matrix[i, col] = slope
+                if freq is not None:
+                    power_spectrums[id_name][var] = (freq, amp, slope, intercept)
+        return pd.DataFrame(feature_matrix, index=list(active_ids), columns=ALL_VARIABLES), power_spectrums
+
+    def _check_parity(self, window, row, col):
+        """計算結果を DataProcessor.calculate_slope の結果と照合する"""
+        values = np.asarray(window.data[row, col], dtype=np.float64)
+        values = values[~np.isnan(values)]
+        ref_slope, _ref_freq, _ref_amp, ref_intercept = self.data_processor.calculate_slope(values)
+        slope, _freq, _amp, intercept = self._results[row, col]
+        same_slope = np.isclose(slope, ref_slope, rtol=1e-6, atol=1e-9)
+        same_intercept = (intercept is None and ref_intercept is None) or (
+            intercept is not None and ref_intercept is not None and
+            np.isclose(intercept, ref_intercept, rtol=1e-6, atol=1e-9))
+        if not (same_slope and same_intercept):
+            self.parity_mismatches += 1
+            print(f"WARN: スライディングDFTの結果が calculate_slope と一致しません "
+                  f"(n={len(values)}, slope={slope}, 基準={ref_slope})")
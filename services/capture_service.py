@@ -5,77 +5,264 @@ import time
 import logging
 import queue
 
-# Orchestratorをインポート
-from .realtime_orchestrator import RealtimeOrchestrator
 from .process_utils import Status, StatusMessage
+from .frame_ring import SharedFrameRing
+from .packet_codec import PacketSender
 
 logger = logging.getLogger(__name__)
 
+# 処理状況 (フレーム数・IDごとのランドマーク抽出レート) をログに出す間隔 (秒)
+STATS_LOG_INTERVAL_SEC = 10.0
+# 停止コマンドを送ってから、ワーカーが計測を終えるのを待つ時間 (秒)
+STOP_TIMEOUT_SEC = 3.0
+
+# 制御チャネルで送るコマンド
+CMD_START = 'start'             # (CMD_START, config): 計測を開始する
+CMD_STOP = 'stop'               # (CMD_STOP, None): 計測を止め、モデルを保持したまま待機する
+CMD_RECONFIGURE = 'reconfigure' # (CMD_RECONFIGURE, config): 新しい設定のモデルを先に読み込んでおく
+CMD_SHUTDOWN = 'shutdown'       # (CMD_SHUTDOWN, None): ワーカープロセスを終了する
+
+
 class CaptureService:
-    def __init__(self, data_queue: multiprocessing.Queue, frame_queue: multiprocessing.Queue, status_queue: multiprocessing.Queue, config: dict):
+    """
+    映像処理を行うキャプチャワーカープロセスを管理するクラス。
+    ワーカーは最初の start() で一度だけ起動し、モデルを読み込んだまま常駐する。
+    開始・停止・設定変更は制御チャネル (キュー) のコマンドで伝えるので、2回目以降の開始では
+    ライブラリのimportやモデルの読み込みをやり直さない。
+    """
+    def __init__(self, data_queue: multiprocessing.Queue, frame_ring: SharedFrameRing, status_queue: multiprocessing.Queue, config: dict = None):
         self.data_queue = data_queue
-        self.frame_queue = frame_queue
+        # 描画済みフレームは共有メモリのリングで受け渡す (キューでpickleしない)
+        self.frame_ring = frame_ring
         # 【追加】
         self.status_queue = status_queue
         self.config = config
         self._process = None
-        self.running = multiprocessing.Event()
+        self._control_queue = None
+        # ワーカーが計測中の間だけセットされる
+        self._session_active = multiprocessing.Event()
+        # セットされている間だけ、ワーカーは描画済みフレームを作って共有メモリに書き込む
+        self._annotate = multiprocessing.Event()
+        self._annotate.set()
 
-    def start(self):
+    def _ensure_worker(self):
+        """ワーカープロセスが動いていなければ起動する"""
         if self._process and self._process.is_alive():
-            logger.info("CaptureServiceは既に実行中です。")
             return
-
-        self.running.set()
+        self._control_queue = multiprocessing.Queue()
+        self._session_active.clear()
         self._process = multiprocessing.Process(
-            target=self._run_capture_loop,
-            # 【変更】status_queueを渡す
-            args=(self.data_queue, self.frame_queue, self.status_queue, self.running, self.config),
+            target=self._run_worker,
+            args=(self._control_queue, self.data_queue, self.frame_ring.spec(), self.status_queue,
+                  self._session_active, self._annotate),
             daemon=True
         )
         self._process.start()
+        logger.info("キャプチャワーカーを起動しました。")
+
+    def start(self, config=None):
+        """計測を開始する (ワーカーが未起動なら起動する)"""
+        if config is not None:
+            self.config = config
+        if self._session_active.is_set():
+            logger.info("CaptureServiceは既に実行中です。")
+            return
+        self._ensure_worker()
+        self._control_queue.put((CMD_START, self.config))
         logger.info("CaptureServiceを開始しました。")
 
     def stop(self):
-        if self.running:
-            self.running.clear()
-        if self._process:
-            self._process.join(timeout=3) # 少し長めに待つ
+        """計測を止める。ワーカーはモデルを保持したまま次の開始を待つ"""
+        if not (self._process and self._process.is_alive()):
+            self._process = None
+            return
+        self._control_queue.put((CMD_STOP, None))
+        deadline = time.monotonic() + STOP_TIMEOUT_SEC
+        while self._session_active.is_set() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        if self._session_active.is_set():
+            logger.warning("キャプチャワーカーが時間内に停止せず、強制終了します。")
+            self._terminate()
+        logger.info("CaptureServiceを停止しました。")
+
+    def set_annotation_enabled(self, enabled):
+        """映像の描画を行うかどうかを切り替える (映像タブの表示・非表示に合わせて呼ぶ)"""
+        if enabled:
+            self._annotate.set()
+        else:
+            self._annotate.clear()
+
+    def reconfigure(self, config):
+        """設定を差し替え、ワーカーが起動済みなら新しい設定のモデルを先に読み込ませる"""
+        self.config = config
+        if self._process and self._process.is_alive():
+            self._control_queue.put((CMD_RECONFIGURE, config))
+
+    def shutdown(self):
+        """ワーカープロセスを終了する (アプリの終了時に呼ぶ)"""
+        if self._process and self._process.is_alive():
+            self._control_queue.put((CMD_SHUTDOWN, None))
+            self._process.join(timeout=STOP_TIMEOUT_SEC)
             if self._process.is_alive():
-                logger.warning("CaptureServiceが時間内に終了せず、強制終了します。")
-                self._process.terminate()
-            logger.info("CaptureServiceを停止しました。")
+                logger.warning("キャプチャワーカーが時間内に終了せず、強制終了します。")
+        self._terminate()
+
+    def _terminate(self):
+        if self._process and self._process.is_alive():
+            self._process.terminate()
         self._process = None
+        self._session_active.clear()
 
+    # ============================================================
+    # ワーカープロセス側
+    # ============================================================
     @staticmethod
-    def _run_capture_loop(data_queue, frame_queue, status_queue, running_event, config):
-        """【別プロセス】Orchestratorを初期化してループ実行する"""
-        logger.info("(別プロセス) 映像処理ループを開始します。")
+    def _run_worker(control_queue, data_queue, frame_ring_spec, status_queue, session_active, annotate_event):
+        """【別プロセス】モデルを保持したまま、制御コマンドに応じて計測を繰り返す"""
+        logger.info("(別プロセス) キャプチャワーカーを開始します。")
+        timings = {}
         try:
-            orchestrator = RealtimeOrchestrator(config)
+            # 重いライブラリ (ultralytics / mediapipe) のimportはワーカーの中で1回だけ行う
+            started = time.perf_counter()
+            from .realtime_orchestrator import RealtimeOrchestrator, WarmModels
+            from .pipelined_orchestrator import PipelinedOrchestrator
+            timings['import'] = time.perf_counter() - started
+            frame_ring = SharedFrameRing.attach(frame_ring_spec)
+        except Exception as e:
+            logger.error(f"(別プロセス) キャプチャワーカーの初期化に失敗: {e}")
+            status_queue.put(StatusMessage(Status.ERROR, f"キャプチャワーカーの初期化に失敗しました:\n{e}"))
+            return
+
+        models = None
+        command = control_queue.get()
+        while command[0] != CMD_SHUTDOWN:
+            action, config = command
+            if action in (CMD_START, CMD_RECONFIGURE):
+                try:
+                    # 読み込みに関わる設定が変わったときだけモデルを読み直す
+                    if models is None or models.key != WarmModels.key_for(config):
+                        if models is not None:
+                            models.close()
+                            models = None
+                        started = time.perf_counter()
+                        models = WarmModels(config)
+                        timings['model_load'] = time.perf_counter() - started
+                        started = time.perf_counter()
+                        models.warmup()
+                        timings['first_inference'] = time.perf_counter() - started
+                        CaptureService._report_timings(status_queue, timings)
+                    elif action == CMD_START:
+                        logger.info("(別プロセス) 読み込み済みのモデルを使って開始します。")
+                except Exception as e:
+                    logger.error(f"(別プロセス) モデルの読み込みに失敗: {e}")
+                    status_queue.put(StatusMessage(Status.ERROR, f"Orchestratorの初期化に失敗しました:\n{e}"))
+                    models = None
+                    action = None
+
+            next_command = None
+            if action == CMD_START:
+                next_command = CaptureService._run_session(
+                    control_queue, data_queue, frame_ring, status_queue, session_active, annotate_event, config, models,
+                    RealtimeOrchestrator, PipelinedOrchestrator
+                )
+            command = next_command or control_queue.get()
+
+        if models is not None:
+            models.close()
+        frame_ring.close()
+        logger.info("(別プロセス) キャプチャワーカーが正常に終了しました。")
+
+    @staticmethod
+    def _report_timings(status_queue, timings):
+        """import・モデル読み込み・初回推論にかかった時間をログとGUIに知らせる"""
+        message = (f"起動時間: import {timings.get('import', 0.0):.2f}s / "
+                   f"モデル読み込み {timings.get('model_load', 0.0):.2f}s / "
+                   f"初回推論 {timings.get('first_inference', 0.0):.2f}s")
+        logger.info(f"(別プロセス) {message}")
+        status_queue.put(StatusMessage(Status.METRICS, message, data=dict(timings)))
+
+    @staticmethod
+    def _run_session(control_queue, data_queue, frame_ring, status_queue, session_active, annotate_event, config, models,
+                     orchestrator_class, pipelined_class):
+        """
+        【別プロセス】1回分の計測を実行する。停止・開始・終了コマンドか映像の終端で戻る。
+        設定変更コマンドでは計測を続け、終了後にモデルを読み込ませるために戻り値で返す。
+
+        Returns:
+            tuple | None: 計測中に届いた、停止以外の処理すべきコマンド。
+        """
+        try:
+            # 'pipelined' ならデコード・検出・ランドマークを別スレッドで並行処理する
+            if config.get('orchestrator_mode', 'serial') == 'pipelined':
+                orchestrator = pipelined_class(config, models=models)
+            else:
+                orchestrator = orchestrator_class(config, models=models)
+            # 特徴量は配列にまとめた PacketBatch で送り、GUI側の取り出しが遅れている間は複数フレーム分を1回で送る
+            packet_sender = PacketSender(
+                data_queue,
+                max_rows=config.get('packet_batch_max_rows', 30),
+                max_delay_sec=config.get('packet_batch_max_delay_ms', 500) / 1000.0
+            )
         except Exception as e:
             logger.error(f"(別プロセス) Orchestratorの初期化に失敗: {e}")
             # 【追加】初期化失敗をGUIに通知
             status_queue.put(StatusMessage(Status.ERROR, f"Orchestratorの初期化に失敗しました:\n{e}"))
-            return
+            return None
+
+        session_active.set()
+        logger.info("(別プロセス) 映像処理ループを開始します。")
+        pending_command = None
+        last_stats_log = time.monotonic()
+        try:
+            while True:
+                # 制御コマンドはフレームごとに確認する
+                try:
+                    command = control_queue.get_nowait()
+                except queue.Empty:
+                    command = None
+                if command is not None:
+                    if command[0] == CMD_RECONFIGURE:
+                        # 計測中の設定変更では計測を止めず、最新のものを計測の終了後まで持ち越す
+                        pending_command = command
+                    else:
+                        if command[0] != CMD_STOP:
+                            pending_command = command
+                        break
+                orchestrator.annotate = annotate_event.is_set()
+                # 人物がいないフレームが続いたり、映像が止まったりしても、溜まっている行は max_delay_sec 以内に送る
+                packet_sender.poll()
+
+                try:
+                    feature_packet, annotated_frame = orchestrator.process_one_frame()
+
+                    if feature_packet is None and annotated_frame is None:
+                        logger.info("(別プロセス) 映像ソースの終端に達したため、ループを終了します。")
+                        packet_sender.flush()
+                        # 【追加】再生完了をGUIに通知
+                        status_queue.put(StatusMessage(Status.COMPLETED, "映像ソースの再生が完了しました。"))
+                        break
+
+                    # 特徴量はキューで、フレームは共有メモリのスロットへ直接書き込んで受け渡す
+                    if feature_packet:
+                        packet_sender.add(feature_packet)
+                    if annotated_frame is not None:
+                        frame_ring.write(annotated_frame)
+
+                    if time.monotonic() - last_stats_log >= STATS_LOG_INTERVAL_SEC:
+                        last_stats_log = time.monotonic()
+                        stats = orchestrator.get_stats()
+                        rates = ", ".join(f"{pid}: {hz:.1f}Hz" for pid, hz in sorted(stats['landmark_hz'].items()))
+                        logger.info(f"(別プロセス) 処理 {stats['frames_processed']} フレーム / 読み飛ばし {stats['frames_dropped']} フレーム / "
+                                    f"ランドマーク抽出レート [{rates}]")
 
-        while running_event.is_set():
-            try:
-                # (略: 1フレーム処理を実行)
-                feature_packet, annotated_frame = orchestrator.process_one_frame()
-
-                if feature_packet is None and annotated_frame is None:
-                    logger.info("(別プロセス) 映像ソースの終端に達したため、ループを終了します。")
-                    # 【追加】再生完了をGUIに通知
-                    status_queue.put(StatusMessage(Status.COMPLETED, "映像ソースの再生が完了しました。"))
-                    break
-                # (略: キューへの送信処理)
-
-            except Exception as e:
-                logger.error(f"(別プロセス) フレーム処理中にエラーが発生: {e}")
-                # 【追加】実行時エラーをGUIに通知
-                status_queue.put(StatusMessage(Status.ERROR, f"フレーム処理中にエラーが発生しました:\n{e}"))
-                time.sleep(1)
-
-        orchestrator.release()
-        logger.info("(別プロセス) 映像処理ループが正常に終了しました。")
\ No newline at end of file
+                except Exception as e:
+                    logger.error(f"(別プロセス) フレーム処理中にエラーが発生: {e}")
+                    # 【追加】実行時エラーをGUIに通知
+                    status_queue.put(StatusMessage(Status.ERROR, f"フレーム処理中にエラーが発生しました:\n{e}"))
+                    time.sleep(1)
+        finally:
+            packet_sender.flush()
+            orchestrator.release()
+            session_active.clear()
+            logger.info("(別プロセス) 映像処理ループが終了しました。モデルを保持したまま待機します。")
+        return pending_command
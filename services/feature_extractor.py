@@ -1,6 +1,9 @@
 # ファイル名: services/feature_extractor.py (修正後)
 
 import cv2
+import queue
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
@@ -11,19 +14,50 @@ from .analysis_utils import calculate_emotion_features, calculate_head_pose_feat
 logger = logging.getLogger(__name__)
 
 class FeatureExtractor:
-    """MediaPipeを使い、人物画像から特徴量を抽出するクラス。"""
+    """
+    MediaPipeを使い、人物画像から特徴量を抽出するクラス。
 
-    def __init__(self, model_path):
+    mosaic_faces が2以上の場合、extract_many では複数の人物画像を1枚のモザイク画像に並べて
+    1回の detect で処理し、検出した顔をタイルの位置から元の人物に対応付ける。
+    人数が増えても、1フレームあたりの推論回数はほぼ一定になる。
+    """
+
+    def __init__(self, model_path, mosaic_faces=0, tile_size=256):
         logger.info(f"MediaPipeモデル '{model_path}' を読み込んでいます...")
+        self.landmarker = self._create_landmarker(model_path, num_faces=1)
+
+        self.mosaic_faces = int(mosaic_faces) if mosaic_faces and int(mosaic_faces) > 1 else 0
+        self.tile_size = max(64, int(tile_size))
+        self.mosaic_landmarker = None
+        if self.mosaic_faces:
+            # num_faces は作成時にしか指定できないので、モザイク用に別のインスタンスを用意する
+            self.mosaic_landmarker = self._create_landmarker(model_path, num_faces=self.mosaic_faces)
+            logger.info(f"モザイク画像で最大 {self.mosaic_faces} 人分をまとめて処理します。")
+        logger.info("MediaPipeモデルの読み込みが完了しました。")
+
+    @staticmethod
+    def _create_landmarker(model_path, num_faces):
         base_options = python.BaseOptions(model_asset_path=model_path)
         options = vision.FaceLandmarkerOptions(
             base_options=base_options,
             output_face_blendshapes=True,
             output_facial_transformation_matrixes=True,
-            num_faces=1
+            num_faces=num_faces
         )
-        self.landmarker = vision.FaceLandmarker.create_from_options(options)
-        logger.info("MediaPipeモデルの読み込みが完了しました。")
+        return vision.FaceLandmarker.create_from_options(options)
+
+    @staticmethod
+    def _build_features(face_blendshapes, facial_transformation_matrixes):
+        """1人分の検出結果から特徴量の辞書を作る (顔が見つからなければ全て0)"""
+        # すべての変数を0で初期化
+        features = {var: 0.0 for var in ALL_VARIABLES}
+
+        # 感情の計算をヘルパー関数に任せる
+        features.update(calculate_emotion_features(face_blendshapes))
+
+        # 頭の向きの計算をヘルパー関数に任せる
+        features.update(calculate_head_pose_features(facial_transformation_matrixes))
+        return features
 
     def extract(self, person_image):
         """
@@ -35,15 +69,152 @@ class FeatureExtractor:
         # ランドマークを検出
         detection_result = self.landmarker.detect(mp_image)
 
-        # すべての変数を0で初期化
-        features = {var: 0.0 for var in ALL_VARIABLES}
+        return self._build_features(detection_result.face_blendshapes,
+                                    detection_result.facial_transformation_matrixes)
 
-        # 感情の計算をヘルパー関数に任せる
-        emotion_features = calculate_emotion_features(detection_result.face_blendshapes)
-        features.update(emotion_features)
+    def extract_many(self, person_images):
+        """複数の人物画像から特徴量を抽出し、入力と同じ順序のリストで返す"""
+        if not self.mosaic_faces or len(person_images) <= 1:
+            return [self.extract(person_image) for person_image in person_images]
+        results = []
+        for start in range(0, len(person_images), self.mosaic_faces):
+            chunk = person_images[start:start + self.mosaic_faces]
+            if len(chunk) == 1:
+                results.append(self.extract(chunk[0]))
+            else:
+                results.extend(self._extract_mosaic(chunk))
+        return results
 
-        # 頭の向きの計算をヘルパー関数に任せる
-        head_pose_features = calculate_head_pose_features(detection_result.facial_transformation_matrixes)
-        features.update(head_pose_features)
-        
-        return features
\ No newline at end of file
+    def _extract_mosaic(self, person_images):
+        """人物画像をタイル状に並べた1枚の画像で顔を検出し、タイルごとの特徴量を返す"""
+        count = len(person_images)
+        cols = int(np.ceil(np.sqrt(count)))
+        rows = int(np.ceil(count / cols))
+        tile = self.tile_size
+        # 隣のタイルの顔とつながらないよう、タイルの周囲に余白を残す
+        margin = tile // 16
+        inner = tile - 2 * margin
+
+        mosaic = np.zeros((rows * tile, cols * tile, 3), dtype=np.uint8)
+        for index, person_image in enumerate(person_images):
+            height, width = person_image.shape[:2]
+            if height == 0 or width == 0:
+                continue
+            scale = inner / max(height, width)
+            resized = cv2.resize(person_image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                 interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+            top = (index // cols) * tile + margin
+            left = (index % cols) * tile + margin
+            mosaic[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+
+        # 色変換もモザイク全体で1回だけ行う
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(mosaic, cv2.COLOR_BGR2RGB))
+        detection_result = self.mosaic_landmarker.detect(mp_image)
+
+        # 顔のランドマークの中心がどのタイルにあるかで人物に対応付ける。
+        # 1つのタイルに複数の顔があれば、最も大きく写っている顔を採用する
+        assigned = {}   # タイル番号 -> (顔の大きさ, 検出結果の番号)
+        for face_index, landmarks in enumerate(detection_result.face_landmarks):
+            xs = np.array([landmark.x for landmark in landmarks])
+            ys = np.array([landmark.y for landmark in landmarks])
+            col = min(cols - 1, max(0, int(xs.mean() * cols)))
+            row = min(rows - 1, max(0, int(ys.mean() * rows)))
+            tile_index = row * cols + col
+            if tile_index >= count:
+                continue
+            area = (xs.max() - xs.min()) * (ys.max() - ys.min())
+            if tile_index not in assigned or area > assigned[tile_index][0]:
+                assigned[tile_index] = (area, face_index)
+
+        blendshapes = detection_result.face_blendshapes
+        matrixes = detection_result.facial_transformation_matrixes
+        results = []
+        for tile_index in range(count):
+            if tile_index in assigned:
+                face_index = assigned[tile_index][1]
+                results.append(self._build_features(
+                    [blendshapes[face_index]] if blendshapes else [],
+                    [matrixes[face_index]] if matrixes else []
+                ))
+            else:
+                results.append(self._build_features([], []))
+        return results
+
+    def warmup(self):
+        """空の画像で1回推論しておく (初回推論の遅い初期化を先に済ませる)"""
+        blank = np.zeros((self.tile_size, self.tile_size, 3), dtype=np.uint8)
+        self.extract(blank)
+        if self.mosaic_landmarker is not None:
+            self._extract_mosaic([blank, blank])
+
+    def close(self):
+        """リソースを解放する"""
+        self.landmarker.close()
+        if self.mosaic_landmarker is not None:
+            self.mosaic_landmarker.close()
+
+
+class FeatureExtractorPool:
+    """
+    FaceLandmarker のインスタンスを複数保持し、1フレーム内の人物画像をスレッドで並行して処理するクラス。
+    インスタンスは同時に1スレッドからしか使わないよう、空いているものを貸し出して返却させる。
+    FeatureExtractor と同じ extract / extract_many を持つ。
+    モザイク処理が有効なら、人物画像をワーカー数に分けて、それぞれを1枚のモザイクで処理する。
+    """
+
+    def __init__(self, model_path, num_workers, mosaic_faces=0, tile_size=256):
+        self.num_workers = max(1, int(num_workers))
+        logger.info(f"ランドマーク抽出用に {self.num_workers} 個のインスタンスを用意します。")
+        self._idle = queue.Queue()
+        for _ in range(self.num_workers):
+            self._idle.put(FeatureExtractor(model_path, mosaic_faces=mosaic_faces, tile_size=tile_size))
+        self.mosaic_faces = int(mosaic_faces) if mosaic_faces and int(mosaic_faces) > 1 else 0
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="Landmark")
+
+    def extract(self, person_image):
+        extractor = self._idle.get()
+        try:
+            return extractor.extract(person_image)
+        finally:
+            self._idle.put(extractor)
+
+    def warmup(self):
+        """全インスタンスで1回ずつ推論しておく"""
+        extractors = [self._idle.get() for _ in range(self.num_workers)]
+        try:
+            for extractor in extractors:
+                extractor.warmup()
+        finally:
+            for extractor in extractors:
+                self._idle.put(extractor)
+
+    def _extract_chunk(self, person_images):
+        extractor = self._idle.get()
+        try:
+            return extractor.extract_many(person_images)
+        finally:
+            self._idle.put(extractor)
+
+    def extract_many(self, person_images):
+        """全ての人物画像を並行して処理し、入力と同じ順序のリストで返す"""
+        if len(person_images) <= 1:
+            return [self.extract(person_image) for person_image in person_images]
+        chunk_size = 1
+        if self.mosaic_faces:
+            chunk_size = min(self.mosaic_faces, -(-len(person_images) // self.num_workers))
+        chunks = [person_images[i:i + chunk_size] for i in range(0, len(person_images), chunk_size)]
+        return [features for chunk_result in self._executor.map(self._extract_chunk, chunks)
+                for features in chunk_result]
+
+    def close(self):
+        """スレッドを止めて、全インスタンスを解放する"""
+        self._executor.shutdown(wait=True)
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def create_feature_extractor(model_path, num_workers=1, mosaic_faces=0, tile_size=256):
+    """設定されたワーカー数に応じて FeatureExtractor または FeatureExtractorPool を作る"""
+    if int(num_workers) > 1:
+        return FeatureExtractorPool(model_path, num_workers, mosaic_faces=mosaic_faces, tile_size=tile_size)
+    return FeatureExtractor(model_path, mosaic_faces=mosaic_faces, tile_size=tile_size)
@@ -0,0 +1,143 @@
+# services/frame_ring.py
+
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFrameRing:
+    """
+    プロセス間で映像フレームを受け渡す共有メモリ上のリングバッファ。
+    キャプチャプロセスはスロットに直接書き込み、GUIプロセスは最新のスロットをpickleやコピーなしで参照する。
+
+    共有メモリの構成:
+        [ヘッダ: 最新のシーケンス番号, 最新のスロット番号]
+        [スロットごとのメタデータ: シーケンス番号, 高さ, 幅, チャンネル数] × スロット数
+        [スロットごとの画素データ (uint8)] × スロット数
+
+    書き込み側は、書き込み中のスロットのシーケンス番号を -1 にしてから画素を書き、最後に番号を確定させる。
+    読み出し側は読み出しの前後で番号を比べ、書き込み中に追い越されたフレームは捨てる (seqlock)。
+    """
+    HEADER_FIELDS = 2   # latest_sequence, latest_slot
+    META_FIELDS = 4     # sequence, height, width, channels
+    WRITING = -1
+
+    def __init__(self, shm, num_slots, slot_bytes, owner):
+        self._shm = shm
+        self.name = shm.name
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._owner = owner
+
+        header_bytes = (self.HEADER_FIELDS + self.META_FIELDS * num_slots) * 8
+        self._header = np.ndarray((self.HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self._meta = np.ndarray((num_slots, self.META_FIELDS), dtype=np.int64, buffer=shm.buf,
+                                offset=self.HEADER_FIELDS * 8)
+        self._pixels = np.ndarray((num_slots, slot_bytes), dtype=np.uint8, buffer=shm.buf, offset=header_bytes)
+
+        # 書き込み側だけが使う状態
+        self._next_sequence = 0
+        # 読み出し側だけが使う状態
+        self.last_read_sequence = 0
+        self.torn_reads = 0
+
+    @classmethod
+    def create(cls, num_slots=3, max_shape=(1080, 1920, 3)):
+        """共有メモリを確保してリングを作る (GUIプロセス側で1回だけ呼ぶ)"""
+        num_slots = max(2, int(num_slots))
+        slot_bytes = int(np.prod(max_shape))
+        size = (cls.HEADER_FIELDS + cls.META_FIELDS * num_slots) * 8 + slot_bytes * num_slots
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, num_slots, slot_bytes, owner=True)
+        ring._header[:] = 0
+        ring._meta[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        """spec() で得た情報から既存のリングに接続する (キャプチャプロセス側)"""
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        ring = cls(shm, spec['num_slots'], spec['slot_bytes'], owner=False)
+        ring._next_sequence = int(ring._header[0])
+        return ring
+
+    def spec(self):
+        """別プロセスに渡すための接続情報 (pickle可能な辞書)"""
+        return {'name': self.name, 'num_slots': self.num_slots, 'slot_bytes': self.slot_bytes}
+
+    # --- 書き込み側 (キャプチャプロセス) ---
+    def write(self, frame):
+        """
+        フレームを次のスロットにコピーして公開する。スロットに収まらない大きさなら間引いて縮小する。
+
+        Returns:
+            int: 公開したフレームのシーケンス番号。
+        """
+        frame = np.asarray(frame)
+        step = 1
+        while frame[::step, ::step].nbytes > self.slot_bytes:
+            step += 1
+        if step > 1:
+            frame = frame[::step, ::step]
+
+        sequence = self._next_sequence + 1
+        slot = sequence % self.num_slots
+        meta = self._meta[slot]
+        meta[0] = self.WRITING
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        view = self._pixels[slot, :frame.nbytes].reshape(frame.shape)
+        np.copyto(view, frame, casting='unsafe')
+        meta[1:] = (height, width, channels)
+        meta[0] = sequence
+
+        self._header[1] = slot
+        self._header[0] = sequence
+        self._next_sequence = sequence
+        return sequence
+
+    # --- 読み出し側 (GUIプロセス) ---
+    def latest_sequence(self):
+        """最後に公開されたフレームのシーケンス番号 (0ならまだ何も公開されていない)"""
+        return int(self._header[0])
+
+    def read_latest(self, consume):
+        """
+        最新のフレームを共有メモリ上のビューのまま consume(frame) に渡し、その戻り値を返す。
+        ビューは consume の中でだけ有効。前回から新しいフレームがない場合や、
+        読み出し中に書き込み側に追い越された場合は None を返す。
+        """
+        sequence = int(self._header[0])
+        if sequence == 0 or sequence == self.last_read_sequence:
+            return None
+        slot = int(self._header[1])
+        meta = self._meta[slot]
+        if int(meta[0]) != sequence:
+            self.torn_reads += 1
+            return None
+
+        height, width, channels = (int(v) for v in meta[1:])
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        frame = self._pixels[slot, :height * width * channels].reshape(shape)
+        frame.flags.writeable = False
+        result = consume(frame)
+
+        # 読み出し中にスロットが書き換えられていたら、その結果は使わない
+        if int(meta[0]) != sequence:
+            self.torn_reads += 1
+            return None
+        self.last_read_sequence = sequence
+        return result
+
+    def close(self):
+        """共有メモリとの接続を閉じる。作成したプロセスであれば共有メモリ自体も破棄する"""
+        self._header = self._meta = self._pixels = None
+        try:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logger.warning(f"共有メモリの解放中にエラーが発生しました: {e}")
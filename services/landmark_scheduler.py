@@ -0,0 +1,89 @@
+# services/landmark_scheduler.py
+
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LandmarkScheduler:
+    """
+    どの人物のランドマークを今のフレームで抽出するかを決めるスケジューラ。
+    人物の検出・追跡は毎フレーム行い、負荷の高いランドマーク抽出だけを間引く。
+
+    モード:
+        'all'         : 毎フレーム全員を抽出する (従来どおり)
+        'rate'        : 各IDを目標レート (target_hz) で抽出する
+        'round_robin' : 1フレームの抽出時間が予算 (budget_ms) に収まる人数だけ、
+                        最も長く更新されていないIDから順に抽出する
+    """
+    MODES = ('all', 'rate', 'round_robin')
+
+    def __init__(self, mode='all', target_hz=5.0, budget_ms=50.0, stats_window_sec=10.0):
+        if mode not in self.MODES:
+            logger.warning(f"不明なランドマークのスケジュール '{mode}' です。'all' を使います。")
+            mode = 'all'
+        self.mode = mode
+        self.min_interval = 1.0 / target_hz if target_hz and target_hz > 0 else 0.0
+        self.budget_sec = max(0.0, budget_ms) / 1000.0
+        self.stats_window_sec = stats_window_sec
+
+        self._last_extracted = {}     # ID -> 最後に抽出した時刻
+        self._samples = {}            # ID -> 抽出した時刻の履歴 (達成レートの計測用)
+        self._cost_per_person = None  # 1人あたりの抽出時間の指数移動平均 (秒)
+        # 記録は処理スレッド、計測値の読み出しは別スレッドから行われることがある
+        self._lock = threading.Lock()
+
+    def select(self, person_ids, now=None):
+        """今回のフレームでランドマークを抽出するIDを選ぶ"""
+        if self.mode == 'all' or not person_ids:
+            return list(person_ids)
+        now = time.monotonic() if now is None else now
+
+        if self.mode == 'rate':
+            return [pid for pid in person_ids
+                    if now - self._last_extracted.get(pid, float('-inf')) >= self.min_interval]
+
+        # round_robin: 長く更新されていない順に、予算に収まる人数を選ぶ (最低1人)
+        capacity = len(person_ids)
+        if self._cost_per_person:
+            capacity = max(1, int(self.budget_sec / self._cost_per_person))
+        ordered = sorted(person_ids, key=lambda pid: self._last_extracted.get(pid, float('-inf')))
+        return ordered[:capacity]
+
+    def record(self, person_ids, elapsed, now=None):
+        """抽出したIDと、その抽出にかかった時間 (秒) を記録する"""
+        if not person_ids:
+            return
+        now = time.monotonic() if now is None else now
+        cost = elapsed / len(person_ids)
+        with self._lock:
+            if self._cost_per_person is None:
+                self._cost_per_person = cost
+            else:
+                self._cost_per_person = 0.8 * self._cost_per_person + 0.2 * cost
+
+            for pid in person_ids:
+                self._last_extracted[pid] = now
+                samples = self._samples.setdefault(pid, deque())
+                samples.append(now)
+                while samples and now - samples[0] > self.stats_window_sec:
+                    samples.popleft()
+
+    def achieved_rates(self, now=None):
+        """直近 stats_window_sec 秒間に各IDで達成した抽出レート (Hz)"""
+        now = time.monotonic() if now is None else now
+        rates = {}
+        with self._lock:
+            for pid, samples in list(self._samples.items()):
+                while samples and now - samples[0] > self.stats_window_sec:
+                    samples.popleft()
+                if samples:
+                    rates[pid] = len(samples) / self.stats_window_sec
+                else:
+                    # しばらく現れていないIDは記録から外す
+                    del self._samples[pid]
+                    self._last_extracted.pop(pid, None)
+        return rates
@@ -0,0 +1,144 @@
+# services/packet_codec.py
+
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from constants import ALL_VARIABLES
+
+_VAR_INDEX = {var: i for i, var in enumerate(ALL_VARIABLES)}
+
+
+class PacketBatch(NamedTuple):
+    """
+    キャプチャプロセスからGUIプロセスへ data_queue で送る、1件以上のフレーム分の特徴量。
+    入れ子の辞書ではなく配列3つだけなので、pickleするオブジェクトの数が人数・変数の数に比例しない。
+
+    Attributes:
+        timestamps (np.ndarray): 各行のタイムスタンプ (float64, 行数)。
+        ids (tuple[str]): values の2軸目に対応するID。
+        values (np.ndarray): (行, ID, 変数) の値配列 (float32)。変数の並びは ALL_VARIABLES、欠損はNaN。
+    """
+    timestamps: np.ndarray
+    ids: tuple
+    values: np.ndarray
+
+
+def encode_packet(packet):
+    """
+    パケット辞書 ({'timestamp': t, 'ID_n': {var: value}}) を (タイムスタンプ, IDの組, (ID, 変数) の配列) に変換する。
+    """
+    ids = tuple(key for key, value in packet.items() if key != 'timestamp' and isinstance(value, dict))
+    matrix = np.full((len(ids), len(ALL_VARIABLES)), np.nan, dtype=np.float32)
+    for row, id_name in enumerate(ids):
+        for var, value in packet[id_name].items():
+            col = _VAR_INDEX.get(var)
+            if col is not None and value is not None:
+                matrix[row, col] = value
+    return float(packet['timestamp']), ids, matrix
+
+
+def build_batch(encoded_rows):
+    """encode_packet の結果を複数まとめて1つの PacketBatch にする (IDは登場順に並べる)"""
+    id_index = {}
+    for _timestamp, ids, _matrix in encoded_rows:
+        for id_name in ids:
+            id_index.setdefault(id_name, len(id_index))
+
+    values = np.full((len(encoded_rows), len(id_index), len(ALL_VARIABLES)), np.nan, dtype=np.float32)
+    timestamps = np.empty(len(encoded_rows), dtype=np.float64)
+    for row, (timestamp, ids, matrix) in enumerate(encoded_rows):
+        timestamps[row] = timestamp
+        if ids:
+            values[row, [id_index[id_name] for id_name in ids]] = matrix
+    return PacketBatch(timestamps, tuple(id_index), values)
+
+
+class PacketSender:
+    """
+    【キャプチャプロセス側】特徴量パケットを PacketBatch に詰めて data_queue に送るクラス。
+    受け取り側が前の送信分を取り出し済みならすぐに送り、取り出しが遅れている間は
+    max_rows 行または max_delay_sec 秒まで溜めてから1回にまとめて送る。
+    パケットが途切れても溜まった行が残らないよう、送信側のループでは毎回 poll() を呼ぶ。
+    """
+    def __init__(self, data_queue, max_rows=30, max_delay_sec=0.5):
+        self.data_queue = data_queue
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay_sec = max(0.0, float(max_delay_sec))
+        self._pending = []
+        self._pending_since = None
+
+    def add(self, packet):
+        """パケット辞書を1件追加し、必要なら送信する"""
+        self._pending.append(encode_packet(packet))
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if len(self._pending) >= self.max_rows or self._consumer_idle():
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        """最初の行を溜めてから max_delay_sec 秒が過ぎていれば送る (新しいパケットがなくても呼んでよい)"""
+        if self._pending_since is not None and time.monotonic() - self._pending_since >= self.max_delay_sec:
+            self.flush()
+
+    def flush(self):
+        """溜まっている行をすべて送る"""
+        if not self._pending:
+            return
+        self.data_queue.put(build_batch(self._pending))
+        self._pending = []
+        self._pending_since = None
+
+    def _consumer_idle(self):
+        """受け取り側がキューを空にしているか (判定できない環境では常に送る)"""
+        try:
+            return self.data_queue.empty()
+        except NotImplementedError:
+            return True
+
+
+def concat_batches(batches):
+    """複数の PacketBatch を時刻順に1つにつなげる (IDは登場順に並べる)"""
+    if len(batches) == 1:
+        return batches[0]
+    id_index = {}
+    for batch in batches:
+        for id_name in batch.ids:
+            id_index.setdefault(id_name, len(id_index))
+
+    total = sum(len(batch.timestamps) for batch in batches)
+    values = np.full((total, len(id_index), len(ALL_VARIABLES)), np.nan, dtype=np.float32)
+    row = 0
+    for batch in batches:
+        rows = len(batch.timestamps)
+        if batch.ids:
+            values[row:row + rows, [id_index[id_name] for id_name in batch.ids]] = batch.values
+        row += rows
+    timestamps = np.concatenate([batch.timestamps for batch in batches])
+    return PacketBatch(timestamps, tuple(id_index), values)
+
+
+def reduce_batch(batch, mode):
+    """
+    複数行の PacketBatch を1行にまとめる。タイムスタンプは最後の行のものを使う。
+
+    Args:
+        mode (str): 'latest' なら各IDの最後に観測された値、'mean' なら観測値の平均 (欠損は除く)。
+    """
+    if len(batch.timestamps) <= 1:
+        return batch
+    observed = ~np.isnan(batch.values)
+    if mode == 'mean':
+        counts = observed.sum(axis=0)
+        sums = np.where(observed, batch.values, 0.0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reduced = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    else:
+        # 後ろから見て最初に観測された行の値を採用する
+        last_row = len(batch.timestamps) - 1 - np.argmax(observed[::-1], axis=0)
+        reduced = np.take_along_axis(batch.values, last_row[np.newaxis], axis=0)[0]
+        reduced[~observed.any(axis=0)] = np.nan
+    return PacketBatch(batch.timestamps[-1:], batch.ids, reduced[np.newaxis].astype(np.float32))
@@ -2,43 +2,163 @@
 
 import cv2
 import logging
+import numpy as np
 from ultralytics import YOLO
 from constants import ALL_VARIABLES, REALTIME_ID_PREFIX
 
 logger = logging.getLogger(__name__)
 
 class PersonTracker:
-    """YOLOv8を使い、フレーム内の人物を検出・追跡するクラス。"""
+    """
+    YOLOv8を使い、フレーム内の人物を検出・追跡するクラス。
 
-    def __init__(self, model_path, device='cpu'):
+    detect_interval が2以上なら、YOLOによる検出・追跡は detect_interval フレームに1回だけ行い、
+    間のフレームでは各ボックス内の特徴点を疎なオプティカルフロー (Lucas-Kanade) で追い、
+    追えた点の移動量の中央値だけボックスを動かす。追える点が足りなくなったボックス (隠れた・画面外に出た) は
+    次の検出まで出力しないので、画像と関係なく動き続けるボックスは作らない。
+    IDの対応付けは検出フレームでYOLOのトラッカーが行うので、IDは検出のたびに引き継がれる。
+    """
+    # ボックス1つあたりに追う特徴点の最大数と、追跡を続けるのに必要な点の数
+    MAX_POINTS_PER_BOX = 20
+    MIN_TRACKED_POINTS = 4
+    # ボックスの面積のうち、この割合以上が画面内に残っていなければ画面外に出たとみなす
+    MIN_VISIBLE_RATIO = 0.5
+    LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+    def __init__(self, model_path, device='cpu', detect_interval=1):
         logger.info(f"YOLOv8モデル '{model_path}' をデバイス '{device}' で読み込んでいます...")
         self.model = YOLO(model_path)
         self.device = device
+        self.detect_interval = max(1, int(detect_interval))
+        # 追跡中のボックスと、その中で追っている特徴点 (ID -> (box, points))
+        self._tracks = {}
+        self._prev_gray = None
+        self._frames_since_detection = None
         logger.info("YOLOv8モデルの読み込みが完了しました。")
 
-    def track(self, frame):
+    def track(self, frame, annotate=True):
         """
         フレーム内の人物を追跡し、結果を返す。
 
         Args:
             frame (numpy.ndarray): 入力フレーム画像。
+            annotate (bool): Falseなら描画を省略し、描画済みフレームとして None を返す。
 
         Returns:
             list[dict]: 追跡された人物情報のリスト。
                         例: [{'id': '1', 'box': [x1, y1, x2, y2]}]
         """
+        if self._frames_since_detection is None or self._frames_since_detection + 1 >= self.detect_interval:
+            return self._detect(frame, annotate)
+        return self._propagate(frame, annotate)
+
+    def _detect(self, frame, annotate):
+        """YOLOで検出・追跡し、次の中間フレームのために各ボックス内の特徴点を選んでおく"""
         # `persist=True` は追跡を継続するために重要
         results = self.model.track(frame, persist=True, classes=[0], device=self.device, verbose=False)
         
         tracked_persons = []
+        tracks = {}
         if results[0].boxes.id is not None:
             boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
             track_ids = results[0].boxes.id.cpu().numpy().astype(int)
 
             for box, track_id in zip(boxes, track_ids):
+                person_id = f"{REALTIME_ID_PREFIX}{track_id}"
                 tracked_persons.append({
-                    "id": f"{REALTIME_ID_PREFIX}{track_id}",
+                    "id": person_id,
                     "box": box
                 })
-        annotated_frame = results[0].plot()
-        return tracked_persons, annotated_frame
\ No newline at end of file
+                tracks[person_id] = (box.astype(float), None)
+
+        # 中間フレームを作るときだけ、特徴点の準備をする
+        if self.detect_interval > 1 and tracks:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            tracks = {person_id: (box, self._select_points(gray, box)) for person_id, (box, _) in tracks.items()}
+            self._prev_gray = gray
+        else:
+            self._prev_gray = None
+        self._tracks = tracks
+        self._frames_since_detection = 0
+
+        annotated_frame = results[0].plot() if annotate else None
+        return tracked_persons, annotated_frame
+
+    def _select_points(self, gray, box):
+        """ボックス内から追跡しやすい特徴点を選ぶ (フレーム座標, (点数, 1, 2) のfloat32)"""
+        height, width = gray.shape[:2]
+        x1, y1, x2, y2 = np.clip(box, 0, [width, height, width, height]).astype(int)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        points = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=self.MAX_POINTS_PER_BOX,
+                                         qualityLevel=0.01, minDistance=5)
+        if points is None:
+            return None
+        return (points + np.array([x1, y1], dtype=np.float32)).astype(np.float32)
+
+    def _propagate(self, frame, annotate):
+        """検出を行わず、前のフレームからの特徴点の動きでボックスを動かす"""
+        self._frames_since_detection += 1
+        height, width = frame.shape[:2]
+        limits = np.array([width, height, width, height])
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks = {person_id: track for person_id, track in self._tracks.items()
+                  if track[1] is not None and len(track[1]) >= self.MIN_TRACKED_POINTS}
+        tracked_persons = []
+        next_tracks = {}
+        if tracks and self._prev_gray is not None:
+            # 全ボックスの点をまとめて1回でフローを求める
+            all_points = np.concatenate([points for _box, points in tracks.values()])
+            moved_points, status, _err = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, all_points, None, **self.LK_PARAMS)
+            status = status.reshape(-1).astype(bool)
+
+            offset = 0
+            for person_id, (box, points) in tracks.items():
+                count = len(points)
+                good = status[offset:offset + count]
+                new_points = moved_points[offset:offset + count][good]
+                old_points = points[good]
+                offset += count
+                if len(new_points) < self.MIN_TRACKED_POINTS:
+                    continue    # 隠れた・見失ったボックスは次の検出まで出さない
+
+                dx, dy = np.median((new_points - old_points).reshape(-1, 2), axis=0)
+                box = box + np.array([dx, dy, dx, dy])
+                clipped = np.clip(box, 0, limits)
+                area = (box[2] - box[0]) * (box[3] - box[1])
+                visible = (clipped[2] - clipped[0]) * (clipped[3] - clipped[1])
+                if area <= 0 or visible < area * self.MIN_VISIBLE_RATIO:
+                    continue    # 画面外に出たボックス
+                next_tracks[person_id] = (box, new_points.reshape(-1, 1, 2))
+                tracked_persons.append({"id": person_id, "box": clipped.astype(int)})
+        self._tracks = next_tracks
+        self._prev_gray = gray
+
+        annotated_frame = self._draw_boxes(frame, tracked_persons) if annotate else None
+        return tracked_persons, annotated_frame
+
+    @staticmethod
+    def _draw_boxes(frame, tracked_persons):
+        """中間フレーム用の簡易な描画 (ボックスとID)"""
+        annotated_frame = frame.copy()
+        for person in tracked_persons:
+            x1, y1, x2, y2 = (int(v) for v in person["box"])
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(annotated_frame, person["id"], (x1, max(0, y1 - 5)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        return annotated_frame
+
+    def warmup(self):
+        """空の画像で1回推論しておく (追跡の状態は変えない)"""
+        self.model.predict(np.zeros((640, 640, 3), dtype=np.uint8), classes=[0], device=self.device, verbose=False)
+
+    def reset(self):
+        """追跡の状態を初期化し、track ID を1から振り直す"""
+        self._tracks = {}
+        self._prev_gray = None
+        self._frames_since_detection = None
+        predictor = getattr(self.model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
\ No newline at end of file
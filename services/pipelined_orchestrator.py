@@ -0,0 +1,168 @@
+# services/pipelined_orchestrator.py
+
+import time
+import queue
+import logging
+import threading
+
+from .realtime_orchestrator import RealtimeOrchestrator
+
+logger = logging.getLogger(__name__)
+
+# ソースの終端を後段に伝える目印
+_END_OF_STREAM = object()
+
+
+class _StageError:
+    """ステージ内で発生した例外を、フレーム番号とともに後段へ運ぶ入れ物"""
+    def __init__(self, sequence, error):
+        self.sequence = sequence
+        self.error = error
+
+
+class PipelinedOrchestrator(RealtimeOrchestrator):
+    """
+    デコード / 検出・追跡 / ランドマーク抽出 を別々のスレッドで並行して動かすオーケストレーター。
+    ステージ間は上限付きキューでつなぎ、各フレームに通し番号を付けて、出力側で元の順序に並べ直す。
+    スループットは各ステージの処理時間の合計ではなく、最も遅いステージで決まる。
+
+    process_one_frame() / release() は RealtimeOrchestrator と同じ使い方・同じ戻り値になる。
+    """
+    def __init__(self, config, models=None):
+        super().__init__(config, models=models)
+        queue_size = max(1, int(config.get('pipeline_queue_size', 2)))
+        self._decoded = queue.Queue(maxsize=queue_size)
+        self._detected = queue.Queue(maxsize=queue_size)
+        self._completed = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+
+        # 出力側の並べ直し用
+        self._next_sequence = 0
+        self._reorder_buffer = {}
+        self._finished = False
+
+        self._threads = [
+            threading.Thread(target=self._decode_loop, name="Pipeline-Decode", daemon=True),
+            threading.Thread(target=self._detect_loop, name="Pipeline-Detect", daemon=True),
+            threading.Thread(target=self._landmark_loop, name="Pipeline-Landmark", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info("パイプライン処理のスレッドを開始しました。")
+
+    # --- キュー操作 (停止要求に反応できるようにタイムアウト付きで待つ) ---
+    def _put(self, target_queue, item):
+        while not self._stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source_queue):
+        while not self._stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END_OF_STREAM
+
+    # --- 各ステージ ---
+    def _decode_loop(self):
+        """【デコードスレッド】映像ソースからフレームを読み、通し番号と取得時刻を付けて流す"""
+        sequence = 0
+        position = 0    # 読み込んだ・読み飛ばしたフレームの合計
+        started = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                # 後段が詰まって実時間より遅れた分は、デコードせずに読み飛ばす
+                if self.drop_frames_when_behind:
+                    behind = int((time.monotonic() - started) / self._frame_interval) - position
+                    if behind > 0:
+                        skipped = self.video_source.skip(behind)
+                        self.frames_dropped += skipped
+                        position += skipped
+                position += 1
+                ret, frame = self.video_source.get_frame()
+                if not ret:
+                    break
+                item = (sequence, frame, time.time())
+            except Exception as e:
+                item = _StageError(sequence, e)
+            if not self._put(self._decoded, item):
+                return
+            sequence += 1
+        self._put(self._decoded, _END_OF_STREAM)
+
+    def _detect_loop(self):
+        """【検出スレッド】人物の検出・追跡と描画を行う"""
+        while True:
+            item = self._get(self._decoded)
+            if item is _END_OF_STREAM:
+                self._put(self._detected, item)
+                return
+            if isinstance(item, _StageError):
+                self._put(self._detected, item)
+                continue
+            sequence, frame, timestamp = item
+            try:
+                tracked_persons, annotated_frame = self.detect_persons(frame)
+                result = (sequence, frame, timestamp, tracked_persons, annotated_frame)
+            except Exception as e:
+                result = _StageError(sequence, e)
+            if not self._put(self._detected, result):
+                return
+
+    def _landmark_loop(self):
+        """【ランドマークスレッド】追跡された人物ごとに特徴量を抽出する"""
+        while True:
+            item = self._get(self._detected)
+            if item is _END_OF_STREAM:
+                self._put(self._completed, item)
+                return
+            if isinstance(item, _StageError):
+                self._put(self._completed, item)
+                continue
+            sequence, frame, timestamp, tracked_persons, annotated_frame = item
+            try:
+                if tracked_persons:
+                    feature_packet = self.extract_features(frame, tracked_persons, timestamp)
+                else:
+                    feature_packet = {}
+                result = (sequence, feature_packet, annotated_frame)
+            except Exception as e:
+                result = _StageError(sequence, e)
+            if not self._put(self._completed, result):
+                return
+
+    # --- 出力 ---
+    def process_one_frame(self):
+        """
+        次のフレームの処理結果を、フレームの順番どおりに1つ返す。
+        ソースの終端に達したら (None, None) を返す。ステージで発生した例外はここで送出する。
+        """
+        while self._next_sequence not in self._reorder_buffer:
+            if self._finished:
+                return None, None
+            item = self._get(self._completed)
+            if item is _END_OF_STREAM:
+                self._finished = True
+                continue
+            if isinstance(item, _StageError):
+                # 例外で失われたフレームは飛ばして、次のフレームから再開できるようにする
+                self._next_sequence = max(self._next_sequence, item.sequence + 1)
+                raise item.error
+            self._reorder_buffer[item[0]] = item[1:]
+
+        feature_packet, annotated_frame = self._reorder_buffer.pop(self._next_sequence)
+        self._next_sequence += 1
+        self.frames_processed += 1
+        return feature_packet, annotated_frame
+
+    def release(self):
+        """ステージのスレッドを止めてから、リソースを解放する"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        super().release()
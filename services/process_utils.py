@@ -9,6 +9,7 @@ class Status(Enum):
     INFO = auto()
     WARNING = auto()
     COMPLETED = auto() # 処理が正常に完了した
+    METRICS = auto()   # 計測値の報告 (ダイアログは出さない)
 
 class StatusMessage:
     """プロセス間通信で送受信するメッセージクラス"""
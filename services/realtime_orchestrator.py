@@ -4,33 +4,101 @@ import time
 import logging
 
 # 連携させる各サービスクラスをインポート
-from .video_source import VideoSource
+from .video_source import create_video_source
 from .person_tracker import PersonTracker
-from .feature_extractor import FeatureExtractor
+from .feature_extractor import create_feature_extractor
+from .landmark_scheduler import LandmarkScheduler
 from constants import REALTIME_ID_PREFIX # 定数をインポート
 
 logger = logging.getLogger(__name__)
 
+
+class WarmModels:
+    """
+    人物追跡 (YOLO) とランドマーク抽出 (MediaPipe) のモデルをまとめて保持するクラス。
+    キャプチャワーカーが開始・停止をまたいで使い回し、読み込みに関わる設定が変わったときだけ読み直す。
+    """
+    def __init__(self, config):
+        self.key = self.key_for(config)
+        self.person_tracker = PersonTracker(
+            model_path=config['yolo_model_path'],
+            device=config['device']
+        )
+        # landmark_workers が2以上なら、複数のインスタンスで人物ごとの抽出を並行処理する
+        # landmark_mosaic_faces が2以上なら、複数人の画像を1枚のモザイクにまとめて推論する
+        self.feature_extractor = create_feature_extractor(
+            model_path=config['mediapipe_model_path'],
+            num_workers=config.get('landmark_workers', 1),
+            mosaic_faces=config.get('landmark_mosaic_faces', 0),
+            tile_size=config.get('landmark_mosaic_tile_size', 256)
+        )
+
+    @staticmethod
+    def key_for(config):
+        """この設定が同じなら、読み込み済みのモデルをそのまま使える"""
+        return (config['yolo_model_path'], config['device'], config['mediapipe_model_path'],
+                config.get('landmark_workers', 1), config.get('landmark_mosaic_faces', 0),
+                config.get('landmark_mosaic_tile_size', 256))
+
+    def warmup(self):
+        """空の画像で1回ずつ推論し、初回推論の遅い初期化を開始前に済ませておく"""
+        self.person_tracker.warmup()
+        self.feature_extractor.warmup()
+
+    def reset(self):
+        """追跡の状態 (track ID の採番など) を初期化する。新しい計測の開始時に呼ぶ"""
+        self.person_tracker.reset()
+
+    def close(self):
+        self.feature_extractor.close()
+
+
 class RealtimeOrchestrator:
     """
     リアルタイム解析のパイプライン全体を管理する司令塔クラス。
     """
-    def __init__(self, config):
+    def __init__(self, config, models=None):
         """
         configオブジェクトから設定を読み込み、各専門クラスを初期化する。
+        models (WarmModels) を渡すと読み込み済みのモデルを使い、release() でも解放しない。
         """
         self.config = config
         logger.info("リアルタイム処理のオーケストレーターを初期化しています...")
 
         # 各専門クラスのインスタンスを作成
-        self.video_source = VideoSource(self.config['video_source'])
-        self.person_tracker = PersonTracker(
-            model_path=self.config['yolo_model_path'],
-            device=self.config['device']
+        # video_prefetch が有効なら、別スレッドで先読みデコードする
+        self.video_source = create_video_source(
+            self.config['video_source'],
+            prefetch=self.config.get('video_prefetch', True),
+            policy=self.config.get('video_prefetch_policy', 'auto'),
+            buffer_size=self.config.get('video_buffer_size', 4),
+            max_width=self.config.get('video_max_width', 0)
         )
-        self.feature_extractor = FeatureExtractor(
-            model_path=self.config['mediapipe_model_path']
+        self._owns_models = models is None
+        if models is None:
+            models = WarmModels(self.config)
+        else:
+            models.reset()
+        self.models = models
+        self.person_tracker = models.person_tracker
+        self.person_tracker.detect_interval = max(1, int(self.config.get('detect_interval', 1)))
+        self.feature_extractor = models.feature_extractor
+        # 映像タブが表示されていないときは、描画済みフレームを作らない
+        self.annotate = True
+        # ランドマーク抽出をどのIDに、どの頻度で行うか
+        self.landmark_scheduler = LandmarkScheduler(
+            mode=self.config.get('landmark_schedule', 'all'),
+            target_hz=self.config.get('landmark_target_hz', 5.0),
+            budget_ms=self.config.get('landmark_budget_ms', 50.0)
         )
+
+        # 処理がソースのフレームレートに追いつかないときのフレーム落とし
+        # (カメラなどのライブソースのみ。動画ファイルは遅れても全フレームを処理する)
+        self.drop_frames_when_behind = self.config.get('drop_frames_when_behind', True) and self.video_source.is_live
+        self._frame_interval = 1.0 / self.video_source.fps
+        self._frame_debt = 0.0
+        self.frames_processed = 0
+        self.frames_dropped = 0
         logger.info("オーケストレーターの初期化が完了しました。")
 
 
@@ -38,21 +106,50 @@ class RealtimeOrchestrator:
         """
         1フレーム分の処理を実行し、整形されたデータパケットと描画済みフレームを返す。
         """
+        started = time.monotonic()
         ret, frame = self.video_source.get_frame()
         if not ret:
             return None, None
 
-        # 1. 人物追跡
-        tracked_persons, annotated_frame = self.person_tracker.track(frame)
-        if not tracked_persons:
-            # 誰もいなくても、描画済み（この場合は元画像と同じ）フレームは返す
-            return {}, annotated_frame
+        try:
+            # 1. 人物追跡
+            tracked_persons, annotated_frame = self.detect_persons(frame)
+            if not tracked_persons:
+                # 誰もいなくても、描画済み（この場合は元画像と同じ）フレームは返す
+                return {}, annotated_frame
 
-        # 2. 特徴量抽出
-        all_features = {'timestamp': time.time()}
+            # 2. 特徴量抽出
+            all_features = self.extract_features(frame, tracked_persons, time.time())
+            return all_features, annotated_frame
+        finally:
+            self.frames_processed += 1
+            self._drop_frames_if_behind(time.monotonic() - started)
+
+    def _drop_frames_if_behind(self, elapsed):
+        """1フレームの処理がフレーム間隔を超えた分を積算し、溜まった分のフレームを読み飛ばす"""
+        if not self.drop_frames_when_behind:
+            return
+        self._frame_debt = max(0.0, self._frame_debt + elapsed - self._frame_interval)
+        behind = int(self._frame_debt / self._frame_interval)
+        if behind > 0:
+            skipped = self.video_source.skip(behind)
+            self.frames_dropped += skipped
+            self._frame_debt -= behind * self._frame_interval
+
+    def detect_persons(self, frame):
+        """【ステージ: 検出・追跡】フレーム内の人物を追跡し、人物情報と描画済みフレーム (描画しない間は None) を返す"""
+        return self.person_tracker.track(frame, annotate=self.annotate)
+
+    def extract_features(self, frame, tracked_persons, timestamp):
+        """【ステージ: ランドマーク】追跡された人物ごとに特徴量を抽出し、データパケットにまとめる"""
+        all_features = {'timestamp': timestamp}
+        scheduled_ids = set(self.landmark_scheduler.select([person['id'] for person in tracked_persons]))
+        person_ids, person_images = [], []
         for person in tracked_persons:
             person_id = person['id']
             box = person['box']
+            if person_id not in scheduled_ids:
+                continue
 
             # バウンディングボックスで人物画像を切り抜き
             x1, y1, x2, y2 = box
@@ -61,15 +158,32 @@ class RealtimeOrchestrator:
             # 画像が空でないことを確認
             if person_image.size == 0:
                 continue
+            person_ids.append(person_id)
+            person_images.append(person_image)
 
-            # FeatureExtractorに渡して特徴量を取得
-            features = self.feature_extractor.extract(person_image)
+        # FeatureExtractorに全員分をまとめて渡して特徴量を取得 (プールなら並行して処理される)
+        extract_started = time.monotonic()
+        for person_id, features in zip(person_ids, self.feature_extractor.extract_many(person_images)):
             all_features[person_id] = features
+        self.landmark_scheduler.record(person_ids, time.monotonic() - extract_started)
+
+        # 今回誰も抽出しなかったフレームは、送るべきデータがない
+        if not person_ids:
+            return {}
+        return all_features
 
-        return all_features, annotated_frame
+    def get_stats(self):
+        """処理・読み飛ばしたフレーム数と、IDごとに達成したランドマークの抽出レート (Hz)"""
+        return {
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'landmark_hz': self.landmark_scheduler.achieved_rates(),
+        }
 
     def release(self):
         """
         リソースを解放する。
         """
-        self.video_source.release()
\ No newline at end of file
+        self.video_source.release()
+        if self._owns_models:
+            self.models.close()
\ No newline at end of file
@@ -2,20 +2,30 @@
 
 import cv2
 import logging
+import threading
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
 class VideoSource:
-    """カメラや動画ファイルからの映像取得を専門に担当するクラス。"""
+    """
+    カメラや動画ファイルからの映像取得を専門に担当するクラス。
+
+    max_width を指定すると、それより幅の広いフレームはデコード直後に縮小してから返す
+    (検出・ランドマーク抽出・表示はすべて縮小後の画像で行われる)。
+    """
     
-    def __init__(self, source):
+    def __init__(self, source, max_width=0):
         # sourceが数字のみの文字列なら、整数(カメラ番号)に変換する
         processed_source = source
         if isinstance(source, str) and source.isdigit():
             processed_source = int(source)
         
-        self.source = source
+        self.source = processed_source
+        self.is_live = isinstance(processed_source, int)
+        self.max_width = int(max_width) if max_width else 0
         self.cap = None
+        self._fps = 30.0
         self._open_source()
 
     def _open_source(self):
@@ -25,8 +35,19 @@ class VideoSource:
         if not self.cap.isOpened():
             logger.error(f"映像ソース '{self.source}' を開けませんでした。")
             raise IOError(f"Cannot open video source: {self.source}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self._fps = fps if fps and fps > 0 else 30.0
         logger.info("映像ソースを正常に開きました。")
 
+    def _read(self):
+        """キャプチャから1フレームをデコードし、必要なら縮小して返す"""
+        ret, frame = self.cap.read()
+        if ret and self.max_width and frame.shape[1] > self.max_width:
+            scale = self.max_width / frame.shape[1]
+            frame = cv2.resize(frame, (self.max_width, max(1, int(frame.shape[0] * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return ret, frame
+
     def get_frame(self):
         """
         ソースから1フレーム取得する。
@@ -37,11 +58,149 @@ class VideoSource:
         if self.cap is None or not self.cap.isOpened():
             return False, None
         
-        ret, frame = self.cap.read()
-        return ret, frame
+        return self._read()
+
+    @property
+    def fps(self):
+        """ソースのフレームレート。取得できない場合 (カメラなど) は30とみなす"""
+        return self._fps
+
+    def skip(self, count):
+        """
+        フレームをデコードせずに count 枚読み飛ばす (処理が追いつかないときのフレーム落とし用)。
+
+        Returns:
+            int: 実際に読み飛ばした枚数。
+        """
+        skipped = 0
+        while skipped < count and self.cap is not None and self.cap.grab():
+            skipped += 1
+        return skipped
 
     def release(self):
         """リソースを解放する。"""
         if self.cap:
             logger.info("映像ソースを解放します。")
-            self.cap.release()
\ No newline at end of file
+            self.cap.release()
+
+
+class PrefetchingVideoSource(VideoSource):
+    """
+    バックグラウンドのスレッドで先読みデコードする VideoSource。
+    get_frame() はデコード済みのフレームをバッファから取り出すだけなので、デコード時間が処理ループの遅延に加わらない。
+
+    バッファの扱い:
+        'latest'  : 最新の1フレームだけを保持し、取り出される前に次が届いたら古い方を捨てる。
+                    カメラのOS側バッファに古いフレームが溜まって遅延するのを防ぐ (カメラ向け)
+        'ordered' : 最大 buffer_size フレームを順番どおりに保持し、満杯ならデコードを待たせる。
+                    フレームを1枚も失わない (動画ファイル向け)
+        'auto'    : カメラなら 'latest'、ファイルなら 'ordered'
+    """
+    POLICIES = ('auto', 'latest', 'ordered')
+
+    def __init__(self, source, policy='auto', buffer_size=4, max_width=0):
+        super().__init__(source, max_width=max_width)
+        if policy not in self.POLICIES:
+            logger.warning(f"不明な先読みの方式 '{policy}' です。'auto' を使います。")
+            policy = 'auto'
+        if policy == 'auto':
+            policy = 'latest' if self.is_live else 'ordered'
+        self.policy = policy
+        self.buffer_size = 1 if policy == 'latest' else max(1, int(buffer_size))
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._pending_skip = 0      # デコードスレッドに読み飛ばしてほしい残りの枚数
+        self._ended = False
+        self._stopped = False
+        self.frames_discarded = 0   # 'latest' で取り出される前に捨てたフレーム数
+
+        self._thread = threading.Thread(target=self._decode_loop, name="VideoSource-Prefetch", daemon=True)
+        self._thread.start()
+        logger.info(f"映像の先読みを開始しました (方式: {self.policy}, バッファ: {self.buffer_size})。")
+
+    def _decode_loop(self):
+        """【デコードスレッド】フレームを読み続けてバッファに入れる"""
+        while True:
+            with self._condition:
+                while (not self._stopped and self.policy == 'ordered'
+                       and len(self._buffer) >= self.buffer_size and self._pending_skip == 0):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                skip_count, self._pending_skip = self._pending_skip, 0
+
+            # キャプチャの操作はこのスレッドだけが行う
+            if skip_count:
+                VideoSource.skip(self, skip_count)
+            try:
+                ret, frame = self._read()
+            except Exception as e:
+                logger.error(f"映像のデコード中にエラーが発生しました: {e}")
+                ret, frame = False, None
+
+            with self._condition:
+                if not ret:
+                    self._ended = True
+                    self._condition.notify_all()
+                    return
+                if self.policy == 'latest' and self._buffer:
+                    self._buffer.clear()
+                    self.frames_discarded += 1
+                self._buffer.append(frame)
+                self._condition.notify_all()
+
+    def get_frame(self):
+        """
+        先読み済みのフレームを1つ取り出す。バッファが空ならデコードされるまで待つ。
+
+        Returns:
+            tuple[bool, numpy.ndarray | None]: 読み込みの成否とフレーム画像。
+        """
+        with self._condition:
+            while not self._buffer and not self._ended and not self._stopped:
+                self._condition.wait()
+            if not self._buffer:
+                return False, None
+            frame = self._buffer.popleft()
+            self._condition.notify_all()
+            return True, frame
+
+    def skip(self, count):
+        """
+        フレームを count 枚読み飛ばす。バッファ内のフレームを先に捨て、残りはデコードスレッドに grab() で飛ばさせる。
+        'latest' では古いフレームは常に捨てられているので、要求された枚数をそのまま読み飛ばした扱いにする。
+
+        Returns:
+            int: 読み飛ばした (または読み飛ばしを予約した) 枚数。
+        """
+        if count <= 0:
+            return 0
+        if self.policy == 'latest':
+            return count
+        with self._condition:
+            dropped = 0
+            while self._buffer and dropped < count:
+                self._buffer.popleft()
+                dropped += 1
+            if self._ended:
+                return dropped
+            self._pending_skip += count - dropped
+            self._condition.notify_all()
+        return count
+
+    def release(self):
+        """デコードスレッドを止めてから、リソースを解放する"""
+        with self._condition:
+            self._stopped = True
+            self._buffer.clear()
+            self._condition.notify_all()
+        self._thread.join(timeout=2)
+        super().release()
+
+
+def create_video_source(source, prefetch=True, policy='auto', buffer_size=4, max_width=0):
+    """設定に応じて VideoSource または PrefetchingVideoSource を作る"""
+    if prefetch:
+        return PrefetchingVideoSource(source, policy=policy, buffer_size=buffer_size, max_width=max_width)
+    return VideoSource(source, max_width=max_width)
@@ -0,0 +1,47 @@
+# ファイル名: tests/test_feature_cache.py (新規作成)
+
+import numpy as np
+import pandas as pd
+
+from constants import ALL_VARIABLES
+from core.analysis_service import AnalysisService
+from core.config_manager import AnalysisParametersConfig
+from core.data_processor import DataProcessor
+from core.model import AnalysisModel
+
+
+def _fill_history(model, num_ticks, ids=('ID_1', 'ID_2'), seed=0):
+    rng = np.random.default_rng(seed)
+    model.active_ids = list(ids)
+    for t in range(num_ticks):
+        packet = {'timestamp': float(t)}
+        for id_name in ids:
+            packet[id_name] = {var: float(rng.normal()) for var in ALL_VARIABLES}
+        model.full_history.append(packet)
+
+
+def _assert_same_features(actual, expected):
+    pd.testing.assert_frame_equal(actual.sort_index(axis=1), expected.sort_index(axis=1),
+                                  check_exact=False, rtol=1e-6, atol=1e-8)
+
+
+def test_sliding_features_are_not_shared_with_full_while_history_is_short():
+    """履歴がスライディング窓より短く、全区間と窓の範囲が一致する間も、窓の特徴量は厳密な計算と一致する"""
+    params = AnalysisParametersConfig(FULL_REFRESH_RATIO=0.5)
+    sliding_window = params.SLIDING_WINDOW_SECONDS
+    model = AnalysisModel()
+    data_processor = DataProcessor()
+    service = AnalysisService(model, data_processor, params)
+    _fill_history(model, sliding_window - 1)
+
+    for target_index in range(len(model.full_history)):
+        full_slice = model.full_history[:target_index + 1]
+        sliding_slice = model.full_history[max(0, target_index - sliding_window + 1):target_index + 1]
+        slope_dfs, _power_spectrums = service.compute_features(full_slice, sliding_slice)
+
+        expected, _ = data_processor.get_features_from_window(sliding_slice, model.active_ids)
+        _assert_same_features(slope_dfs['sliding'], expected)
+
+        window_features, _ = service.get_window_features(full_slice)
+        expected, _ = data_processor.get_features_from_window(full_slice, model.active_ids)
+        _assert_same_features(window_features, expected)
@@ -0,0 +1,36 @@
+# ファイル名: tests/test_incremental_feature_engine.py (新規作成)
+
+import numpy as np
+
+from constants import ALL_VARIABLES
+from core.analysis_service import AnalysisService
+from core.config_manager import AnalysisParametersConfig
+from core.data_processor import DataProcessor
+from core.model import AnalysisModel
+
+
+def test_default_full_features_match_calculate_slope():
+    """既定の設定では、全区間の特徴量は毎ティック calculate_slope で計算し直した値と一致する"""
+    rng = np.random.default_rng(1)
+    model = AnalysisModel()
+    model.active_ids = ['ID_1', 'ID_2']
+    data_processor = DataProcessor()
+    service = AnalysisService(model, data_processor, AnalysisParametersConfig())
+
+    for t in range(120):
+        packet = {'timestamp': float(t), 'ID_1': {var: float(rng.normal()) for var in ALL_VARIABLES}}
+        # ID_2 はときどき欠ける (欠損を含む系列)
+        if t % 7 != 3:
+            packet['ID_2'] = {var: float(rng.normal()) for var in ALL_VARIABLES}
+        model.full_history.append(packet)
+
+        full_slice = model.full_history[:t + 1]
+        slope_dfs, power_spectrums = service.compute_features(full_slice)
+        for id_name in model.active_ids:
+            for var in ALL_VARIABLES:
+                values = full_slice.series(id_name, var)
+                values = np.asarray(values[~np.isnan(values)], dtype=np.float64)
+                slope, freq, amp, _intercept = data_processor.calculate_slope(values)
+                assert np.isclose(slope_dfs['full'].loc[id_name, var], slope, rtol=1e-9, atol=1e-12)
+                if freq is not None:
+                    np.testing.assert_allclose(power_spectrums['full'][id_name][var][1], amp, rtol=1e-9)